@@ -20,17 +20,53 @@
     :copyright: (c) 2012 Konsta Vesterinen.
     :license: BSD, see LICENSE for more details.
 """
-from copy import copy
+import sys
 from datetime import datetime, date, time
 from decimal import Decimal
-from flask import (render_template, request, redirect, url_for, flash,
-    current_app, Blueprint)
+from hashlib import sha1
+from operator import itemgetter
+from threading import Lock
+from time import time as current_time
+from flask import (request, redirect, url_for, flash,
+    current_app, Blueprint, Response, abort, make_response,
+    stream_with_context, json, has_app_context)
+from flask.ext.sqlalchemy import Pagination
 from inflection import underscore, humanize
-from sqlalchemy import types
+from jinja2 import FileSystemBytecodeCache, TemplateNotFound
+from jinja2.environment import TemplateStream
+from sqlalchemy import types, func, cast, literal, Unicode
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import (class_mapper, aliased, ColumnProperty,
+    RelationshipProperty)
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.exc import StaleDataError
+from sqlalchemy.orm.interfaces import ONETOMANY
+from sqlalchemy.sql import exists
+from werkzeug.datastructures import ImmutableDict
+from werkzeug.utils import cached_property
 from wtforms.ext.sqlalchemy.orm import model_form
 
+from .compression import compressed
+from .context import ContextChain, LazyValue, render, generate
 from .core import BaseView, TemplateView
-from .exceptions import ImproperlyConfigured
+from .decoders import RowDecoder, CSVRowDecoder, NDJSONRowDecoder
+from .feeds import ChangeFeed, Change
+from .encoders import RowEncoder, JSONRowEncoder, CSVRowEncoder
+from .exports import ShardStatement, encode_shard, is_shared, iter_ranges
+from .exceptions import (ImproperlyConfigured, PreconditionRequired,
+    TooManyRequests, InvalidParams, QueryBudgetExceeded)
+from .params import (ListParams, ParamSchema, ReservedParamWarning,
+    format_sort)
+from .rows import Row, RowResult, get_row_class
+from .snapshots import (Snapshots, Snapshot, MemorySnapshotStore,
+    FileSnapshotStore)
+from .throttling import Throttle, MemoryBackend
+from .profiling import Profiler, StackSampler
+from .budgets import (QueryBudget, QueryBudgetWarning, QueryRecorder,
+    RecordedStatement)
+from .hooks import WriteEvent, schedule
+from .workers import (InlineExecutor, ThreadExecutor, ProcessExecutor, Full,
+    get_default_executor)
 
 try:
     __version__ = __import__('pkg_resources')\
@@ -55,6 +91,28 @@ TYPE_MAP = {
 }
 
 
+def make_cache_key(prefix, *parts):
+    """
+    Returns a cache key made of given prefix and the sha1 hash of given
+    parts, the key contains no whitespace or control characters and is
+    short enough for memcached
+    """
+    return '%s:%s' % (prefix, sha1(repr(parts)).hexdigest())
+
+
+def parse_facet_value(value, native_type):
+    """
+    Converts facet value read as unicode back to given native type
+    """
+    if value is None:
+        return None
+    if native_type is bool:
+        return value.lower() in ('1', 't', 'true')
+    if native_type in (int, float, Decimal):
+        return native_type(value)
+    return value
+
+
 def get_native_type(sqlalchemy_type):
     """
     Converts sqlalchemy type to python type, is smart enough to understand
@@ -74,20 +132,55 @@ class ModelMixin(object):
     :param model_class: SQLAlchemy Model class
     :param query: the query to be used for fetching the object
     :param pk_param: name of the primary key parameter
+    :param soft_delete_column: name of a boolean or timestamp column marking
+        soft deleted rows, rows marked deleted are filtered out of the query
+    :param release_connection: if True the session is closed, and its
+        connection returned to the pool, after the data is loaded and before
+        the template is rendered. The loaded objects are expunged, so the
+        template can not lazy load their unloaded attributes. Lazy context
+        values querying the database during rendering check a connection out
+        again for the duration of their query. Streamed templates keep the
+        session open.
     """
     model_class = None
     query = None
     pk_param = 'id'
+    soft_delete_column = None
+    release_connection = False
 
     def get_model(self):
         if not self.model_class:
             raise Exception()
         return self.model_class
 
-    @property
+    @cached_property
     def db(self):
+        """
+        The SQLAlchemy extension of the current application, resolved once
+        per view instance (ie. once per request)
+        """
         return current_app.extensions['sqlalchemy'].db
 
+    @cached_property
+    def session(self):
+        """
+        The session of the current request, fetched from the scoped session
+        once per view instance
+        """
+        return self.db.session()
+
+    def release_session(self):
+        """
+        Expunges the loaded objects and closes the session, which returns
+        its connection to the pool
+        """
+        self.session.expunge_all()
+        self.session.close()
+
+    def before_render(self):
+        if self.release_connection:
+            self.release_session()
+
     def get_query(self):
         """
         Returns the query associated with this view
@@ -95,28 +188,107 @@ class ModelMixin(object):
         If no query was given, tries to use the query class of the model
         """
         if self.query:
-            return self.query
-        return self.model_class.query
+            query = self.query
+        else:
+            query = self.model_class.query_class(
+                self.model_class,
+                session=self.session
+            )
+        if self.soft_delete_column:
+            query = query.filter(self.get_not_deleted_criterion())
+        return query
+
+    def get_soft_delete_type(self):
+        attr = getattr(self.model_class, self.soft_delete_column)
+        return get_native_type(attr.property.columns[0].type)
+
+    def get_not_deleted_criterion(self):
+        attr = getattr(self.model_class, self.soft_delete_column)
+        if self.get_soft_delete_type() is bool:
+            return attr == False
+        return attr == None
+
+    def filter_by_pk(self, query, pk):
+        return query.filter(getattr(self.model_class, self.pk_param) == pk)
 
     def get_object(self, **kwargs):
         pk = kwargs[self.pk_param]
+        if self.soft_delete_column:
+            return self.filter_by_pk(self.get_query(), pk).first_or_404()
         return self.get_query().get_or_404(pk)
 
 
+# static context layers of callable contexts, by view class and function
+_static_contexts = {}
+
+
 class TemplateMixin(object):
     """
     Generic template mixin
 
+    The template context is built per request from layers, variables are
+    looked up in the following order: keyword arguments given to
+    render_template, results of context providers, the static context.
+    None of the layers is copied or modified. Only the first two layers are
+    built per request, the static context is built once.
+
+    Templates are rendered with the jinja environment of the application
+    but not through flask.render_template, see flask_generic_views.context
+    for the differences.
+
     :param template: name of the template to be rendered on html request
     :param context: dict containing context arguments that will be passed
-        to template
+        to template, or a callable (or a method of the view) returning such
+        dict, which is called only once per view class. Values that change
+        between requests belong to `context_providers`.
+    :param context_providers: list of callables returning dicts of
+        additional context arguments, called on every render
     """
     template = None
     context = {}
+    context_providers = []
+
+    def load_template(self):
+        return current_app.jinja_env.get_template(self.get_template())
 
     def render_template(self, **kwargs):
         context = self.get_context(**kwargs)
-        return render_template(self.get_template(), **context)
+        self.before_render()
+        return render(self.load_template(), context)
+
+    def render_template_block(self, block, **kwargs):
+        """
+        Renders only the given block of the template
+        """
+        template = self.load_template()
+        if block not in template.blocks:
+            raise ImproperlyConfigured(
+                'Template %s has no block named %s.' % (template.name, block)
+            )
+        context = self.get_context(**kwargs)
+        self.before_render()
+        return render(template, context, block)
+
+    def stream_template(self, buffer_size=None, **kwargs):
+        """
+        Returns a streamed response that renders the template while the
+        response is being sent
+
+        :param buffer_size: if given, the rendered output is sent in chunks
+            of this many template items
+        """
+        stream = TemplateStream(
+            generate(self.load_template(), self.get_context(**kwargs))
+        )
+        if buffer_size:
+            stream.enable_buffering(buffer_size)
+        return Response(stream_with_context(stream))
+
+    def before_render(self):
+        """
+        Called after the context is built and before the template is
+        rendered, not called for streamed templates
+        """
 
     def get_template(self):
         if not self.template:
@@ -124,17 +296,35 @@ class TemplateMixin(object):
 
         return self.template
 
-    def get_context(self, **kwargs):
+    def get_static_context(self):
         """
-        Returns the context variables
+        Returns the static context layer of this view, a callable context is
+        called on the first render of the view class only
         """
-        if callable(self.context):
+        if not callable(self.context):
+            return self.context
+        # a context method is bound to a new view instance per request, the
+        # cache is keyed by its function so that it holds no view instance
+        key = (
+            self.__class__,
+            getattr(self.context, '__func__', self.context)
+        )
+        context = _static_contexts.get(key)
+        if context is None:
             context = self.context()
-        else:
-            context = self.context
-        context.update(kwargs)
+            _static_contexts[key] = context
         return context
 
+    def get_context(self, **kwargs):
+        """
+        Returns the context variables as a ContextChain
+        """
+        layers = [kwargs]
+        for provider in self.context_providers:
+            layers.append(provider())
+        layers.append(self.get_static_context())
+        return ContextChain(*layers)
+
 
 class ModelView(BaseView, ModelMixin, TemplateMixin):
     def get_template(self):
@@ -194,11 +384,20 @@ class FormMixin(object):
     :param success_redirect: endpoint to be redirected on success
     :param success_message: message to be flashed on success
     :param failure_message: message to be flashed on failure
+    :param post_commit_hooks: callables run after the write of this view
+        has been committed successfully, each called with a WriteEvent
+    :param executor: executor running the post commit hooks (and deferred
+        deletes), eg. InlineExecutor, ThreadExecutor or ProcessExecutor. By
+        default a process wide ThreadExecutor.
+    :param write_action: action of the WriteEvents of this view
     """
     form_class = None
     failure_message = ''
     success_message = ''
     success_url = None
+    post_commit_hooks = []
+    executor = None
+    write_action = None
 
     def flash(self, message, *args, **kwargs):
         """
@@ -213,14 +412,37 @@ class FormMixin(object):
     def validate_on_submit(self, form):
         return self.is_submitted() and form.validate()
 
+    def is_partial(self):
+        """
+        Returns whether the request is a partial update, in which case only
+        the submitted fields are validated and saved
+        """
+        return request.method == 'PATCH'
+
+    def get_partial_form(self, form):
+        """
+        Removes the fields that were not submitted from given form
+        """
+        for name in [field.name for field in form]:
+            if name not in request.form:
+                del form[name]
+        return form
+
     def save(self, form, object):
         """
         Validates request data and saves object, on success redirects to
         success url and flashes success message (if any)
         """
+        if self.is_partial():
+            form = self.get_partial_form(form)
         if self.validate_on_submit(form):
-            form.populate_obj(object)
-            self.db.session.commit()
+            self.populate_object(form, object)
+            if self.post_commit_hooks:
+                self.session.flush()
+                self.schedule_post_commit_hooks(
+                    getattr(object, self.pk_param)
+                )
+            self.session.commit()
 
             self.flash(self.get_success_message(), 'success')
             return True
@@ -228,6 +450,164 @@ class FormMixin(object):
             self.flash(self.get_failure_message(), 'failure')
             return False
 
+    def populate_object(self, form, object):
+        """
+        Assigns the validated data of given form to given object, called
+        only when the object is about to be saved
+        """
+        form.populate_obj(object)
+
+    def get_executor(self):
+        return self.executor or get_default_executor()
+
+    def schedule_post_commit_hooks(self, pk):
+        """
+        Schedules the post commit hooks of this view for the object with
+        given primary key, the hooks are run if the current transaction
+        commits
+        """
+        if not self.post_commit_hooks:
+            return
+        schedule(
+            self.session,
+            self.get_executor(),
+            self.post_commit_hooks,
+            WriteEvent(
+                underscore(self.model_class.__name__),
+                pk,
+                self.write_action
+            )
+        )
+
+
+class VersionMixin(object):
+    """
+    Optimistic concurrency control for update views
+
+    When enabled the client must send the version of the object it edited,
+    either as a form field or as an If-Match header (the version is given
+    to clients as the ETag and as the `version` template variable). Updates
+    of outdated versions are rejected with 409 (form field) or 412
+    (If-Match) and requests without version with 428. No rows are locked.
+
+    With a custom version column the submitted version is checked before
+    the form is validated, the version is incremented with a conditional
+    UPDATE only once the form is valid, in the transaction that saves the
+    object, so that concurrent updates of the same version can not both
+    succeed and rejected updates never increment it. VersionMixin must
+    precede the form view in the bases of the view.
+
+    :param optimistic_locking: enables version checks
+    :param version_column: name of the version column, by default the
+        version_id_col of the model mapper is used
+    :param version_param: name of the form field holding the version
+    """
+    optimistic_locking = False
+    version_column = None
+    version_param = 'version'
+
+    def get_version_column(self):
+        mapper = class_mapper(self.model_class)
+        if self.version_column:
+            return mapper.get_property(self.version_column).columns[0]
+        if mapper.version_id_col is None:
+            raise ImproperlyConfigured(
+                'Model %s has no version_id_col, you must specify the '
+                'version_column.' % self.model_class.__name__
+            )
+        return mapper.version_id_col
+
+    def get_version_attr(self):
+        column = self.get_version_column()
+        for prop in class_mapper(self.model_class).iterate_properties:
+            if isinstance(prop, ColumnProperty) and prop.columns[0] is column:
+                return prop.key
+
+    def uses_mapper_versioning(self):
+        column = self.get_version_column()
+        return class_mapper(self.model_class).version_id_col is column
+
+    def get_version(self, item):
+        return unicode(getattr(item, self.get_version_attr()))
+
+    def get_submitted_version(self):
+        """
+        Returns the version sent by the client and the status code to be
+        used if the version is outdated
+        """
+        if 'If-Match' in request.headers:
+            etags = list(request.if_match)
+            if len(etags) != 1:
+                abort(412)
+            return etags[0], 412
+        if self.version_param in request.form:
+            return request.form[self.version_param], 409
+        raise PreconditionRequired()
+
+    def remove_version_field(self, form):
+        """
+        Removes the version field from given form, the version is never
+        assigned from request data
+        """
+        attr = self.get_version_attr()
+        if attr in form:
+            del form[attr]
+        return form
+
+    def check_version(self, item):
+        """
+        Aborts if the submitted version does not match the version of given
+        item
+        """
+        version, status = self.get_submitted_version()
+        if version != self.get_version(item):
+            abort(status)
+
+    def increment_version(self, item):
+        """
+        Increments the custom version column of given item with a
+        conditional UPDATE, aborts if the version was changed concurrently
+        """
+        version, status = self.get_submitted_version()
+        attr = self.get_version_attr()
+        column = getattr(self.model_class, attr)
+        current = getattr(item, attr)
+        query = self.filter_by_pk(
+            self.get_query(),
+            getattr(item, self.pk_param)
+        )
+        count = query.filter(column == current) \
+            .update({column: column + 1}, synchronize_session=False)
+        if not count:
+            abort(status)
+        set_committed_value(item, attr, current + 1)
+
+    def populate_object(self, form, item):
+        super(VersionMixin, self).populate_object(form, item)
+        if self.optimistic_locking and self.is_submitted() and \
+                not self.uses_mapper_versioning():
+            self.increment_version(item)
+
+    def save_versioned(self, form, item):
+        """
+        Same as save but checks the version of given item first
+        """
+        if not self.optimistic_locking:
+            return self.save(form, item)
+        self.remove_version_field(form)
+        if self.is_submitted():
+            self.check_version(item)
+        try:
+            return self.save(form, item)
+        except StaleDataError:
+            self.session.rollback()
+            abort(409)
+
+    def set_etag(self, response, item):
+        if self.optimistic_locking:
+            response.set_etag(self.get_version(item))
+        return response
+
 
 class FormView(BaseView, FormMixin):
     def get_form(self, obj=None):
@@ -275,7 +655,7 @@ class ModelFormView(ModelView, FormMixin):
         """
         if self.form_class:
             return self.form_class(request.form, obj=obj)
-        return model_form(self.model_class, db_session=self.db.session)(
+        return model_form(self.model_class, db_session=self.session)(
             request.form, obj=obj
         )
 
@@ -335,14 +715,15 @@ class CreateFormView(ModelFormView):
     success_message = '%(model)s created!'
     success_url = '%(resource)s.show'
     methods = ['GET', 'POST']
+    write_action = 'create'
 
     def get_object(self):
         object = self.model_class()
-        self.db.session.add(object)
+        self.session.add(object)
         return object
 
 
-class UpdateFormView(ModelFormView):
+class UpdateFormView(VersionMixin, ModelFormView):
     """
     Generic update form view
 
@@ -359,11 +740,27 @@ class UpdateFormView(ModelFormView):
 
     form: A form instance representing the form for editing the object. This
     lets you refer to form fields easily in the template system.
+
+    version: The version of the object, if optimistic locking is enabled
+    (see VersionMixin).
     """
     template = '%(resource)s/edit.html'
     success_message = '%(model)s updated!'
     success_url = '%(resource)s.show'
     methods = ['GET', 'POST', 'PUT', 'PATCH']
+    write_action = 'update'
+
+    def dispatch_request(self, *args, **kwargs):
+        item = self.get_object(**kwargs)
+        form = self.get_form(obj=item)
+        if self.save_versioned(form, item):
+            return redirect(url_for(self.get_success_redirect(), id=item.id))
+
+        context = dict(item=item, form=form)
+        if self.optimistic_locking:
+            context['version'] = self.get_version(item)
+        response = make_response(self.render_template(**context))
+        return self.set_etag(response, item)
 
 
 class CreateView(ModelFormView):
@@ -376,10 +773,11 @@ class CreateView(ModelFormView):
     methods = ['POST']
     success_message = '%(model)s created!'
     success_url = '%(resource)s.show'
+    write_action = 'create'
 
     def get_object(self):
         object = self.model_class()
-        self.db.session.add(object)
+        self.session.add(object)
         return object
 
     def dispatch_request(self, *args, **kwargs):
@@ -390,35 +788,145 @@ class CreateView(ModelFormView):
         return redirect(url_for(self.get_success_redirect(), id=item.id))
 
 
-class UpdateView(ModelFormView):
+class UpdateView(VersionMixin, ModelFormView):
     """
     Updates a model object
 
     By default on html request redirects to resource.show and creates a
     simple success message
+
+    PATCH requests only validate and save the submitted fields. See
+    VersionMixin for optimistic locking.
+
+    :param direct_update: if True, PATCH requests are saved with a single
+        UPDATE statement without loading the object first. Only column
+        fields are supported.
     """
     methods = ['PUT', 'PATCH']
     success_message = '%(model)s updated!'
     success_url = '%(resource)s.show'
+    direct_update = False
+    write_action = 'update'
+
+    def get_update_values(self, form):
+        """
+        Returns a dict of column attributes and values of given form
+        """
+        mapper = class_mapper(self.model_class)
+        values = {}
+        for field in form:
+            prop = mapper.get_property(field.name)
+            if not isinstance(prop, ColumnProperty):
+                raise ImproperlyConfigured(
+                    'Field %s is not a column and can not be updated '
+                    'directly.' % field.name
+                )
+            values[field.name] = field.data
+        return values
+
+    def save_directly(self, form, pk):
+        """
+        Validates the submitted fields and saves them with an
+        UPDATE ... WHERE pk = statement, returns 404 if no row was updated
+        """
+        form = self.get_partial_form(form)
+        if self.optimistic_locking:
+            self.remove_version_field(form)
+            version, status = self.get_submitted_version()
+        if not form.validate():
+            self.flash(self.get_failure_message(), 'failure')
+            return False
+
+        values = self.get_update_values(form)
+        if values:
+            primary_key = getattr(self.model_class, self.pk_param)
+            query = self.get_query().filter(primary_key == pk)
+            if self.optimistic_locking:
+                attr = self.get_version_attr()
+                column = getattr(self.model_class, attr)
+                query = query.filter(column == version)
+                values[attr] = column + 1
+            count = query.update(values, synchronize_session=False)
+            if not count:
+                if self.optimistic_locking and \
+                        self.filter_by_pk(self.get_query(), pk).first():
+                    abort(status)
+                abort(404)
+            self.schedule_post_commit_hooks(pk)
+            self.session.commit()
+        else:
+            item = self.filter_by_pk(self.get_query(), pk).first()
+            if item is None:
+                abort(404)
+            if self.optimistic_locking and version != self.get_version(item):
+                abort(status)
+
+        self.flash(self.get_success_message(), 'success')
+        return True
 
     def dispatch_request(self, *args, **kwargs):
+        if self.direct_update and self.is_partial():
+            pk = kwargs[self.pk_param]
+            self.save_directly(self.get_form(), pk)
+            return redirect(url_for(self.get_success_redirect(), id=pk))
+
         item = self.get_object(**kwargs)
         form = self.get_form(obj=item)
-        self.save(form, item)
+        self.save_versioned(form, item)
 
         return redirect(url_for(self.get_success_redirect(), id=item.id))
 
 
+def purge_object(app, model_class, pk):
+    """
+    Deletes the object of given model class and primary key with its
+    cascades, used for deferred deletes outside of the request. The request
+    may run in the same thread (eg. with InlineExecutor), so a session of
+    its own is used and the application context is only pushed, and popped
+    which removes the scoped session, if the thread has none.
+    """
+    ctx = None
+    if not has_app_context():
+        ctx = app.app_context()
+        ctx.push()
+    session = app.extensions['sqlalchemy'].db.create_scoped_session()
+    try:
+        item = session.query(model_class).get(pk)
+        if item is not None:
+            session.delete(item)
+            session.commit()
+    finally:
+        session.remove()
+        if ctx is not None:
+            ctx.pop()
+
+
 class DeleteView(ModelFormView):
     """
     Deletes a model object
 
     By default on html request redirects to resource.index and creates a
     simple success message
+
+    :param delete_strategy: how the object is deleted
+
+        'session'   loads the object and deletes it with the session,
+                    relationship cascades are handled by SQLAlchemy
+                    (the default)
+        'soft'      marks the object deleted by setting the
+                    `soft_delete_column` with a single UPDATE statement
+        'direct'    deletes the row with a single DELETE ... WHERE pk =
+                    statement, cascades must be handled by the database
+        'deferred'  returns 202 immediately and deletes the object with the
+                    session in a background worker
+
+    Post commit hooks are not run for deferred deletes.
     """
     methods = ['DELETE', 'POST']
     success_message = '%(model)s deleted.'
     success_url = '%(resource)s.index'
+    delete_strategy = 'session'
+    write_action = 'delete'
 
     def delete(self, item):
         """
@@ -426,18 +934,97 @@ class DeleteView(ModelFormView):
 
         Child classes may override the behaviour of this method
         """
-        self.db.session.delete(item)
+        self.session.delete(item)
+
+    def soft_delete(self, pk):
+        if not self.soft_delete_column:
+            raise ImproperlyConfigured(
+                'You must specify the soft_delete_column for soft deletes.'
+            )
+        if self.get_soft_delete_type() is bool:
+            value = True
+        else:
+            value = datetime.utcnow()
+        count = self.filter_by_pk(self.get_query(), pk).update(
+            {self.soft_delete_column: value},
+            synchronize_session=False
+        )
+        if not count:
+            abort(404)
+
+    def delete_directly(self, pk):
+        count = self.filter_by_pk(self.get_query(), pk) \
+            .delete(synchronize_session=False)
+        if not count:
+            abort(404)
+
+    def defer_delete(self, pk):
+        executor = self.get_executor()
+        if isinstance(executor, ProcessExecutor):
+            raise ImproperlyConfigured(
+                'Deferred deletes need the application and can not be run '
+                'by a ProcessExecutor, use a ThreadExecutor.'
+            )
+        if not self.filter_by_pk(self.get_query(), pk).count():
+            abort(404)
+        try:
+            executor.submit(
+                purge_object,
+                current_app._get_current_object(),
+                self.model_class,
+                pk
+            )
+        except Full:
+            abort(503)
+        return Response(status=202)
 
     def dispatch_request(self, *args, **kwargs):
-        item = self.get_object(**kwargs)
-        self.delete(item)
-        self.db.session.commit()
+        strategy = self.delete_strategy
+        if strategy == 'deferred':
+            return self.defer_delete(kwargs[self.pk_param])
+
+        if strategy == 'session':
+            self.delete(self.get_object(**kwargs))
+        elif strategy == 'soft':
+            self.soft_delete(kwargs[self.pk_param])
+        elif strategy == 'direct':
+            self.delete_directly(kwargs[self.pk_param])
+        else:
+            raise ImproperlyConfigured(
+                'Unknown delete strategy %s.' % strategy
+            )
+        self.schedule_post_commit_hooks(kwargs[self.pk_param])
+        self.session.commit()
 
         self.flash(self.get_success_message(), 'success')
         return redirect(url_for(self.get_success_redirect()))
 
 
-class ListView(ModelView):
+_param_schemas = {}
+
+
+class ParamSchemaMixin(object):
+    """
+    Base of the list views and mixins that add parameters to the query
+    string schema of a view. Each of them extends `get_param_schema_key`
+    and `get_param_schema_kwargs` and calls super, so that the mixins keep
+    their parameters in any combination of views.
+    """
+    def get_param_schema_key(self):
+        """
+        Returns a hashable key identifying the configuration the query
+        string schema of this view is compiled from
+        """
+        return ()
+
+    def get_param_schema_kwargs(self):
+        """
+        Returns the keyword arguments of the ParamSchema of this view
+        """
+        return {}
+
+
+class ListView(ModelView, ParamSchemaMixin):
     """
     Views several items as a list
 
@@ -445,6 +1032,7 @@ class ListView(ModelView):
                     this is model.query (= all records for given model)
     """
     template = '%(resource)s/index.html'
+    params = None
 
     def __init__(self,
         query_field_names=None,
@@ -478,6 +1066,52 @@ class ListView(ModelView):
     def execute_query(self, pagination):
         return pagination.items
 
+    def get_filter_types(self):
+        """
+        Returns a dict of the filterable column names and their native types
+        """
+        types = {}
+        for name, alias in self.columns:
+            entity_column = self.entity_column(name)
+            if entity_column:
+                types[name] = get_native_type(entity_column[1].type)
+        return types
+
+    def get_param_schema_key(self):
+        return super(ListView, self).get_param_schema_key() + (
+            self.model_class,
+            tuple(self.columns)
+        )
+
+    def get_param_schema_kwargs(self):
+        kwargs = super(ListView, self).get_param_schema_kwargs()
+        kwargs['filters'] = self.get_filter_types()
+        return kwargs
+
+    def build_param_schema(self):
+        return ParamSchema(**self.get_param_schema_kwargs())
+
+    def get_param_schema(self):
+        """
+        Returns the ParamSchema of this view, compiled only once per view
+        class and configuration
+        """
+        key = (self.__class__,) + self.get_param_schema_key()
+        schema = _param_schemas.get(key)
+        if schema is None:
+            schema = self.build_param_schema()
+            _param_schemas[key] = schema
+        return schema
+
+    def get_params(self):
+        """
+        Returns the ListParams parsed from the query string of the current
+        request
+        """
+        if self.params is None:
+            self.params = self.get_param_schema().parse(request.args)
+        return self.params
+
     def entity_column(self, column):
         entities = [entity.entity_zero.class_ for entity in \
             self.get_query()._entities]
@@ -490,75 +1124,299 @@ class ListView(ModelView):
 
 
 class SearchMixin(object):
-    def append_filters(self, query):
-        for row in self.columns:
-            name, alias = row
-            if name not in request.args:
-                continue
+    """
+    Filters the items by the request parameters named after the columns
+
+    :param facets: names of the columns for which facet counts (number of
+        items per value) are computed, see get_facet_counts
+    :param facet_cache: werkzeug cache object used for caching the facet
+        counts per filter signature, None disables caching. Cached counts
+        are not invalidated by writes, they can be up to
+        `facet_cache_timeout` seconds stale.
+    :param facet_cache_timeout: number of seconds facet counts are cached
+    """
+    facets = []
+    facet_cache = None
+    facet_cache_timeout = 60
 
-            attr, column = self.entity_column(name)
-            if not attr:
+    def append_filters(self, query, exclude=None):
+        """
+        Applies the filters of the request to given query
+
+        :param exclude: name of a column whose filter is not applied
+        """
+        for name, value in self.get_params().filters:
+            if name == exclude:
                 continue
 
-            native_type = get_native_type(column.type)
-            value = request.args[name]
-            if native_type in (str, unicode):
+            attr, column = self.entity_column(name)
+            if isinstance(value, basestring):
                 query = query.filter(attr.startswith(value))
-            elif native_type is bool:
-                if value == 'y':
-                    query = query.filter(attr == True)
-                elif value == 'n':
-                    query = query.filter(attr == False)
-            elif native_type is int:
-                if value != '' and value != '__None':
-                    try:
-                        value = int(value)
-                        query = query.filter(attr == value)
-                    except ValueError:
-                        pass
+            else:
+                query = query.filter(attr == value)
         return query
 
+    def facet_query(self, name):
+        """
+        Returns a query counting the items per value of given column with
+        all active filters except the filter of the column itself
+        """
+        attr = self.entity_column(name)[0]
+        return self.append_filters(self.get_query(), exclude=name) \
+            .with_entities(
+                literal(name, Unicode),
+                cast(attr, Unicode),
+                func.count()
+            ) \
+            .group_by(attr)
+
+    def execute_facet_counts(self):
+        queries = [self.facet_query(name) for name in self.facets]
+        query = queries[0].union_all(*queries[1:])
+        counts = dict((name, []) for name in self.facets)
+        for name, value, count in query:
+            native_type = get_native_type(self.entity_column(name)[1].type)
+            counts[name].append((parse_facet_value(value, native_type), count))
+        for values in counts.values():
+            values.sort()
+        return counts
+
+    def get_facet_counts(self):
+        """
+        Returns a dict of facet column names and lists of (value, count)
+        tuples. All facets are counted with a single UNION ALL query.
+        """
+        if not self.facets:
+            return {}
+        if self.facet_cache is None:
+            return self.execute_facet_counts()
+        key = make_cache_key(
+            'facets',
+            request.endpoint,
+            self.get_params().filters
+        )
+        counts = self.facet_cache.get(key)
+        if counts is None:
+            counts = self.execute_facet_counts()
+            self.facet_cache.set(key, counts, timeout=self.facet_cache_timeout)
+        return counts
+
+
+_sort_keys = {}
 
-class SortMixin(object):
+
+class SortMixin(ParamSchemaMixin):
+    """
+    Sorts the items by the `sort` request parameter
+
+    The sort parameter is a comma separated list of sort keys, keys prefixed
+    with - are sorted in descending order, eg. sort=-age,name. The items are
+    always finally ordered by the primary key of the model so that the
+    order is deterministic between pages. Unknown sort keys are rejected
+    with 400.
+
+    :param sort: the default sort
+    :param sortable: names of the columns the items can be sorted by,
+        'relationship.column' sorts by a column of a related model. Only
+        scalar relationships (eg. many-to-one) are accepted, they are outer
+        joined once per request through an alias so that they can not
+        conflict with the joins of a custom query. By default all columns
+        of the queried models are sortable.
+    """
     sort = ''
+    sortable = None
 
-    def append_sort(self, query):
-        entities = [entity.entity_zero.class_ for entity in \
-            self.get_query()._entities]
+    def get_param_schema_key(self):
+        return super(SortMixin, self).get_param_schema_key() + (
+            self.sort,
+            self.sortable and tuple(self.sortable)
+        )
 
-        self.sort = request.args.get('sort', self.sort)
-        if not self.sort:
-            return query
+    def get_param_schema_kwargs(self):
+        kwargs = super(SortMixin, self).get_param_schema_kwargs()
+        kwargs['sort_keys'] = self.get_sort_keys()
+        kwargs['sort'] = self.sort
+        return kwargs
 
-        order_by = self.sort
-        if self.sort:
-            if self.sort[0] == '-':
-                func = self.db.desc
-                order_by = self.sort[1:]
-            else:
-                func = self.db.asc
+    def get_sort_keys(self):
+        """
+        Returns a dict of the allowed sort keys and (attribute, None) or
+        (column name, relationship name) tuples, computed only once per view
+        class, queried entities and sortable columns
+        """
+        cache_key = (
+            self.__class__,
+            tuple(self.get_entities()),
+            self.sortable and tuple(self.sortable)
+        )
+        keys = _sort_keys.get(cache_key)
+        if keys is None:
+            keys = self.build_sort_keys()
+            _sort_keys[cache_key] = keys
+        return keys
+
+    def get_entities(self):
+        return [entity.entity_zero.class_ for entity in \
+            self.get_query()._entities]
 
-        if order_by:
+    def build_sort_keys(self):
+        entities = self.get_entities()
+
+        names = self.sortable
+        if names is None:
+            names = []
+            for entity in entities:
+                names.extend(entity.__table__.columns.keys())
+
+        keys = {}
+        for name in names:
+            if '.' in name:
+                relationship, column = name.split('.', 1)
+                prop = class_mapper(entities[0]).get_property(relationship)
+                if not isinstance(prop, RelationshipProperty) or \
+                        prop.uselist:
+                    raise ImproperlyConfigured(
+                        'Sort key %s: %s is not a scalar relationship, '
+                        'sorting by it would duplicate the items.' % (
+                            name, relationship
+                        )
+                    )
+                if column not in prop.mapper.class_.__table__.columns:
+                    raise ImproperlyConfigured(
+                        'Sort key %s: %s has no column %s.' % (
+                            name, prop.mapper.class_.__name__, column
+                        )
+                    )
+                keys[name] = (column, relationship)
+                continue
             for entity in entities:
-                if order_by in entity.__table__.columns:
-                    query = query.order_by(func(getattr(entity, order_by)))
+                if name in entity.__table__.columns:
+                    keys[name] = (getattr(entity, name), None)
                     break
-        return query
+        return keys
+
+    def parse_sort(self):
+        """
+        Returns the requested sort as a list of (key, descending) tuples
+        """
+        sort = list(self.get_params().sort)
+        self.sort = format_sort(sort)
+        return sort
+
+    def append_sort(self, query):
+        sort = self.parse_sort()
+        keys = self.get_sort_keys()
+        entity = self.get_query()._entities[0].entity_zero.class_
+
+        order_by = []
+        aliases = {}
+        for name, descending in sort:
+            attr, relationship = keys[name]
+            if relationship is not None:
+                alias = aliases.get(relationship)
+                if alias is None:
+                    prop = getattr(entity, relationship)
+                    alias = aliased(prop.property.mapper.class_)
+                    query = query.outerjoin(alias, prop)
+                    aliases[relationship] = alias
+                attr = getattr(alias, attr)
+            if descending:
+                order_by.append(self.db.desc(attr))
+            else:
+                order_by.append(self.db.asc(attr))
+
+        sorted_names = set([name for name, descending in sort])
+        for column in class_mapper(entity).primary_key:
+            if column.key not in sorted_names:
+                order_by.append(self.db.asc(column))
+        return query.order_by(*order_by)
 
 
-class PaginationMixin(object):
+class LazyPagination(Pagination):
+    """
+    Pagination object that counts the total number of items only when the
+    total (or something depending on it eg. pages) is first accessed
+    """
+    def __init__(self, query, page, per_page, items):
+        self.query = query
+        self.page = page
+        self.per_page = per_page
+        self.items = items
+
+    @cached_property
+    def total(self):
+        return self.query.count()
+
+
+class PaginationMixin(ParamSchemaMixin):
     """
     This mixin can be used for applying pagination functionality to Views
     (for example views that use some kind listing)
+
+    :param per_page: default number of items per page
+    :param max_per_page: maximum number of items per page clients can
+        request, larger values are rejected with 400. None means no limit.
     """
     per_page = 20
+    max_per_page = 100
     page = 1
+    yield_per = 100
+
+    def get_param_schema_key(self):
+        return super(PaginationMixin, self).get_param_schema_key() + (
+            self.per_page,
+            self.max_per_page
+        )
+
+    def get_param_schema_kwargs(self):
+        kwargs = super(PaginationMixin, self).get_param_schema_kwargs()
+        kwargs['per_page'] = self.per_page
+        kwargs['max_per_page'] = self.max_per_page
+        return kwargs
+
+    def get_page(self):
+        return self.get_params().page
+
+    def get_per_page(self):
+        return self.get_params().per_page
 
     def append_pagination(self, query):
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', self.per_page, type=int)
-        pagination = query.paginate(page, per_page)
-        return pagination
+        page = self.get_page()
+        per_page = self.get_per_page()
+        items = query.limit(per_page).offset((page - 1) * per_page).all()
+        if not items and page != 1:
+            abort(404)
+        return LazyPagination(query, page, per_page, items)
+
+    def append_lazy_pagination(self, query):
+        """
+        Same as append_pagination but the items of the page are not loaded
+        until iterated and then fetched `yield_per` rows at a time
+        """
+        page = self.get_page()
+        per_page = self.get_per_page()
+        items = query.limit(per_page).offset((page - 1) * per_page) \
+            .yield_per(self.yield_per)
+        return LazyPagination(query, page, per_page, items)
+
+    def append_row_pagination(self, query):
+        """
+        Same as append_lazy_pagination but the items are a RowResult of
+        slotted row objects holding the values of `self.columns`, the ORM
+        and the identity map of the session are bypassed
+        """
+        page = self.get_page()
+        per_page = self.get_per_page()
+        names = [name for name, alias in self.columns]
+        attrs = [self.entity_column(name)[0] for name in names]
+        items = RowResult(
+            query.limit(per_page).offset((page - 1) * per_page)
+                .with_entities(*attrs),
+            names,
+            chunk_size=self.yield_per,
+            class_name='%sRow' % self.get_model().__name__
+        )
+        return LazyPagination(query, page, per_page, items)
 
 
 class SortedListView(ListView, SortMixin, PaginationMixin, SearchMixin):
@@ -571,29 +1429,820 @@ class SortedListView(ListView, SortMixin, PaginationMixin, SearchMixin):
                             return the items ordered by name ascending
                             sort='-name'
                             return the items ordered by name descending
+    :param fragments    names of the template blocks that can be rendered
+                        on their own, eg. for ajax paging
+    :param fragment_param   request parameter used for requesting a fragment
+    :param fragment_header  request header used for requesting a fragment
+    :param stream       if True the template is rendered while the response
+                        is sent and items are fetched lazily, useful for
+                        large per_page values
+    :param stream_buffer_size   number of template items rendered per
+                        streamed chunk
+    :param row_objects  if True the items are lightweight row objects
+                        holding only the values of `columns` instead of
+                        ORM instances, they are fetched lazily and never
+                        enter the session (see RowResult)
+    :param encoders     dict of export formats and their row encoder
+                        classes, the format is given with `format_param`
+                        eg. ?format=csv returns the whole filtered and
+                        sorted result set as csv. Empty by default, ie.
+                        views have to opt in to exports, eg.
+                        encoders={'csv': CSVRowEncoder}
+    :param export_columns   names of the exported columns, required when
+                        `encoders` are given
+    :param export_chunk_size    number of rows encoded per exported chunk
+    :param export_executor  ProcessExecutor used for encoding exports in
+                        shards, its `processes` is the number of workers,
+                        eg. ProcessExecutor(processes=8). The export is
+                        split into primary key ranges of
+                        `export_shard_size` rows, each range is read and
+                        encoded by a worker process on a connection of its
+                        own (see exports). Only exports ordered by the
+                        primary key (no sort requested) are sharded.
+    :param export_shard_size    number of rows per shard
+    :param export_max_pending   maximum number of shards being encoded or
+                        encoded but not yet sent, bounds the memory used by
+                        a sharded export to about
+                        export_shard_size * export_max_pending rows
+    :param facets       names of the columns whose facet counts are given
+                        to the template as `facets`, computed only if the
+                        template uses them
     """
     form_class = None
+    stream = False
+    row_objects = False
+    stream_buffer_size = 50
+    fragments = ['items', 'pagination']
+    fragment_param = 'fragment'
+    fragment_header = 'X-Fragment'
+    encoders = {}
+    export_columns = None
+    format_param = 'format'
+    export_chunk_size = 500
+    export_executor = None
+    export_shard_size = 10000
+    export_max_pending = 4
+
+    def get_param_schema_key(self):
+        return super(SortedListView, self).get_param_schema_key() + (
+            tuple(self.fragments),
+            self.fragment_param,
+            tuple(self.encoders),
+            self.format_param
+        )
+
+    def get_param_schema_kwargs(self):
+        kwargs = super(SortedListView, self).get_param_schema_kwargs()
+        kwargs.update(
+            fragments=self.fragments,
+            formats=self.encoders,
+            fragment_param=self.fragment_param,
+            format_param=self.format_param
+        )
+        return kwargs
+
+    def get_export_columns(self):
+        if self.export_columns is None:
+            raise ImproperlyConfigured(
+                'You must either specify export_columns, or override '
+                '`get_export_columns()` method.'
+            )
+        return self.export_columns
+
+    def get_encoder(self):
+        """
+        Returns the row encoder for the requested export format or None if
+        no format was requested
+        """
+        format = self.get_params().format
+        if not format:
+            return None
+        names = list(self.get_export_columns())
+        types = [get_native_type(self.entity_column(name)[1].type)
+            for name in names]
+        return self.encoders[format](names, types, self.export_chunk_size)
+
+    def export(self, query, encoder):
+        """
+        Returns a streamed response of the rows of given query encoded with
+        given encoder. Rows are read as plain tuples from the database
+        cursor, no ORM objects are built.
+        """
+        if self.can_shard_export():
+            return self.export_shards(query, encoder)
+        attrs = [self.entity_column(name)[0] for name in encoder.names]
+        statement = query.with_entities(*attrs).statement \
+            .execution_options(stream_results=True)
+        result = self.session.execute(statement)
+        return Response(
+            stream_with_context(encoder.iter_chunks(result)),
+            mimetype=encoder.mimetype
+        )
+
+    def get_export_engine(self):
+        return self.session.get_bind(mapper=class_mapper(self.get_model()))
+
+    def can_shard_export(self):
+        """
+        Returns True if the export can be split into primary key ranges,
+        which is only possible when the items are ordered by a single
+        primary key column and the database is reachable from the workers
+        """
+        if self.export_executor is None:
+            return False
+        primary_key = class_mapper(self.get_model()).primary_key
+        if len(primary_key) != 1:
+            return False
+        if self.get_params().sort not in ((), ((primary_key[0].key, False),)):
+            return False
+        return is_shared(self.get_export_engine())
+
+    def export_shards(self, query, encoder):
+        """
+        Same as export but the rows are read and encoded by primary key
+        ranges in the worker processes of `export_executor`, the encoded
+        ranges are streamed in order
+        """
+        primary_key = class_mapper(self.get_model()).primary_key[0]
+        columns = [self.entity_column(name) for name in encoder.names]
+        statement = ShardStatement(
+            query,
+            [attr for attr, column in columns],
+            [column.type for attr, column in columns],
+            primary_key,
+            self.get_export_engine()
+        )
+        arguments = (
+            (statement.url,) + statement.get_arguments(lo, hi) + (
+                statement.types,
+                encoder.__class__,
+                encoder.names,
+                encoder.types
+            )
+            for lo, hi in iter_ranges(
+                query,
+                primary_key,
+                self.export_shard_size
+            )
+        )
+        fragments = self.export_executor.imap(
+            encode_shard,
+            arguments,
+            max_pending=self.export_max_pending
+        )
+        return Response(
+            stream_with_context(encoder.iter_document(fragments)),
+            mimetype=encoder.mimetype
+        )
+
+    def get_fragment(self):
+        """
+        Returns the name of the requested template block or None if the
+        whole template should be rendered
+        """
+        fragment = self.get_params().fragment
+        if fragment:
+            return fragment
+        fragment = request.headers.get(self.fragment_header)
+        if not fragment:
+            return None
+        if fragment not in self.fragments:
+            abort(400)
+        return fragment
 
     def dispatch_request(self):
         query = self.append_filters(self.get_query())
         query = self.append_sort(query)
-        pagination = self.append_pagination(query)
+        encoder = self.get_encoder()
+        if encoder:
+            return self.export(query, encoder)
+
+        if self.row_objects:
+            pagination = self.append_row_pagination(query)
+        elif self.stream:
+            pagination = self.append_lazy_pagination(query)
+        else:
+            pagination = self.append_pagination(query)
         items = self.execute_query(pagination)
 
         form = None
         if self.form_class:
-            form = self.form_class()
+            form = LazyValue(self.form_class)
 
-        return self.render_template(
+        context = dict(
             items=items,
             columns=self.columns,
             sort=self.sort,
             per_page=pagination.per_page,
             page=pagination.page,
-            total_items=pagination.total,
-            pages=pagination.pages,
+            total_items=LazyValue(getattr, pagination, 'total'),
+            pages=LazyValue(getattr, pagination, 'pages'),
+            facets=LazyValue(self.get_facet_counts),
             form=form
         )
+        fragment = self.get_fragment()
+        if fragment:
+            response = make_response(
+                self.render_template_block(fragment, **context)
+            )
+        elif self.stream:
+            response = self.stream_template(
+                buffer_size=self.stream_buffer_size,
+                **context
+            )
+        else:
+            response = make_response(self.render_template(**context))
+        # fragments and full pages share the url when requested via header
+        response.vary.add(self.fragment_header)
+        return response
+
+
+class RelatedListView(SortedListView):
+    """
+    Lists the related objects of a parent object, eg. /users/<id>/orders
+
+    The existence of the parent is checked with an EXISTS query before the
+    items are listed, so a missing parent returns 404 also for exports and
+    streamed lists. When the relationship is a plain one-to-many
+    relationship the parent object is never loaded, the items are filtered
+    by the foreign key column. Other relationships fall back to loading the
+    parent.
+
+    Filters, sorting and pagination work as in SortedListView.
+
+    :param relationship  the relationship property of the parent model
+    :param parent_param  name of the url parameter holding the primary key
+                         of the parent object
+    """
+    relationship = None
+    parent_param = 'id'
+
+    def parent_exists_clause(self):
+        primary_key = self.relationship.parent.primary_key[0]
+        return exists().where(primary_key == self.parent_id)
+
+    def parent_exists(self):
+        return self.session.query(self.parent_exists_clause()).scalar()
+
+    def get_foreign_keys(self):
+        """
+        Returns the child columns referencing the parent primary key or None
+        if the items can not be filtered by foreign keys
+        """
+        prop = self.relationship
+        if prop.secondary is not None or prop.direction is not ONETOMANY:
+            return None
+        primary_key = prop.parent.primary_key
+        if len(primary_key) != 1:
+            return None
+        columns = [remote for local, remote in prop.local_remote_pairs
+            if local is primary_key[0]]
+        return columns or None
+
+    def append_parent_filter(self, query):
+        foreign_keys = self.get_foreign_keys()
+        if foreign_keys is None:
+            parent = self.relationship.parent.class_.query \
+                .get_or_404(self.parent_id)
+            return query.with_parent(parent, self.relationship.key)
+
+        for column in foreign_keys:
+            query = query.filter(column == self.parent_id)
+        return query
+
+    def append_filters(self, query, exclude=None):
+        query = SortedListView.append_filters(self, query, exclude)
+        return self.append_parent_filter(query)
+
+    def dispatch_request(self, *args, **kwargs):
+        self.parent_id = kwargs[self.parent_param]
+        if not self.parent_exists():
+            abort(404)
+        return SortedListView.dispatch_request(self)
+
+
+class AggregateView(ListView, SearchMixin):
+    """
+    Computes grouped aggregates of the items in SQL, using the same filters
+    as SortedListView
+
+    Example ::
+
+        >>> app.add_url_rule('/users/aggregate',
+        ...     view_func=AggregateView.as_view('aggregate',
+        ...         model_class=User,
+        ...         group_by_columns=['name'],
+        ...         aggregates={'age': ['sum', 'avg', 'max']},
+        ...     )
+        ... )
+
+    Now GET /users/aggregate?group_by=name&aggregate=avg:age&age=35 returns
+    the number of items and their average age per name for the users aged
+    35. Every result row has a `count` column and a `<func>_<column>` column
+    per requested aggregate.
+
+    :param group_by_columns: names of the columns that can be grouped by
+    :param aggregates: dict of column names and the aggregate functions
+        (count, sum, avg, min, max) allowed for them
+    :param cache: werkzeug cache object (eg. SimpleCache) used for caching
+        the results per group_by, aggregates and filters, None disables
+        caching. Cached results are not invalidated by writes, they can be
+        up to `cache_timeout` seconds stale.
+    :param cache_timeout: number of seconds the results are cached
+    :param format_param: request parameter used for requesting json
+    """
+    template = '%(resource)s/aggregate.html'
+    group_by_columns = []
+    aggregates = {}
+    cache = None
+    cache_timeout = 60
+    format_param = 'format'
+    aggregate_types = {
+        'count': int,
+        'avg': Decimal,
+    }
+
+    def get_group_by(self):
+        names = request.args.getlist('group_by')
+        for name in names:
+            if name not in self.group_by_columns:
+                abort(400)
+        return names
+
+    def get_aggregates(self):
+        """
+        Returns a list of (function, column name) tuples of the requested
+        aggregates
+        """
+        aggregates = []
+        for value in request.args.getlist('aggregate'):
+            for aggregate in value.split(','):
+                func_name, sep, name = aggregate.partition(':')
+                if func_name not in self.aggregates.get(name, ()):
+                    abort(400)
+                aggregates.append((func_name, name))
+        return aggregates
+
+    def get_labels(self, group_by, aggregates):
+        return group_by + ['count'] + [
+            '%s_%s' % aggregate for aggregate in aggregates
+        ]
+
+    def get_types(self, group_by, aggregates):
+        types = []
+        for name in group_by:
+            types.append(get_native_type(self.entity_column(name)[1].type))
+        types.append(int)
+        for func_name, name in aggregates:
+            types.append(self.aggregate_types.get(
+                func_name,
+                get_native_type(self.entity_column(name)[1].type)
+            ))
+        return types
+
+    def execute_aggregate(self, group_by, aggregates):
+        """
+        Runs the grouped aggregate query and returns its rows as tuples
+        """
+        query = self.append_filters(self.get_query())
+        group_attrs = [self.entity_column(name)[0] for name in group_by]
+        entities = group_attrs + [func.count()]
+        for func_name, name in aggregates:
+            attr = self.entity_column(name)[0]
+            entities.append(getattr(func, func_name)(attr))
+        query = query.with_entities(*entities)
+        if group_attrs:
+            query = query.group_by(*group_attrs).order_by(*group_attrs)
+        return [tuple(row) for row in query]
+
+    def get_rows(self, group_by, aggregates):
+        if self.cache is None:
+            return self.execute_aggregate(group_by, aggregates)
+        key = make_cache_key(
+            'aggregate',
+            request.endpoint,
+            group_by,
+            aggregates,
+            self.get_params().filters
+        )
+        rows = self.cache.get(key)
+        if rows is None:
+            rows = self.execute_aggregate(group_by, aggregates)
+            self.cache.set(key, rows, timeout=self.cache_timeout)
+        return rows
+
+    def dispatch_request(self, *args, **kwargs):
+        group_by = self.get_group_by()
+        aggregates = self.get_aggregates()
+        rows = self.get_rows(group_by, aggregates)
+        labels = self.get_labels(group_by, aggregates)
+
+        if request.args.get(self.format_param) == 'json':
+            encoder = JSONRowEncoder(
+                labels,
+                self.get_types(group_by, aggregates)
+            )
+            return Response(
+                ''.join(encoder.iter_chunks(rows)),
+                mimetype=encoder.mimetype
+            )
+        return self.render_template(
+            columns=labels,
+            rows=rows,
+            group_by=group_by,
+            aggregates=aggregates
+        )
+
+
+class ImportView(BaseView, ModelMixin):
+    """
+    Bulk loads CSV or newline delimited JSON uploads into the table of the
+    model, eg. POST /users/import
+
+    The upload is read line by line, either from the request body (the
+    format is chosen by its content type) or from the `upload_field` file of
+    a multipart form. The rows are coerced into the native types of the
+    columns, validated and inserted `batch_size` rows at a time with one
+    executemany statement per batch and set of given columns, so memory use
+    does not grow with the size of the upload. Columns missing from a row
+    get their default. No ORM objects are built, so ORM events and
+    post-commit hooks are not run for imported rows.
+
+    The response is streamed as newline delimited JSON: a progress object
+    per batch holding the errors of the invalid rows of that batch, eg. ::
+
+        {"processed": 1000, "imported": 998, "failed": 2,
+         "errors": [{"line": 12, "errors": {"age": "Not a valid integer."}}]}
+
+    and finally a summary object with "done": true.
+
+    :param decoders: dict of content types and their row decoder classes
+    :param import_columns: names of the columns that can be imported, by
+        default all columns except autoincremented integer primary keys
+    :param batch_size: number of rows validated and inserted at a time
+    :param atomic: if True the whole upload is committed at once and
+        nothing is imported if any batch fails to insert, by default each
+        batch is committed on its own
+    :param upload_field: name of the file field of multipart uploads
+    """
+    methods = ['POST']
+    decoders = {
+        'text/csv': CSVRowDecoder,
+        'application/x-ndjson': NDJSONRowDecoder
+    }
+    import_columns = None
+    batch_size = 1000
+    atomic = False
+    upload_field = 'file'
+
+    def get_import_columns(self):
+        table = self.get_model().__table__
+        if self.import_columns is not None:
+            return [table.columns[name] for name in self.import_columns]
+        return [column for column in table.columns
+            if not (column.primary_key and column.autoincrement and
+                get_native_type(column.type) is int)]
+
+    def get_required_columns(self):
+        """
+        Returns the names of the import columns that must have a value
+        """
+        return [column.key for column in self.get_import_columns()
+            if not column.nullable and column.default is None and
+                column.server_default is None]
+
+    def get_upload(self):
+        """
+        Returns the uploaded file-like object and its content type
+        """
+        if request.mimetype == 'multipart/form-data':
+            upload = request.files.get(self.upload_field)
+            if upload is None:
+                raise InvalidParams({self.upload_field: 'No file uploaded.'})
+            return upload.stream, upload.mimetype
+        return request.stream, request.mimetype
+
+    def get_decoder(self, mimetype):
+        decoder_class = self.decoders.get(mimetype)
+        if decoder_class is None:
+            abort(415)
+        columns = self.get_import_columns()
+        return decoder_class(
+            [column.key for column in columns],
+            [get_native_type(column.type) for column in columns]
+        )
+
+    def validate_batch(self, decoder, batch):
+        """
+        Decodes and validates given list of (line number, raw values)
+        tuples, returns a list of valid values and a list of row errors
+        """
+        valid = []
+        errors = []
+        for line, raw_values in batch:
+            if raw_values is None:
+                errors.append(dict(
+                    line=line,
+                    errors={'row': 'Could not be read.'}
+                ))
+                continue
+            values, row_errors = decoder.decode(raw_values)
+            for name in self.required_columns:
+                if values.get(name) is None and name not in row_errors:
+                    row_errors[name] = 'This field is required.'
+            if row_errors:
+                errors.append(dict(line=line, errors=row_errors))
+            else:
+                valid.append(values)
+        return valid, errors
+
+    def insert_batch(self, values):
+        """
+        Inserts given rows with one executemany statement per set of given
+        columns, as every row of an executemany must have the same columns
+        and missing columns must be left to their defaults
+        """
+        table = self.get_model().__table__
+        groups = {}
+        order = []
+        for row in values:
+            key = frozenset(row)
+            if key not in groups:
+                groups[key] = []
+                order.append(key)
+            groups[key].append(row)
+        for key in order:
+            self.session.execute(table.insert(), groups[key])
+
+    def import_batch(self, decoder, batch, totals):
+        """
+        Validates and inserts given batch, returns the errors of its rows
+        """
+        values, errors = self.validate_batch(decoder, batch)
+        if values:
+            try:
+                self.insert_batch(values)
+                if not self.atomic:
+                    self.session.commit()
+            except SQLAlchemyError:
+                self.session.rollback()
+                current_app.logger.exception('Import of a batch failed')
+                if self.atomic:
+                    raise
+                errors.append(dict(
+                    line=batch[0][0],
+                    errors={'batch': 'Lines %d-%d could not be inserted.' % (
+                        batch[0][0], batch[-1][0]
+                    )}
+                ))
+                values = []
+        totals['processed'] += len(batch)
+        totals['imported'] += len(values)
+        totals['failed'] += len(batch) - len(values)
+        return errors
+
+    def iter_progress(self, decoder, stream):
+        totals = dict(processed=0, imported=0, failed=0)
+        batch = []
+        rows = decoder.iter_rows(stream)
+        while True:
+            for row in rows:
+                batch.append(row)
+                if len(batch) == self.batch_size:
+                    break
+            if not batch:
+                break
+            try:
+                errors = self.import_batch(decoder, batch, totals)
+            except SQLAlchemyError:
+                yield json.dumps(dict(
+                    done=True,
+                    processed=totals['processed'] + len(batch),
+                    imported=0,
+                    failed=totals['processed'] + len(batch),
+                    errors=[{'line': batch[0][0], 'errors': {
+                        'batch': 'Could not be inserted, nothing imported.'
+                    }}]
+                )) + '\n'
+                return
+            yield json.dumps(dict(totals, errors=errors)) + '\n'
+            batch = []
+        if self.atomic:
+            self.session.commit()
+        yield json.dumps(dict(totals, done=True)) + '\n'
+
+    def dispatch_request(self, *args, **kwargs):
+        stream, mimetype = self.get_upload()
+        decoder = self.get_decoder(mimetype)
+        try:
+            names = decoder.read_header(stream)
+        except ValueError:
+            raise InvalidParams({'columns': str(sys.exc_info()[1])})
+        self.required_columns = self.get_required_columns()
+        missing = [name for name in self.required_columns
+            if name not in names]
+        if missing:
+            raise InvalidParams({
+                'columns': 'Missing columns: %s.' % ', '.join(missing)
+            })
+        return Response(
+            stream_with_context(self.iter_progress(decoder, stream)),
+            mimetype='application/x-ndjson'
+        )
+
+
+class ChangeFeedView(BaseView):
+    """
+    Delivers the changes of a ChangeFeed, eg. GET /users/changes?since=42
+
+    Returns the changes after the `since` sequence number as JSON ::
+
+        {"last_seq": 45, "truncated": false, "changes": [
+            {"seq": 43, "pk": 1, "action": "update", "created": ...}, ...]}
+
+    If there are none, the request is held until a change arrives or
+    `timeout` seconds pass (long-polling). Clients pass the returned
+    last_seq as `since` of their next request; without `since` only
+    changes made after the request are returned. truncated tells the client
+    that it missed changes and should reload the whole listing.
+
+    Clients accepting text/event-stream get the changes as server-sent
+    events instead, the stream is closed after `stream_duration` seconds
+    and resumed by the client with the Last-Event-ID header.
+
+    The changes can be filtered with the `action` and `pk` parameters, both
+    can be given several times.
+
+    :param feed: the ChangeFeed
+    :param timeout: default number of seconds a long-poll is held
+    :param max_timeout: maximum number of seconds clients can request with
+        the `timeout` parameter
+    :param stream_duration: number of seconds an event stream is kept open
+    :param heartbeat: number of seconds between keep-alive comments of an
+        idle event stream
+    """
+    methods = ['GET']
+    long_lived = True
+    feed = None
+    timeout = 25
+    max_timeout = 60
+    stream_duration = 60
+    heartbeat = 15
+
+    def get_since(self):
+        since = request.args.get(
+            'since',
+            request.headers.get('Last-Event-ID'),
+        )
+        if since is None:
+            return self.feed.last_seq
+        try:
+            return int(since)
+        except ValueError:
+            raise InvalidParams({'since': 'Not a valid integer.'})
+
+    def get_timeout(self):
+        try:
+            timeout = float(request.args.get('timeout', self.timeout))
+        except ValueError:
+            raise InvalidParams({'timeout': 'Not a valid number.'})
+        if timeout != timeout or timeout in (float('inf'), float('-inf')):
+            raise InvalidParams({'timeout': 'Not a valid number.'})
+        return min(max(timeout, 0), self.max_timeout)
+
+    def get_filter(self):
+        """
+        Returns a function telling whether a change matches the requested
+        filter
+        """
+        actions = set(request.args.getlist('action'))
+        pks = set(request.args.getlist('pk'))
+
+        def match(change):
+            if actions and change.action not in actions:
+                return False
+            if pks and unicode(change.pk) not in pks:
+                return False
+            return True
+        return match
+
+    def poll(self, since, timeout, match):
+        """
+        Waits for matching changes after given sequence number, returns a
+        (changes, last seq, truncated) tuple
+        """
+        deadline = current_time() + timeout
+        while True:
+            changes, truncated = self.feed.wait(
+                since,
+                max(deadline - current_time(), 0)
+            )
+            if changes:
+                since = changes[-1].seq
+            elif truncated:
+                since = self.feed.last_seq
+            changes = filter(match, changes)
+            if changes or truncated or current_time() >= deadline:
+                return changes, since, truncated
+
+    def iter_events(self, since, match):
+        deadline = current_time() + self.stream_duration
+        while True:
+            remaining = deadline - current_time()
+            if remaining <= 0:
+                return
+            changes, since, truncated = self.poll(
+                since,
+                min(self.heartbeat, remaining),
+                match
+            )
+            if truncated:
+                yield 'event: truncated\ndata: {}\n\n'
+            for change in changes:
+                yield 'id: %d\nevent: %s\ndata: %s\n\n' % (
+                    change.seq,
+                    change.action,
+                    json.dumps(change.as_dict())
+                )
+            if not changes and not truncated:
+                yield ': keep-alive\n\n'
+
+    def get(self, **kwargs):
+        since = self.get_since()
+        match = self.get_filter()
+        if request.accept_mimetypes.best == 'text/event-stream':
+            return Response(
+                self.iter_events(since, match),
+                mimetype='text/event-stream',
+                headers={'Cache-Control': 'no-cache'}
+            )
+        changes, since, truncated = self.poll(
+            since,
+            self.get_timeout(),
+            match
+        )
+        return Response(
+            json.dumps(dict(
+                last_seq=since,
+                truncated=truncated,
+                changes=[change.as_dict() for change in changes]
+            )),
+            mimetype='application/json'
+        )
+
+
+class ProfileView(BaseView):
+    """
+    Shows the hottest functions of the views sampled by a Profiler as JSON,
+    see Profiler.report. The report can be limited to one view with the
+    `endpoint` parameter.
+
+    :param source: the Profiler whose report is shown, `profiler` is left
+        to the profiler of this view itself
+    :param limit: number of functions listed per view
+    """
+    methods = ['GET']
+    source = None
+    limit = 20
+
+    def get(self, **kwargs):
+        report = self.source.report(
+            limit=self.limit,
+            endpoint=request.args.get('endpoint')
+        )
+        return Response(
+            json.dumps({'views': report}),
+            mimetype='application/json'
+        )
+
+
+class Route(tuple):
+    """
+    Immutable route specification used by ModelRouter
+
+    :param rule: url rule, may contain %(prefix)s and %(primary_key)s
+        placeholders
+    :param view: view class
+    :param kwargs: keyword arguments passed to the view
+    """
+    __slots__ = ()
+
+    def __new__(cls, rule, view, kwargs=None):
+        return tuple.__new__(cls, (rule, view, ImmutableDict(kwargs or {})))
+
+    rule = property(itemgetter(0))
+    view = property(itemgetter(1))
+    kwargs = property(itemgetter(2))
+
+    def replace(self, **changes):
+        """
+        Returns a new Route with given fields replaced
+        """
+        return Route(
+            changes.get('rule', self.rule),
+            changes.get('view', self.view),
+            changes.get('kwargs', self.kwargs)
+        )
 
 
 class ModelRouter(object):
@@ -607,6 +2256,9 @@ class ModelRouter(object):
     create   POST    /
     update   PUT     /<int:id>
     delete   DELETE  /<int:id>
+    import   POST    /import        (with importer=True)
+    changes  GET     /changes       (with change_feed)
+    profile  GET     /profile       (with profiler)
 
     Supports both natural and surrogate primary keys for models, however it
     does not yet support composite primary keys.
@@ -633,26 +2285,62 @@ class ModelRouter(object):
 
     :param decorators decorators to be passed to all views within this router
     :param model_class model_class to be passed to all views
+    :param throttle Throttle instance applied to all views within this
+        router, requests are throttled before any other decorator is run
+    :param view_kwargs keyword arguments passed to all views of the model
+        of this router, eg. view_kwargs={'soft_delete_column': 'deleted_at'}.
+        Child routes (see add_child) only get the keyword arguments given
+        to add_child.
+    :param snapshots Snapshots instance, if given the show and index pages
+        are served from pre-rendered snapshots which the write views of
+        this router keep up to date
+    :param importer if True an import route (POST /import, see ImportView)
+        creates items in bulk from uploaded files
+    :param change_feed ChangeFeed instance, if given the write views of
+        this router feed their changes to it and a changes route
+        (GET /changes, see ChangeFeedView) delivers them
+    :param profiler Profiler instance, if given the views of this router
+        except the long-lived ones (see BaseView.long_lived) are profiled
+        by it and a profile route (GET /profile, see
+        ProfileView) shows the hottest functions per view
     """
     decorators = []
     route_prefix = ''
     model_class = None
     route_key = None
+    throttle = None
+    importer = False
+    snapshots = None
+    change_feed = None
+    profiler = None
+    view_kwargs = ImmutableDict()
+    default_routes = ImmutableDict({
+        'index': Route('%(prefix)s', SortedListView),
+        'create': Route('%(prefix)s', CreateView),
+        'edit': Route('%(prefix)s/%(primary_key)s/edit', UpdateFormView),
+        'new': Route('%(prefix)s/new', CreateFormView),
+        'update': Route('%(prefix)s/%(primary_key)s', UpdateView),
+        'delete': Route('%(prefix)s/%(primary_key)s/delete', DeleteView),
+        'show': Route('%(prefix)s/%(primary_key)s', ShowView)
+    })
 
     def __init__(self, model_class, **kwargs):
         self.model_class = model_class
         for key, value in kwargs.items():
             setattr(self, key, value)
 
-        self.routes = {
-            'index': ['%(prefix)s', SortedListView, {}],
-            'create': ['%(prefix)s', CreateView, {}],
-            'edit': ['%(prefix)s/%(primary_key)s/edit', UpdateFormView, {}],
-            'new': ['%(prefix)s/new', CreateFormView, {}],
-            'update': ['%(prefix)s/%(primary_key)s', UpdateView, {}],
-            'delete': ['%(prefix)s/%(primary_key)s/delete', DeleteView, {}],
-            'show': ['%(prefix)s/%(primary_key)s', ShowView, {}]
-        }
+        self.routes = dict(self.default_routes)
+        if self.importer:
+            self.routes['import'] = Route('%(prefix)s/import', ImportView)
+        if self.change_feed is not None:
+            self.routes['changes'] = Route(
+                '%(prefix)s/changes',
+                ChangeFeedView
+            )
+        if self.profiler is not None:
+            self.routes['profile'] = Route('%(prefix)s/profile', ProfileView)
+        self.compiled_routes = None
+        self.lock = Lock()
 
     def get_route_key(self):
         if self.route_key is not None:
@@ -671,18 +2359,121 @@ class ModelRouter(object):
             self.route_key = '<%s>' % name
         return self.route_key
 
+    def get_post_commit_hooks(self):
+        """
+        Returns the post-commit hooks this router adds to its write views
+        """
+        hooks = []
+        if self.snapshots is not None:
+            hooks.append(self.snapshots.on_write)
+        if self.change_feed is not None:
+            hooks.append(self.change_feed.on_write)
+        return hooks
+
+    def compile_routes(self):
+        """
+        Returns the routes with formatted url rules and complete view
+        keyword arguments as an immutable dict
+        """
+        params = dict(
+            primary_key=self.get_route_key(),
+            prefix=self.route_prefix
+        )
+        compiled = {}
+        for key, route in self.routes.items():
+            kwargs = {'model_class': self.model_class}
+            # view_kwargs describe the model of the router, routes of other
+            # models (see add_child) do not get them
+            if route.kwargs.get('model_class', self.model_class) is \
+                    self.model_class:
+                kwargs.update(self.view_kwargs)
+            kwargs.update(route.kwargs)
+            if issubclass(route.view, ChangeFeedView):
+                kwargs.setdefault('feed', self.change_feed)
+            if issubclass(route.view, ProfileView):
+                kwargs.setdefault('source', self.profiler)
+            elif self.profiler is not None and not route.view.long_lived:
+                kwargs.setdefault('profiler', self.profiler)
+            hooks = self.get_post_commit_hooks()
+            if hooks and getattr(route.view, 'write_action', None):
+                executor = kwargs.get('executor', route.view.executor)
+                if isinstance(executor, ProcessExecutor):
+                    raise ImproperlyConfigured(
+                        'Snapshot and change feed hooks change the state of '
+                        'the request process and can not be run by a '
+                        'ProcessExecutor, use a ThreadExecutor.'
+                    )
+                if self.snapshots is not None and \
+                        self.snapshots.regenerate and \
+                        isinstance(executor, InlineExecutor):
+                    raise ImproperlyConfigured(
+                        'Snapshots can not be regenerated by an '
+                        'InlineExecutor, use a ThreadExecutor or '
+                        'regenerate=False.'
+                    )
+                kwargs['post_commit_hooks'] = list(kwargs.get(
+                    'post_commit_hooks',
+                    route.view.post_commit_hooks
+                )) + hooks
+            compiled[key] = Route(route.rule % params, route.view, kwargs)
+        return ImmutableDict(compiled)
+
     def get_routes(self):
         """
-        Returns the formatted routes
+        Returns the compiled routes, the routes are compiled only once
+        unless they are changed with the bind methods
         """
-        routes = copy(self.routes)
-        for key in self.routes:
-            routes[key][0] = self.routes[key][0] % dict(
-                primary_key=self.get_route_key(),
-                prefix=self.route_prefix
-            )
+        routes = self.compiled_routes
+        if routes is None:
+            self.lock.acquire()
+            try:
+                if self.compiled_routes is None:
+                    self.compiled_routes = self.compile_routes()
+                routes = self.compiled_routes
+            finally:
+                self.lock.release()
         return routes
 
+    def add_child(self, relationship, view=RelatedListView, **kwargs):
+        """
+        Adds an index route for the related objects of given relationship
+
+        Example ::
+
+            >>> router.add_child('orders')
+
+        routes /<id>/orders (endpoint orders_index) to a RelatedListView
+        listing the orders of given user.
+
+        :param relationship: name of the relationship of the model
+        :param view: view class for listing the related objects
+        :param kwargs: keyword arguments passed to the view
+        """
+        prop = class_mapper(self.model_class).get_property(relationship)
+        primary_key = self.model_class.__table__.primary_key.columns
+        kwargs.setdefault('model_class', prop.mapper.class_)
+        kwargs.setdefault('relationship', prop)
+        kwargs.setdefault('parent_param', primary_key.keys()[0])
+
+        self.lock.acquire()
+        try:
+            self.routes['%s_index' % relationship] = Route(
+                '%(prefix)s/%(primary_key)s/' + relationship,
+                view,
+                kwargs
+            )
+            self.compiled_routes = None
+        finally:
+            self.lock.release()
+
+    def update_route(self, key, **changes):
+        self.lock.acquire()
+        try:
+            self.routes[key] = self.routes[key].replace(**changes)
+            self.compiled_routes = None
+        finally:
+            self.lock.release()
+
     def bind_view(self, key, view):
         """
         bind_view can be used for overriding default views
@@ -696,7 +2487,7 @@ class ModelRouter(object):
 
             >>> router.bind_view('show', UserShowView)
         """
-        self.routes[key][1] = view
+        self.update_route(key, view=view)
 
     def bind_view_args(self, key, **kwargs):
         """
@@ -710,7 +2501,7 @@ class ModelRouter(object):
 
             >>> router.bind_view_args('edit', form_class=MyCustomForm)
         """
-        self.routes[key][2] = kwargs
+        self.update_route(key, kwargs=kwargs)
 
     def bind_route(self, key, route):
         """
@@ -724,7 +2515,60 @@ class ModelRouter(object):
 
             >>> router.bind_route('index', '/index')
         """
-        self.routes[key][0] = route
+        self.update_route(key, rule=route)
+
+    def get_templates(self):
+        """
+        Returns a dict of route keys and the resolved template names of the
+        views within this router. Views without templates are omitted.
+        """
+        templates = {}
+        for key, route in self.routes.items():
+            template = route.kwargs.get(
+                'template',
+                getattr(route.view, 'template', None)
+            )
+            if template:
+                model_class = route.kwargs.get('model_class', self.model_class)
+                templates[key] = template % dict(
+                    resource=underscore(model_class.__name__)
+                )
+        return templates
+
+    def warm_up(self, app, bytecode_cache_dir=None):
+        """
+        Pre-compiles the templates of all views within this router into the
+        Jinja template cache of given application so that the first requests
+        after startup do not have to compile them.
+
+        Returns a dict of route keys and template names that could not be
+        found. Missing templates are also logged as warnings.
+
+        Example ::
+
+            >>> router.warm_up(app, bytecode_cache_dir='/tmp/jinja')
+            {}
+
+        :param app: the Flask application the templates are loaded with
+        :param bytecode_cache_dir: if given, compiled templates are also
+            stored to this directory using jinja's FileSystemBytecodeCache
+        """
+        env = app.jinja_env
+        if bytecode_cache_dir and env.bytecode_cache is None:
+            env.bytecode_cache = FileSystemBytecodeCache(bytecode_cache_dir)
+
+        missing = {}
+        for key, template in self.get_templates().items():
+            try:
+                env.get_template(template)
+            except TemplateNotFound:
+                app.logger.warning(
+                    'Template %s for %s.%s could not be found' % (
+                        template, underscore(self.model_class.__name__), key
+                    )
+                )
+                missing[key] = template
+        return missing
 
     def register(self, blueprint=None):
         if not blueprint:
@@ -733,19 +2577,23 @@ class ModelRouter(object):
                 __name__
             )
 
-        for key, value in self.get_routes().items():
-            route, view, kwargs = value
-            view_func = view.as_view(
-                key,
-                model_class=self.model_class,
-                **kwargs
-            )
+        if self.snapshots is not None:
+            self.snapshots.bind(self.model_class, blueprint.name)
+
+        for key, route in self.get_routes().items():
+            view_func = route.view.as_view(key, **route.kwargs)
+
+            if self.snapshots is not None and key in ('show', 'index'):
+                view_func = self.snapshots.serve(key, view_func)
 
             for decorator in self.decorators:
                 view_func = decorator(view_func)
 
+            if self.throttle:
+                view_func = self.throttle(view_func)
+
             blueprint.add_url_rule(
-                route,
+                route.rule,
                 view_func=view_func
             )
         return blueprint
@@ -0,0 +1,245 @@
+"""
+SQL statement budgets for generic views.
+
+Lazy loading in templates easily turns a show or index page into hundreds
+of SELECTs. A QueryBudget records the statements a view executes, through
+the cursor events of all SQLAlchemy engines, and reports the requests that
+execute more than `max_statements` statements or spend more than
+`max_duration` seconds in them. ::
+
+    >>> budget = QueryBudget(max_statements=10, max_duration=0.5)
+    >>> router = ModelRouter(User, view_kwargs={'query_budget': budget})
+
+Exceeded budgets are reported according to `mode`: 'warn' issues a
+QueryBudgetWarning, 'log' logs the captured statements together with the
+stacks that executed them and 'raise' raises QueryBudgetExceeded, which is
+meant for test suites. Only the statements executed while the view function
+runs are counted, statements executed while a streamed response is iterated
+are not.
+"""
+import logging
+import traceback
+import warnings
+from functools import wraps
+from threading import Lock, local
+from time import time
+
+from flask import request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .exceptions import ImproperlyConfigured, QueryBudgetExceeded
+
+
+logger = logging.getLogger(__name__)
+
+_state = local()
+_install_lock = Lock()
+_installed = []
+
+
+class QueryBudgetWarning(UserWarning):
+    """Issued when a view exceeds its query budget in 'warn' mode."""
+
+
+class RecordedStatement(tuple):
+    """
+    A statement executed while a QueryRecorder was recording
+
+    :param statement: the SQL statement
+    :param parameters: parameters of the statement
+    :param duration: number of seconds the statement took
+    :param stack: extracted stack of the execution, None unless the
+        recorder captures stacks
+    """
+    __slots__ = ()
+
+    def __new__(cls, statement, parameters, duration, stack):
+        return tuple.__new__(cls, (statement, parameters, duration, stack))
+
+    @property
+    def statement(self):
+        return self[0]
+
+    @property
+    def parameters(self):
+        return self[1]
+
+    @property
+    def duration(self):
+        return self[2]
+
+    @property
+    def stack(self):
+        return self[3]
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context,
+        executemany):
+    _state.started = time()
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context,
+        executemany):
+    recorders = getattr(_state, 'recorders', None)
+    if not recorders:
+        return
+    duration = time() - getattr(_state, 'started', time())
+    stack = None
+    for recorder in recorders:
+        if recorder.capture_stacks:
+            if stack is None:
+                stack = traceback.extract_stack()[:-1]
+            recorder.record(statement, parameters, duration, stack)
+        else:
+            recorder.record(statement, parameters, duration, None)
+
+
+def install():
+    """
+    Listens to the cursor events of all engines, the listeners can not be
+    removed so they are installed only once and dispatch to the recorders
+    of the current thread
+    """
+    _install_lock.acquire()
+    try:
+        if not _installed:
+            event.listen(Engine, 'before_cursor_execute',
+                before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', after_cursor_execute)
+            _installed.append(True)
+    finally:
+        _install_lock.release()
+
+
+class QueryRecorder(object):
+    """
+    Records the statements executed by the current thread between `start`
+    and `stop`, can also be used as a context manager ::
+
+        >>> with QueryRecorder() as recorder:
+        ...     User.query.all()
+        >>> recorder.count
+        1
+
+    :param capture_stacks: if True the stack of each execution is captured
+    """
+    def __init__(self, capture_stacks=False):
+        self.capture_stacks = capture_stacks
+        self.statements = []
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    @property
+    def duration(self):
+        return sum(statement.duration for statement in self.statements)
+
+    def record(self, statement, parameters, duration, stack):
+        self.statements.append(
+            RecordedStatement(statement, parameters, duration, stack)
+        )
+
+    def start(self):
+        install()
+        if getattr(_state, 'recorders', None) is None:
+            _state.recorders = []
+        _state.recorders.append(self)
+        return self
+
+    def stop(self):
+        _state.recorders.remove(self)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.stop()
+
+
+class QueryBudget(object):
+    """
+    View decorator enforcing a statement budget, applied by BaseView.as_view
+    to views having a `query_budget`
+
+    :param max_statements: maximum number of statements per request
+    :param max_duration: maximum number of seconds spent in statements per
+        request
+    :param mode: 'warn', 'log' or 'raise'
+    :param logger: logger used in 'log' mode
+    """
+    modes = ('warn', 'log', 'raise')
+
+    def __init__(self, max_statements=None, max_duration=None, mode='warn',
+            logger=logger):
+        if mode not in self.modes:
+            raise ImproperlyConfigured(
+                'Query budget mode must be one of %s.' % ', '.join(self.modes)
+            )
+        self.max_statements = max_statements
+        self.max_duration = max_duration
+        self.mode = mode
+        self.logger = logger
+
+    def get_violations(self, recorder):
+        violations = []
+        if self.max_statements is not None and \
+                recorder.count > self.max_statements:
+            violations.append('%d statements (budget %d)' % (
+                recorder.count, self.max_statements
+            ))
+        if self.max_duration is not None and \
+                recorder.duration > self.max_duration:
+            violations.append('%.3f seconds (budget %.3f)' % (
+                recorder.duration, self.max_duration
+            ))
+        return violations
+
+    def format_statements(self, recorder):
+        lines = []
+        for number, statement in enumerate(recorder.statements, 1):
+            lines.append('%d. [%.3fs] %s %r' % (
+                number,
+                statement.duration,
+                statement.statement,
+                statement.parameters
+            ))
+            if statement.stack is not None:
+                lines.extend(
+                    line.rstrip('\n') for line in
+                    traceback.format_list(statement.stack)
+                )
+        return '\n'.join(lines)
+
+    def check(self, recorder, name):
+        """
+        Reports the statements of given recorder if they exceed the budget
+        """
+        violations = self.get_violations(recorder)
+        if not violations:
+            return
+        message = '%s exceeded its query budget: %s' % (
+            name, ', '.join(violations)
+        )
+        if self.mode == 'raise':
+            raise QueryBudgetExceeded(message, recorder.statements)
+        if self.mode == 'log':
+            self.logger.warning(
+                '%s\n%s', message, self.format_statements(recorder)
+            )
+        else:
+            warnings.warn(message, QueryBudgetWarning, stacklevel=2)
+
+    def __call__(self, f):
+        @wraps(f)
+        def decorator(*args, **kwargs):
+            recorder = QueryRecorder(capture_stacks=self.mode == 'log')
+            recorder.start()
+            try:
+                response = f(*args, **kwargs)
+            finally:
+                recorder.stop()
+            self.check(recorder, request.endpoint)
+            return response
+        return decorator
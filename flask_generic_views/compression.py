@@ -0,0 +1,124 @@
+"""
+Negotiated response compression for generic views.
+
+The `compressed` decorator can be given to a view (or to all views of a
+ModelRouter through its decorators) ::
+
+    >>> router = ModelRouter(User, decorators=[compressed])
+
+gzip is always available, brotli is used when the brotli package is
+installed and the client prefers it.
+"""
+import zlib
+from functools import wraps
+
+from flask import make_response, request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+#: responses smaller than this (in bytes) are not worth compressing
+MIN_SIZE = 500
+
+#: compression level used for gzip
+GZIP_LEVEL = 6
+
+
+def get_encodings():
+    """
+    Returns the supported content encodings in the order of preference
+    """
+    if brotli is not None:
+        return ['br', 'gzip']
+    return ['gzip']
+
+
+def negotiate_encoding():
+    """
+    Returns the content encoding to be used for the current request or None
+    if the client does not accept any of the supported encodings
+    """
+    return request.accept_encodings.best_match(get_encodings())
+
+
+class GzipCompressor(object):
+    def __init__(self):
+        self.compressor = zlib.compressobj(
+            GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS
+        )
+
+    def process(self, data):
+        return self.compressor.compress(data) + \
+            self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self.compressor.flush()
+
+
+def get_compressor(encoding):
+    if encoding == 'br':
+        return brotli.Compressor()
+    return GzipCompressor()
+
+
+def compress_iter(chunks, encoding, charset='utf-8'):
+    """
+    Compresses given iterable of strings chunk by chunk so that the client
+    receives data as soon as each chunk is ready
+    """
+    compressor = get_compressor(encoding)
+    for chunk in chunks:
+        if isinstance(chunk, unicode):
+            chunk = chunk.encode(charset)
+        if chunk:
+            data = compressor.process(chunk)
+            if data:
+                yield data
+    yield compressor.finish()
+
+
+def compress_response(response, encoding):
+    """
+    Compresses given response with given encoding in place. Streamed
+    responses are compressed lazily.
+    """
+    if response.is_streamed:
+        response.response = compress_iter(
+            response.response, encoding, response.charset
+        )
+        response.headers.pop('Content-Length', None)
+    else:
+        compressor = get_compressor(encoding)
+        response.data = compressor.process(response.data) + \
+            compressor.finish()
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def should_compress(response):
+    if response.status_code != 200 or response.direct_passthrough:
+        return False
+    if 'Content-Encoding' in response.headers:
+        return False
+    if not response.is_streamed and len(response.data) < MIN_SIZE:
+        return False
+    return True
+
+
+def compressed(f):
+    """
+    View decorator that compresses the response using the best content
+    encoding accepted by the client
+    """
+    @wraps(f)
+    def decorator(*args, **kwargs):
+        response = make_response(f(*args, **kwargs))
+        response.vary.add('Accept-Encoding')
+        encoding = negotiate_encoding()
+        if encoding and should_compress(response):
+            compress_response(response, encoding)
+        return response
+    return decorator
@@ -0,0 +1,150 @@
+"""
+Template context building.
+
+The template context of a view is built per request from layers: the
+keyword arguments given by the view, the results of the context providers,
+the static context of the view and finally the variables flask and jinja
+provide. Variables are looked up from the layers in this order so none of
+the layers needs to be copied or modified.
+
+Context values can be wrapped in LazyValue, in which case they are computed
+only when the template first looks them up.
+
+Templates are rendered from the ContextChain directly instead of through
+flask.render_template, which would copy every layer into one dict. The
+behavior differs from flask.render_template as follows:
+
+- context processors are still called on every render, but their results
+  are looked up after the layers of the view, ie. view variables win, as
+  with flask.render_template
+- template_rendered is sent by `render` with the ContextChain as context,
+  also for single blocks, but not by `generate`, like flask does not send
+  it for templates streamed with Template.generate
+- flask.render_template does not receive the template name, so code that
+  wraps or patches it (eg. test helpers recording rendered templates
+  without the signal) does not see these templates
+"""
+import sys
+from UserDict import DictMixin
+
+from flask import current_app
+from flask.signals import template_rendered
+
+
+class LazyValue(object):
+    """
+    Context value that is computed by calling given function with given
+    arguments when first looked up from a ContextChain. The result is
+    memoized.
+
+    Example ::
+
+        >>> self.render_template(total=LazyValue(query.count))
+    """
+    def __init__(self, func, *args, **kwargs):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.evaluated = False
+        self.value = None
+
+    def get(self):
+        if not self.evaluated:
+            self.value = self.func(*self.args, **self.kwargs)
+            self.evaluated = True
+        return self.value
+
+
+class ContextChain(DictMixin):
+    """
+    Read-through mapping of several context layers, the first layer that
+    has the key wins. Assignments only ever go to the first layer.
+    """
+    def __init__(self, *maps):
+        self.maps = list(maps) or [{}]
+
+    def __getitem__(self, key):
+        for mapping in self.maps:
+            if key in mapping:
+                value = mapping[key]
+                if isinstance(value, LazyValue):
+                    return value.get()
+                return value
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        self.maps[0][key] = value
+
+    def __delitem__(self, key):
+        del self.maps[0][key]
+
+    def __contains__(self, key):
+        for mapping in self.maps:
+            if key in mapping:
+                return True
+        return False
+
+    def __iter__(self):
+        seen = set()
+        for mapping in self.maps:
+            for key in mapping:
+                if key not in seen:
+                    seen.add(key)
+                    yield key
+
+    def keys(self):
+        return list(iter(self))
+
+    def __repr__(self):
+        return 'ContextChain(%s)' % ', '.join(map(repr, self.maps))
+
+
+def get_template_context(template, context):
+    """
+    Returns a jinja context for given template that looks variables up from
+    given ContextChain, context processors of the application and template
+    globals without copying any of them
+    """
+    processors = {}
+    current_app.update_template_context(processors)
+    chain = ContextChain(*(context.maps + [processors, template.globals]))
+    return template.new_context(chain, shared=True)
+
+
+def render(template, context, block=None):
+    """
+    Renders given template (or only one block of it) with given
+    ContextChain
+    """
+    environment = template.environment
+    jinja_context = get_template_context(template, context)
+    if block is None:
+        render_func = template.root_render_func
+    else:
+        render_func = template.blocks[block]
+    try:
+        rv = u''.join(render_func(jinja_context))
+    except Exception:
+        exc_info = sys.exc_info()
+        return environment.handle_exception(exc_info, True)
+    template_rendered.send(
+        current_app._get_current_object(),
+        template=template,
+        context=context
+    )
+    return rv
+
+
+def generate(template, context):
+    """
+    Same as render but yields the rendered template piece by piece
+    """
+    jinja_context = get_template_context(template, context)
+    try:
+        for event in template.root_render_func(jinja_context):
+            yield event
+    except Exception:
+        exc_info = sys.exc_info()
+    else:
+        return
+    yield template.environment.handle_exception(exc_info, True)
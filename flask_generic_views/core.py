@@ -7,6 +7,36 @@ from .exceptions import ImproperlyConfigured
 class BaseView(MethodView):
     """Base class for all other views."""
 
+    #: QueryBudget enforced on the SQL statements executed by the view
+    query_budget = None
+
+    #: Profiler sampling the requests of the view
+    profiler = None
+
+    #: True for views that hold requests open by design (eg. long-polling),
+    #: ModelRouter does not give them its profiler
+    long_lived = False
+
+    @classmethod
+    def as_view(cls, name, *class_args, **class_kwargs):
+        """
+        Converts the class into a view function, the view function is
+        decorated with the query budget and the profiler of the view if it
+        has them.
+        """
+        view = super(BaseView, cls).as_view(name, *class_args, **class_kwargs)
+        query_budget = class_kwargs.get('query_budget', cls.query_budget)
+        if query_budget is not None:
+            view = query_budget(view)
+        profiler = class_kwargs.get('profiler', cls.profiler)
+        if profiler is not None:
+            model_class = class_kwargs.get(
+                'model_class',
+                getattr(cls, 'model_class', None)
+            )
+            view = profiler(view, model_class and model_class.__name__)
+        return view
+
     def __init__(self, **kwargs):
         """
         Construct the view.
@@ -0,0 +1,239 @@
+"""
+Streaming row decoders.
+
+Row decoders are the counterpart of the row encoders: they read CSV or
+newline delimited JSON from a file-like object line by line and coerce the
+values into the native python types of the columns, so that the rows can
+be inserted with plain executemany statements. As with the encoders the
+value decoder of each column is chosen once, from the native python type of
+the column, when the decoder is constructed.
+"""
+import csv
+import sys
+from datetime import datetime, date, time
+from decimal import Decimal, InvalidOperation
+
+try:
+    import json
+except ImportError:
+    import simplejson as json
+
+from .exceptions import ImproperlyConfigured
+
+
+def decode_int(value):
+    if isinstance(value, bool):
+        raise ValueError('Not a valid integer.')
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError('Not a valid integer.')
+
+
+def decode_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise ValueError('Not a valid float.')
+
+
+def decode_decimal(value):
+    if isinstance(value, float):
+        value = repr(value)
+    try:
+        return Decimal(value)
+    except (TypeError, ValueError, InvalidOperation):
+        raise ValueError('Not a valid decimal.')
+
+
+TRUE_VALUES = ('1', 't', 'true', 'y', 'yes')
+FALSE_VALUES = ('0', 'f', 'false', 'n', 'no')
+
+
+def decode_bool(value):
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, basestring):
+        if value.lower() in TRUE_VALUES:
+            return True
+        if value.lower() in FALSE_VALUES:
+            return False
+    raise ValueError('Not a valid boolean.')
+
+
+def decode_unicode(value):
+    if isinstance(value, unicode):
+        return value
+    if isinstance(value, str):
+        try:
+            return value.decode('utf-8')
+        except UnicodeDecodeError:
+            pass
+    raise ValueError('Not a valid string.')
+
+
+def strptime_decoder(formats, convert, message):
+    def decode(value):
+        if isinstance(value, basestring):
+            for format in formats:
+                try:
+                    return convert(datetime.strptime(value, format))
+                except ValueError:
+                    pass
+        raise ValueError(message)
+    return decode
+
+
+decode_datetime = strptime_decoder(
+    ('%Y-%m-%dT%H:%M:%S.%f', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d %H:%M:%S'),
+    lambda value: value,
+    'Not a valid datetime.'
+)
+
+decode_date = strptime_decoder(
+    ('%Y-%m-%d',),
+    lambda value: value.date(),
+    'Not a valid date.'
+)
+
+decode_time = strptime_decoder(
+    ('%H:%M:%S.%f', '%H:%M:%S'),
+    lambda value: value.time(),
+    'Not a valid time.'
+)
+
+
+def decode_any(value):
+    return value
+
+
+DECODERS = {
+    int: decode_int,
+    float: decode_float,
+    Decimal: decode_decimal,
+    bool: decode_bool,
+    str: decode_unicode,
+    unicode: decode_unicode,
+    datetime: decode_datetime,
+    date: decode_date,
+    time: decode_time,
+}
+
+
+def iter_lines(stream):
+    """
+    Yields the lines of given file-like object, the request stream of
+    werkzeug is not guaranteed to stop iterating at its end so this reads
+    until an empty line is returned
+    """
+    return iter(stream.readline, '')
+
+
+class RowDecoder(object):
+    """
+    Base class for row decoders
+
+    :param names: names of the columns that may be given
+    :param types: native python types of the columns (see TYPE_MAP), None
+        for columns of unknown type
+    """
+    mimetype = None
+
+    def __init__(self, names, types):
+        self.value_decoders = dict(
+            (name, DECODERS.get(type, decode_any))
+            for name, type in zip(names, types)
+        )
+        self.names = list(names)
+
+    def read_header(self, stream):
+        """
+        Reads the header of given stream and returns the names of the given
+        columns, raises ValueError if unknown columns were given
+        """
+        return self.names
+
+    def iter_rows(self, stream):
+        """
+        Yields (line number, dict of raw values) tuples, the raw values are
+        None for lines that could not be read at all
+        """
+        raise ImproperlyConfigured(
+            'You must override `iter_rows()` method.'
+        )
+
+    def decode(self, values):
+        """
+        Coerces given raw values, returns a (values, errors) tuple. Columns
+        missing from the raw values are left out of the decoded values, so
+        that their defaults apply when the values are inserted.
+        """
+        decoded = {}
+        errors = {}
+        for name in self.names:
+            if name not in values:
+                continue
+            value = values[name]
+            if value is not None:
+                try:
+                    value = self.value_decoders[name](value)
+                except ValueError:
+                    errors[name] = str(sys.exc_info()[1])
+                    continue
+            decoded[name] = value
+        return decoded, errors
+
+
+class CSVRowDecoder(RowDecoder):
+    """
+    Decodes CSV with a header row naming the columns, empty values are
+    treated as missing, ie. the column gets its default or NULL
+    """
+    mimetype = 'text/csv'
+
+    def read_header(self, stream):
+        self.reader = csv.reader(iter_lines(stream))
+        try:
+            header = self.reader.next()
+        except StopIteration:
+            header = []
+        unknown = [name for name in header if name not in self.value_decoders]
+        if unknown:
+            raise ValueError('Unknown columns: %s.' % ', '.join(unknown))
+        self.names = header
+        return header
+
+    def iter_rows(self, stream):
+        names = self.names
+        for row in self.reader:
+            if not row:
+                continue
+            if len(row) != len(names):
+                yield self.reader.line_num, None
+                continue
+            values = {}
+            for name, value in zip(names, row):
+                if value != '':
+                    values[name] = value
+            yield self.reader.line_num, values
+
+
+class NDJSONRowDecoder(RowDecoder):
+    """
+    Decodes newline delimited JSON, one object per line. Columns missing
+    from an object get their default or NULL, null values are decoded as
+    None and unknown keys are ignored.
+    """
+    mimetype = 'application/x-ndjson'
+
+    def iter_rows(self, stream):
+        for line_num, line in enumerate(iter_lines(stream), 1):
+            if not line.strip():
+                continue
+            try:
+                values = json.loads(line)
+            except ValueError:
+                values = None
+            if not isinstance(values, dict):
+                values = None
+            yield line_num, values
@@ -0,0 +1,218 @@
+"""
+Streaming row encoders.
+
+Row encoders turn plain result rows (tuples as returned by the DBAPI) into
+chunks of JSON or CSV without building a dict or an ORM object per row.
+Each column gets its own value encoder which is chosen once, from the
+native python type of the column, when the encoder is constructed.
+
+`encode_rows` encodes a slice of the rows without the framing of the whole
+document (eg. the brackets of a JSON list), so slices encoded separately,
+eg. by the worker processes of a sharded export (see exports), can be joined
+in order with `iter_document`.
+"""
+import csv
+from cStringIO import StringIO
+from datetime import datetime, date, time
+from decimal import Decimal
+from itertools import islice, izip
+
+try:
+    import json
+except ImportError:
+    import simplejson as json
+
+from .exceptions import ImproperlyConfigured
+
+
+def encode_json_bool(value):
+    if value:
+        return 'true'
+    return 'false'
+
+
+def encode_json_isoformat(value):
+    return '"%s"' % value.isoformat()
+
+
+JSON_ENCODERS = {
+    int: str,
+    float: repr,
+    Decimal: str,
+    bool: encode_json_bool,
+    datetime: encode_json_isoformat,
+    date: encode_json_isoformat,
+    time: encode_json_isoformat,
+}
+
+
+def encode_csv_unicode(value):
+    return value.encode('utf-8')
+
+
+def encode_csv_isoformat(value):
+    return value.isoformat()
+
+
+def encode_csv_bool(value):
+    if value:
+        return '1'
+    return '0'
+
+
+CSV_ENCODERS = {
+    str: encode_csv_unicode,
+    unicode: encode_csv_unicode,
+    bool: encode_csv_bool,
+    datetime: encode_csv_isoformat,
+    date: encode_csv_isoformat,
+    time: encode_csv_isoformat,
+}
+
+
+class RowEncoder(object):
+    """
+    Base class for row encoders, subclasses define the document format by
+    overriding `encode_rows` and optionally `header`, `footer` and
+    `separator`
+
+    :param names: names of the columns
+    :param types: native python types of the columns (see TYPE_MAP), None
+        for columns of unknown type
+    :param chunk_size: number of rows encoded per yielded chunk
+    """
+    mimetype = None
+    encoders = {}
+    #: written between the encoded chunks or fragments of rows
+    separator = ''
+
+    def __init__(self, names, types, chunk_size=500):
+        self.names = list(names)
+        self.types = list(types)
+        self.value_encoders = [self.get_encoder(type) for type in types]
+        self.chunk_size = chunk_size
+
+    def get_encoder(self, type):
+        return self.encoders.get(type, self.default_encoder)
+
+    def default_encoder(self, value):
+        return value
+
+    def iter_chunks(self, rows):
+        """
+        Yields the whole document of given rows, `chunk_size` rows per chunk
+        """
+        rows = iter(rows)
+        data = self.header()
+        separator = ''
+        while True:
+            chunk = list(islice(rows, self.chunk_size))
+            if len(chunk) < self.chunk_size:
+                break
+            yield data + separator + self.encode_rows(chunk)
+            data = ''
+            separator = self.separator
+        if chunk:
+            data += separator + self.encode_rows(chunk)
+        yield data + self.footer()
+
+    def header(self):
+        return ''
+
+    def footer(self):
+        return ''
+
+    def encode_rows(self, rows):
+        """
+        Returns given rows encoded without the header and the footer of the
+        document
+        """
+        raise ImproperlyConfigured(
+            'You must override `encode_rows()` method.'
+        )
+
+    def iter_document(self, fragments):
+        """
+        Yields the whole document made of given fragments, as returned by
+        encode_rows, in order
+        """
+        yield self.header()
+        separator = ''
+        for fragment in fragments:
+            if not fragment:
+                continue
+            if separator:
+                yield separator
+            yield fragment
+            separator = self.separator
+        yield self.footer()
+
+
+class JSONRowEncoder(RowEncoder):
+    """
+    Encodes rows as a JSON list of objects
+    """
+    mimetype = 'application/json'
+    encoders = JSON_ENCODERS
+    separator = ','
+
+    def __init__(self, names, types, chunk_size=500):
+        RowEncoder.__init__(self, names, types, chunk_size)
+        self.prefixes = ['%s%s:' % (separator, json.dumps(name))
+            for separator, name in izip(
+                ['{'] + [','] * (len(self.names) - 1), self.names
+            )
+        ]
+
+    def default_encoder(self, value):
+        return json.dumps(value)
+
+    def header(self):
+        return '['
+
+    def footer(self):
+        return ']'
+
+    def encode_rows(self, rows):
+        buffer = []
+        append = buffer.append
+        row_separator = ''
+        for row in rows:
+            append(row_separator)
+            for prefix, encode, value in izip(
+                    self.prefixes, self.value_encoders, row):
+                append(prefix)
+                if value is None:
+                    append('null')
+                else:
+                    append(encode(value))
+            append('}')
+            row_separator = ','
+        return ''.join(buffer)
+
+
+class CSVRowEncoder(RowEncoder):
+    """
+    Encodes rows as CSV with a header row
+    """
+    mimetype = 'text/csv'
+    encoders = CSV_ENCODERS
+
+    def header(self):
+        buffer = StringIO()
+        csv.writer(buffer).writerow(self.names)
+        return buffer.getvalue()
+
+    def encode_rows(self, rows):
+        buffer = StringIO()
+        writer = csv.writer(buffer)
+        values = [None] * len(self.names)
+        for row in rows:
+            for index, (encode, value) in enumerate(
+                    izip(self.value_encoders, row)):
+                if value is None:
+                    values[index] = ''
+                else:
+                    values[index] = encode(value)
+            writer.writerow(values)
+        return buffer.getvalue()
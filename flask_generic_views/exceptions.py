@@ -1,2 +1,73 @@
+from flask import json
+from werkzeug.exceptions import HTTPException
+
+
 class ImproperlyConfigured(Exception):
     """This exception is raised when a view is not properly configured."""
+
+
+class TooManyRequests(HTTPException):
+    """This exception is raised when a client has been throttled."""
+
+    code = 429
+    name = 'Too Many Requests'
+    description = (
+        '<p>The client has sent too many requests in a given amount of '
+        'time.</p>'
+    )
+
+    def __init__(self, retry_after=None, description=None):
+        HTTPException.__init__(self, description)
+        self.retry_after = retry_after
+
+    def get_headers(self, environ=None):
+        headers = HTTPException.get_headers(self, environ)
+        if self.retry_after is not None:
+            headers.append(('Retry-After', str(int(self.retry_after))))
+        return headers
+
+
+class PreconditionRequired(HTTPException):
+    """
+    This exception is raised when a conditional request is required but no
+    precondition was given.
+    """
+
+    code = 428
+    name = 'Precondition Required'
+    description = (
+        '<p>This request is required to be conditional, try using '
+        '"If-Match".</p>'
+    )
+
+
+class InvalidParams(HTTPException):
+    """
+    This exception is raised when the query string of a list view or the
+    header of an import contains invalid parameters. The response body is
+    a JSON object mapping each invalid parameter to an error message.
+    """
+
+    code = 400
+    name = 'Bad Request'
+
+    def __init__(self, errors, description=None):
+        HTTPException.__init__(self, description)
+        self.errors = errors
+
+    def get_body(self, environ=None):
+        return json.dumps({'errors': self.errors})
+
+    def get_headers(self, environ=None):
+        return [('Content-Type', 'application/json')]
+
+
+class QueryBudgetExceeded(Exception):
+    """
+    This exception is raised when a view exceeds its query budget in 'raise'
+    mode.
+    """
+
+    def __init__(self, message, statements):
+        Exception.__init__(self, message)
+        self.statements = statements
@@ -0,0 +1,168 @@
+"""
+Sharded exports.
+
+An export ordered by a single column primary key can be split into primary
+key ranges (lo, hi] and each range read and encoded by a worker process of
+a ProcessExecutor. The request process only computes the range boundaries,
+with keyset queries on the primary key, and sends the workers the compiled
+SQL of the filtered export with the bound parameters of their range. Each
+worker reads its range on a connection of its own and returns the encoded
+rows, so no row is pickled between the processes. ::
+
+    >>> view = SortedListView.as_view('index', model_class=User,
+    ...     encoders={'csv': CSVRowEncoder}, export_columns=['id', 'name'],
+    ...     export_executor=ProcessExecutor(processes=8))
+
+The workers connect with the URL of the engine of the request, so the
+database must be reachable from other processes (not an in-memory SQLite
+database).
+"""
+from sqlalchemy import bindparam, create_engine, func
+
+
+_engines = {}
+
+
+def get_engine(url):
+    """
+    Returns the engine of given URL in this process, created on first use
+    """
+    engine = _engines.get(url)
+    if engine is None:
+        engine = _engines[url] = create_engine(url)
+    return engine
+
+
+def is_shared(engine):
+    """
+    Returns True if other processes can connect to the database of given
+    engine
+    """
+    url = engine.url
+    return not (url.drivername.startswith('sqlite') and
+        url.database in (None, '', ':memory:'))
+
+
+def iter_ranges(query, primary_key, shard_size):
+    """
+    Yields the (lo, hi] primary key ranges of at most `shard_size` rows of
+    given query, lo is None for the first range. Each boundary is found with
+    one keyset query on the primary key.
+    """
+    query = query.order_by(None)
+    last = query.with_entities(func.max(primary_key)).scalar()
+    if last is None:
+        return
+    keys = query.with_entities(primary_key).order_by(primary_key)
+    lo = None
+    while True:
+        range_keys = keys
+        if lo is not None:
+            range_keys = keys.filter(primary_key > lo)
+        hi = range_keys.offset(shard_size - 1).limit(1).scalar()
+        if hi is None or hi == last:
+            yield lo, last
+            return
+        yield lo, hi
+        lo = hi
+
+
+class ShardStatement(object):
+    """
+    The compiled SQL of an export restricted to a primary key range
+
+    :param query: the filtered query of the export
+    :param attrs: the exported attributes
+    :param types: the SQLAlchemy types of the exported columns, their
+        result processors are applied by the workers
+    :param primary_key: the primary key column of the exported model
+    :param engine: the engine the query is executed with
+    """
+    def __init__(self, query, attrs, types, primary_key, engine):
+        self.dialect = engine.dialect
+        self.url = str(engine.url)
+        self.types = list(types)
+        query = query.order_by(None).order_by(primary_key) \
+            .with_entities(*attrs) \
+            .filter(primary_key <= bindparam('shard_hi'))
+        self.first = query.statement.compile(dialect=self.dialect)
+        self.rest = query.filter(primary_key > bindparam('shard_lo')) \
+            .statement.compile(dialect=self.dialect)
+
+    def get_sql(self, compiled):
+        sql = unicode(compiled)
+        if not self.dialect.supports_unicode_statements:
+            sql = sql.encode(self.dialect.encoding)
+        return sql
+
+    def get_parameters(self, compiled, values):
+        """
+        Returns the DBAPI parameters of given compiled statement, processed
+        the same way SQLAlchemy processes them on execution
+        """
+        params = compiled.construct_params(values)
+        for param, name in compiled.bind_names.iteritems():
+            processor = param.type.dialect_impl(self.dialect) \
+                .bind_processor(self.dialect)
+            if processor is not None:
+                params[name] = processor(params[name])
+        if self.dialect.positional:
+            return self.dialect.execute_sequence_format(
+                [params[name] for name in compiled.positiontup]
+            )
+        if not self.dialect.supports_unicode_statements:
+            params = dict(
+                (name.encode(self.dialect.encoding), value)
+                for name, value in params.iteritems()
+            )
+        return params
+
+    def get_arguments(self, lo, hi):
+        """
+        Returns the (sql, parameters) reading the rows of range (lo, hi]
+        """
+        if lo is None:
+            compiled = self.first
+            values = {'shard_hi': hi}
+        else:
+            compiled = self.rest
+            values = {'shard_lo': lo, 'shard_hi': hi}
+        return (
+            self.get_sql(compiled),
+            self.get_parameters(compiled, values)
+        )
+
+
+def encode_shard(url, sql, parameters, types, encoder_class, names,
+        native_types):
+    """
+    Reads the rows of a shard on a connection of this process and returns
+    them encoded with a new encoder of given class, run in the worker
+    processes of sharded exports
+    """
+    engine = get_engine(url)
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        try:
+            cursor.execute(sql, parameters)
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+    finally:
+        connection.close()
+
+    processors = [
+        type.dialect_impl(engine.dialect)
+            .result_processor(engine.dialect, None)
+        for type in types
+    ]
+    if any(processors):
+        rows = [
+            tuple(
+                processor(value) if processor is not None else value
+                for processor, value in zip(processors, row)
+            )
+            for row in rows
+        ]
+    return encoder_class(names, native_types).encode_rows(rows)
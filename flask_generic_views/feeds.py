@@ -0,0 +1,176 @@
+"""
+Change feeds for ModelRouter resources.
+
+A ChangeFeed keeps the latest writes of a resource in a bounded in-process
+ring buffer. Every change gets a sequence number, which increases by one per
+change, so clients can ask for the changes after the last sequence number
+they have seen instead of polling the whole listing. ::
+
+    >>> router = ModelRouter(User, change_feed=ChangeFeed(max_size=1000))
+
+adds GET /users/changes?since=<seq> which long-polls for the next changes,
+or streams them as server-sent events when the client accepts
+text/event-stream.
+
+The feed of a router is fed by the post-commit hooks of its write views.
+Writes made elsewhere through the ORM can be fed with `watch`, which listens
+to the flush and commit events of all sessions (do not combine it with the
+write view hooks of the same model, or writes are fed twice).
+"""
+from collections import deque
+from threading import Condition
+from time import time
+from weakref import WeakKeyDictionary
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, class_mapper
+
+
+class Change(tuple):
+    """
+    A committed write in a change feed
+
+    :param seq: sequence number of the change
+    :param pk: primary key of the written object
+    :param action: 'create', 'update' or 'delete'
+    :param created: unix timestamp of the change
+    """
+    __slots__ = ()
+
+    def __new__(cls, seq, pk, action, created):
+        return tuple.__new__(cls, (seq, pk, action, created))
+
+    @property
+    def seq(self):
+        return self[0]
+
+    @property
+    def pk(self):
+        return self[1]
+
+    @property
+    def action(self):
+        return self[2]
+
+    @property
+    def created(self):
+        return self[3]
+
+    def as_dict(self):
+        return dict(
+            seq=self.seq,
+            pk=self.pk,
+            action=self.action,
+            created=self.created
+        )
+
+
+class ChangeFeed(object):
+    """
+    Bounded buffer of the latest changes of a resource
+
+    :param max_size: number of changes kept, older changes are dropped and
+        clients asking for them are told that the feed was truncated
+    """
+    def __init__(self, max_size=1000):
+        self.changes = deque(maxlen=max_size)
+        self.last_seq = 0
+        self.condition = Condition()
+        self.model_class = None
+        self.pending = WeakKeyDictionary()
+
+    def append(self, pk, action):
+        """
+        Adds a change and wakes up the waiting clients
+        """
+        self.condition.acquire()
+        try:
+            self.last_seq += 1
+            change = Change(self.last_seq, pk, action, time())
+            self.changes.append(change)
+            self.condition.notifyAll()
+        finally:
+            self.condition.release()
+        return change
+
+    def on_write(self, write_event):
+        """
+        Post-commit hook feeding the writes of the write views
+        """
+        self.append(write_event.pk, write_event.action)
+
+    def since(self, seq):
+        """
+        Returns a (changes, truncated) tuple of the changes after given
+        sequence number. truncated is True if some of the changes after it
+        are no longer in the buffer, or the sequence number is from a feed
+        that was restarted.
+        """
+        self.condition.acquire()
+        try:
+            changes = []
+            for change in reversed(self.changes):
+                if change.seq <= seq:
+                    break
+                changes.append(change)
+            changes.reverse()
+            if seq > self.last_seq:
+                truncated = True
+            elif self.changes:
+                truncated = self.changes[0].seq > seq + 1
+            else:
+                truncated = self.last_seq > seq
+            return changes, truncated
+        finally:
+            self.condition.release()
+
+    def wait(self, seq, timeout):
+        """
+        Same as since but waits at most `timeout` seconds for changes
+        """
+        deadline = time() + timeout
+        self.condition.acquire()
+        try:
+            while self.last_seq == seq:
+                remaining = deadline - time()
+                if remaining <= 0:
+                    break
+                self.condition.wait(remaining)
+        finally:
+            self.condition.release()
+        return self.since(seq)
+
+    def watch(self, model_class):
+        """
+        Feeds the writes of given model committed by any session through
+        the ORM
+        """
+        self.model_class = model_class
+        event.listen(Session, 'after_flush', self.collect)
+        event.listen(Session, 'after_commit', self.publish)
+        event.listen(Session, 'after_rollback', self.discard)
+
+    def collect(self, session, flush_context):
+        mapper = class_mapper(self.model_class)
+        writes = self.pending.setdefault(session, [])
+        for objects, action in ((session.new, 'create'),
+                (session.dirty, 'update'), (session.deleted, 'delete')):
+            for obj in objects:
+                if not isinstance(obj, self.model_class):
+                    continue
+                if action == 'update' and not session.is_modified(
+                        obj, include_collections=False):
+                    continue
+                pk = mapper.primary_key_from_instance(obj)
+                if len(pk) == 1:
+                    pk = pk[0]
+                else:
+                    pk = tuple(pk)
+                writes.append((pk, action))
+
+    def publish(self, session):
+        for pk, action in self.pending.pop(session, ()):
+            self.append(pk, action)
+
+    def discard(self, session):
+        self.pending.pop(session, None)
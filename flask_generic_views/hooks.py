@@ -0,0 +1,87 @@
+"""
+Post-commit hooks for write views.
+
+Write views schedule a WriteEvent on the session before committing. When
+the session commits successfully the hooks are submitted to the executor of
+the view, on rollback the scheduled events are discarded. Hooks are called
+with the WriteEvent as their only argument, for process executors both the
+hook and the event must be picklable.
+"""
+import logging
+from weakref import WeakKeyDictionary
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from .workers import Full
+
+
+logger = logging.getLogger(__name__)
+
+
+class WriteEvent(tuple):
+    """
+    Describes a committed write
+
+    :param resource: underscored name of the model, eg. 'user'
+    :param pk: primary key of the written object
+    :param action: 'create', 'update' or 'delete'
+    """
+    __slots__ = ()
+
+    def __new__(cls, resource, pk, action):
+        return tuple.__new__(cls, (resource, pk, action))
+
+    def __getnewargs__(self):
+        return tuple(self)
+
+    @property
+    def resource(self):
+        return self[0]
+
+    @property
+    def pk(self):
+        return self[1]
+
+    @property
+    def action(self):
+        return self[2]
+
+    def __repr__(self):
+        return 'WriteEvent(%r, %r, %r)' % self
+
+
+_pending = WeakKeyDictionary()
+
+
+def schedule(session, executor, hooks, write_event):
+    """
+    Schedules given hooks to be submitted to given executor when given
+    session commits
+    """
+    _pending.setdefault(session, []).append((executor, hooks, write_event))
+
+
+def run_pending(session):
+    for executor, hooks, write_event in _pending.pop(session, ()):
+        for hook in hooks:
+            try:
+                executor.submit(hook, write_event)
+            except Full:
+                logger.warning(
+                    'Executor queue is full, hook %r for %r was dropped' % (
+                        hook, write_event
+                    )
+                )
+            except Exception:
+                logger.exception('Hook %r for %r failed' % (
+                    hook, write_event
+                ))
+
+
+def discard_pending(session):
+    _pending.pop(session, None)
+
+
+event.listen(Session, 'after_commit', run_pending)
+event.listen(Session, 'after_rollback', discard_pending)
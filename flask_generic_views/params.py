@@ -0,0 +1,258 @@
+"""
+Query string parsing for list views.
+
+The request parameters a list view understands (page, per_page, sort,
+fragment, format and the column filters) are described by a ParamSchema.
+The schema is compiled once per view class and configuration and parses
+the query string in a single pass into a ListParams, a typed and hashable
+tuple that can be used as a cache key. Invalid parameters are collected
+and rejected together with InvalidParams.
+"""
+import sys
+import warnings
+
+from .exceptions import ImproperlyConfigured, InvalidParams
+
+
+#: filter values meaning "no filter", as sent by empty select fields
+EMPTY_VALUES = ('', '__None')
+
+
+class ListParams(tuple):
+    """
+    Parsed parameters of a list request
+
+    :param page: page number, starting from 1
+    :param per_page: number of items per page
+    :param sort: tuple of (sort key, descending) tuples
+    :param filters: tuple of (column name, value) tuples sorted by name
+    :param fragment: name of the requested template block or None
+    :param format: name of the requested export format or None
+    """
+    __slots__ = ()
+
+    def __new__(cls, page=1, per_page=None, sort=(), filters=(),
+            fragment=None, format=None):
+        return tuple.__new__(
+            cls, (page, per_page, sort, filters, fragment, format)
+        )
+
+    def __getnewargs__(self):
+        return tuple(self)
+
+    @property
+    def page(self):
+        return self[0]
+
+    @property
+    def per_page(self):
+        return self[1]
+
+    @property
+    def sort(self):
+        return self[2]
+
+    @property
+    def filters(self):
+        return self[3]
+
+    @property
+    def fragment(self):
+        return self[4]
+
+    @property
+    def format(self):
+        return self[5]
+
+    def __repr__(self):
+        return (
+            'ListParams(page=%r, per_page=%r, sort=%r, filters=%r, '
+            'fragment=%r, format=%r)' % self
+        )
+
+
+def parse_int(value):
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError('Not a valid integer.')
+
+
+def parse_bool(value):
+    if value == 'y':
+        return True
+    if value == 'n':
+        return False
+    raise ValueError('Not a valid choice.')
+
+
+def parse_text(value):
+    return value
+
+
+#: filter parsers by native column type, columns of other types can not be
+#: filtered
+FILTER_PARSERS = {
+    int: parse_int,
+    bool: parse_bool,
+    str: parse_text,
+    unicode: parse_text,
+}
+
+
+def format_sort(sort):
+    """
+    Formats parsed sort back to its query string form, eg. '-age,name'
+    """
+    return ','.join(
+        (descending and '-' or '') + name for name, descending in sort
+    )
+
+
+class ReservedParamWarning(UserWarning):
+    """
+    Issued when a filter column is named after another parameter of the
+    list view (eg. page or sort), the column can not be filtered
+    """
+
+
+class ParamSchema(object):
+    """
+    Compiled description of the query string of a list view
+
+    :param filters: dict of filterable column names and their native types
+    :param sort_keys: allowed sort keys, None if the view can not be sorted
+    :param sort: the default sort, eg. '-age,name'
+    :param per_page: default number of items per page, None if the view is
+        not paginated
+    :param max_per_page: maximum number of items per page
+    :param fragments: names of the template blocks that can be requested
+    :param formats: names of the export formats that can be requested
+    :param fragment_param: name of the fragment parameter
+    :param format_param: name of the format parameter
+    """
+    def __init__(self, filters=None, sort_keys=None, sort='', per_page=None,
+            max_per_page=None, fragments=(), formats=(),
+            fragment_param='fragment', format_param='format'):
+        self.sort_keys = sort_keys and frozenset(sort_keys)
+        self.per_page = per_page
+        self.max_per_page = max_per_page
+        self.fragments = frozenset(fragments)
+        self.formats = frozenset(formats)
+
+        # parameters other than filters, by name of the ListParams field
+        self.parsers = {}
+        self.targets = {}
+        if sort_keys is not None:
+            self.add_param('sort', 'sort', self.parse_sort)
+        if per_page is not None:
+            self.add_param('page', 'page', self.parse_page)
+            self.add_param('per_page', 'per_page', self.parse_per_page)
+        if fragments:
+            self.add_param(fragment_param, 'fragment', self.parse_fragment)
+        if formats:
+            self.add_param(format_param, 'format', self.parse_format)
+
+        for name, native_type in sorted((filters or {}).iteritems()):
+            if native_type not in FILTER_PARSERS:
+                continue
+            if name in self.targets:
+                warnings.warn(
+                    'Column %s can not be filtered, its name is reserved '
+                    'for the %s parameter.' % (name, self.targets[name]),
+                    ReservedParamWarning
+                )
+                continue
+            self.parsers[name] = self.filter_parser(
+                FILTER_PARSERS[native_type]
+            )
+
+        self.default_sort = ()
+        if sort_keys is not None:
+            try:
+                self.default_sort = self.parse_sort(sort)
+            except ValueError:
+                raise ImproperlyConfigured(
+                    'Default sort %r contains unknown sort keys.' % sort
+                )
+
+    def add_param(self, name, target, parse):
+        self.parsers[name] = parse
+        self.targets[name] = target
+
+    def filter_parser(self, parse):
+        def parse_filter(value):
+            if value in EMPTY_VALUES:
+                return None
+            return parse(value)
+        return parse_filter
+
+    def parse_sort(self, value):
+        sort = []
+        for key in value.split(','):
+            key = key.strip()
+            if not key:
+                continue
+            name = key.lstrip('-')
+            if name not in self.sort_keys:
+                raise ValueError('Unknown sort key %r.' % name)
+            sort.append((name, key.startswith('-')))
+        return tuple(sort)
+
+    def parse_page(self, value):
+        page = parse_int(value)
+        if page < 1:
+            raise ValueError('Must be at least 1.')
+        return page
+
+    def parse_per_page(self, value):
+        per_page = parse_int(value)
+        if per_page < 1:
+            raise ValueError('Must be at least 1.')
+        if self.max_per_page is not None and per_page > self.max_per_page:
+            raise ValueError('Must be at most %d.' % self.max_per_page)
+        return per_page
+
+    def parse_fragment(self, value):
+        if value not in self.fragments:
+            raise ValueError('Unknown fragment.')
+        return value
+
+    def parse_format(self, value):
+        if value not in self.formats:
+            raise ValueError('Unknown format.')
+        return value
+
+    def parse(self, args):
+        """
+        Parses given request arguments (a MultiDict, the first value of each
+        key is used) into ListParams, raises InvalidParams if any of the
+        known parameters is invalid. Unknown parameters are ignored.
+        """
+        values = dict(
+            page=1,
+            per_page=self.per_page,
+            sort=self.default_sort
+        )
+        filters = []
+        errors = {}
+        parsers = self.parsers
+        targets = self.targets
+        for name, value in args.iteritems():
+            parse = parsers.get(name)
+            if parse is None:
+                continue
+            try:
+                value = parse(value)
+            except ValueError:
+                errors[name] = str(sys.exc_info()[1])
+                continue
+            target = targets.get(name)
+            if target is not None:
+                values[target] = value
+            elif value is not None:
+                filters.append((name, value))
+        if errors:
+            raise InvalidParams(errors)
+        filters.sort()
+        return ListParams(filters=tuple(filters), **values)
@@ -0,0 +1,344 @@
+"""
+Sampled profiling of generic views.
+
+Attaching a profiler to a production process is not safe, profiling every
+request is too slow. A Profiler profiles only some of the requests of the
+views it is given to and keeps the profiles in a local directory ::
+
+    >>> profiler = Profiler('/var/tmp/profiles', sample_every=1000,
+    ...     slow_threshold=1.0)
+    >>> router = ModelRouter(User, profiler=profiler)
+
+Every `sample_every`th request is run under cProfile and its stats are
+written as a pstats file (.prof). Requests taking longer than
+`slow_threshold` seconds can not be known in advance, so when a threshold is
+given a background thread samples the stacks of the requests in progress
+every `interval` seconds, which costs next to nothing, and the samples of the
+slow requests are written as collapsed stacks (.collapsed, the input format
+of flamegraph.pl). The file names are tagged with the endpoint and the model
+of the view and only the newest `max_files` files are kept.
+
+`report` summarizes the hottest functions per endpoint, ModelRouter serves
+it as JSON from GET /profile (see ProfileView), which should be protected
+with the decorators of the router. The profile route itself and long-lived
+views such as the change feed (see BaseView.long_lived) are not profiled.
+The report is only computed again when the profiles change.
+"""
+import errno
+import marshal
+import os
+import pstats
+import sys
+from cProfile import Profile
+from functools import wraps
+from itertools import count
+from tempfile import mkstemp
+from threading import Condition, Thread
+from time import sleep, time
+
+from flask import request
+
+try:
+    from thread import get_ident
+except ImportError:
+    from threading import get_ident
+
+
+PROFILE_SUFFIX = '.prof'
+SAMPLES_SUFFIX = '.collapsed'
+
+
+def collapse_stack(frame):
+    """
+    Returns given stack in collapsed form, outermost frame first, eg.
+    'app.py:dispatch;views.py:get;query.py:all'
+    """
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append('%s:%s' % (
+            os.path.basename(code.co_filename),
+            code.co_name
+        ))
+        frame = frame.f_back
+    names.reverse()
+    return ';'.join(names)
+
+
+class StackSampler(object):
+    """
+    Samples the stacks of the registered threads from a background thread
+
+    :param interval: number of seconds between samples
+    """
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.threads = {}
+        self.condition = Condition()
+        self.thread = None
+
+    def start(self, ident):
+        """
+        Starts sampling the thread with given identifier
+        """
+        self.condition.acquire()
+        try:
+            self.threads[ident] = {}
+            if self.thread is None:
+                self.thread = Thread(target=self.run)
+                self.thread.daemon = True
+                self.thread.start()
+            self.condition.notify()
+        finally:
+            self.condition.release()
+
+    def stop(self, ident):
+        """
+        Stops sampling the thread with given identifier, returns its samples
+        as a dict of collapsed stacks and their counts
+        """
+        self.condition.acquire()
+        try:
+            return self.threads.pop(ident, {})
+        finally:
+            self.condition.release()
+
+    def sample(self):
+        frames = sys._current_frames()
+        for ident, samples in self.threads.items():
+            frame = frames.get(ident)
+            if frame is not None:
+                stack = collapse_stack(frame)
+                samples[stack] = samples.get(stack, 0) + 1
+
+    def run(self):
+        while True:
+            self.condition.acquire()
+            try:
+                while not self.threads:
+                    self.condition.wait()
+                self.sample()
+            finally:
+                self.condition.release()
+            sleep(self.interval)
+
+
+class Profiler(object):
+    """
+    View decorator profiling a sample of the requests, applied by
+    BaseView.as_view to views having a `profiler`
+
+    :param directory: directory the profiles are written to
+    :param sample_every: every nth request is profiled with cProfile, None
+        disables sampling
+    :param slow_threshold: the stacks of requests taking longer than this
+        many seconds are written, None disables stack sampling
+    :param interval: number of seconds between stack samples
+    :param max_files: number of newest profiles kept in the directory
+    """
+    def __init__(self, directory, sample_every=None, slow_threshold=None,
+            interval=0.005, max_files=200):
+        self.directory = directory
+        self.sample_every = sample_every
+        self.slow_threshold = slow_threshold
+        self.max_files = max_files
+        self.counter = count(1)
+        self.sampler = StackSampler(interval)
+        self.report_cache = None
+
+    def is_sampled(self):
+        return self.sample_every is not None and \
+            next(self.counter) % self.sample_every == 0
+
+    def get_prefix(self, model_name):
+        return '%s--%s--' % (request.endpoint, model_name or '-')
+
+    def write_file(self, prefix, suffix, write):
+        """
+        Writes a new profile file with given function, which is called with
+        the open file. The file is written under a temporary name, which
+        get_paths ignores, and renamed once complete.
+        """
+        try:
+            os.makedirs(self.directory)
+        except OSError:
+            if not os.path.isdir(self.directory):
+                raise
+        fd, temp_path = mkstemp(prefix=prefix, suffix='.tmp',
+            dir=self.directory)
+        try:
+            profile_file = os.fdopen(fd, 'wb')
+        except Exception:
+            os.close(fd)
+            os.remove(temp_path)
+            raise
+        try:
+            try:
+                write(profile_file)
+            finally:
+                profile_file.close()
+            os.rename(temp_path, temp_path[:-len('.tmp')] + suffix)
+        except Exception:
+            os.remove(temp_path)
+            raise
+        self.rotate()
+
+    def write_profile(self, profile, prefix):
+        def write(profile_file):
+            profile.create_stats()
+            marshal.dump(profile.stats, profile_file)
+        self.write_file(prefix, PROFILE_SUFFIX, write)
+
+    def write_samples(self, samples, prefix):
+        def write(samples_file):
+            for stack, samples_count in sorted(samples.iteritems()):
+                samples_file.write('%s %d\n' % (stack, samples_count))
+        self.write_file(prefix, SAMPLES_SUFFIX, write)
+
+    def get_paths(self):
+        """
+        Returns the paths of the written profiles, newest first
+        """
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            if sys.exc_info()[1].errno != errno.ENOENT:
+                raise
+            return []
+        paths = []
+        for name in names:
+            if name.endswith(PROFILE_SUFFIX) or name.endswith(SAMPLES_SUFFIX):
+                path = os.path.join(self.directory, name)
+                try:
+                    paths.append((os.path.getmtime(path), path))
+                except OSError:
+                    pass
+        paths.sort(reverse=True)
+        return [path for mtime, path in paths]
+
+    def rotate(self):
+        for path in self.get_paths()[self.max_files:]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def __call__(self, f, model_name=None):
+        @wraps(f)
+        def decorator(*args, **kwargs):
+            if self.is_sampled():
+                profile = Profile()
+                response = profile.runcall(f, *args, **kwargs)
+                self.write_profile(profile, self.get_prefix(model_name))
+                return response
+            if self.slow_threshold is None:
+                return f(*args, **kwargs)
+
+            ident = get_ident()
+            started = time()
+            self.sampler.start(ident)
+            try:
+                response = f(*args, **kwargs)
+            finally:
+                samples = self.sampler.stop(ident)
+            if time() - started > self.slow_threshold and samples:
+                self.write_samples(samples, self.get_prefix(model_name))
+            return response
+        return decorator
+
+    def report(self, limit=20, endpoint=None):
+        """
+        Returns the hottest functions of the profiled views as a list of
+        dicts, one per endpoint and model. `functions` lists the functions
+        with the most own time in the cProfile profiles, `sampled_functions`
+        the functions most often on top of the sampled stacks. Profile files
+        are never modified, so the report is cached until the set of files
+        changes.
+        """
+        paths = self.get_paths()
+        key = (tuple(paths), limit, endpoint)
+        cache = self.report_cache
+        if cache is not None and cache[0] == key:
+            return cache[1]
+        report = self.build_report(paths, limit, endpoint)
+        self.report_cache = (key, report)
+        return report
+
+    def build_report(self, paths, limit, endpoint):
+        views = {}
+        for path in paths:
+            name = os.path.basename(path)
+            try:
+                view_endpoint, model_name, rest = name.split('--', 2)
+            except ValueError:
+                continue
+            if endpoint is not None and view_endpoint != endpoint:
+                continue
+            view = views.setdefault((view_endpoint, model_name), dict(
+                endpoint=view_endpoint,
+                model=model_name,
+                profiles=0,
+                stats=None,
+                samples={}
+            ))
+            try:
+                if name.endswith(PROFILE_SUFFIX):
+                    if view['stats'] is None:
+                        view['stats'] = pstats.Stats(path)
+                    else:
+                        view['stats'].add(path)
+                else:
+                    self.read_samples(path, view['samples'])
+            except (IOError, EOFError, ValueError):
+                continue
+            view['profiles'] += 1
+
+        report = []
+        for key in sorted(views):
+            view = views[key]
+            stats = view.pop('stats')
+            samples = view.pop('samples')
+            view['functions'] = self.top_functions(stats, limit)
+            view['sampled_functions'] = [
+                dict(function=function, samples=samples_count)
+                for function, samples_count in sorted(
+                    samples.iteritems(),
+                    key=lambda item: (-item[1], item[0])
+                )[:limit]
+            ]
+            report.append(view)
+        return report
+
+    def read_samples(self, path, samples):
+        """
+        Adds the samples of given collapsed stacks file to the given dict of
+        samples per innermost function
+        """
+        samples_file = open(path)
+        try:
+            for line in samples_file:
+                stack, samples_count = line.rsplit(' ', 1)
+                function = stack.rsplit(';', 1)[-1]
+                samples[function] = \
+                    samples.get(function, 0) + int(samples_count)
+        finally:
+            samples_file.close()
+
+    def top_functions(self, stats, limit):
+        if stats is None:
+            return []
+        rows = sorted(
+            stats.stats.iteritems(),
+            key=lambda item: item[1][2],
+            reverse=True
+        )[:limit]
+        return [
+            dict(
+                function='%s:%d(%s)' % function,
+                calls=calls,
+                time=total_time,
+                cumulative_time=cumulative_time
+            )
+            for function, (primitive_calls, calls, total_time,
+                cumulative_time, callers) in rows
+        ]
@@ -0,0 +1,93 @@
+"""
+Lightweight row objects for list results.
+
+Loading a page of ORM instances keeps every instance, its state and its
+identity map entry in memory until the session is closed. RowResult is an
+alternative result type: it executes the query as a plain statement and
+yields a small `__slots__` object per row, fetching the rows from the cursor
+a chunk at a time. The row classes are generated once per column set. ::
+
+    >>> items = RowResult(query.with_entities(User.id, User.name),
+    ...     ['id', 'name'])
+    >>> [item.name for item in items]
+"""
+from itertools import izip
+
+
+class Row(object):
+    """
+    Base class of the generated row classes, the values of a row are
+    stored in the slots named after its columns
+    """
+    __slots__ = ()
+
+    def __init__(self, values):
+        for name, value in izip(self.__slots__, values):
+            setattr(self, name, value)
+
+    def __eq__(self, other):
+        return self.__class__ is other.__class__ and \
+            tuple(self) == tuple(other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __iter__(self):
+        for name in self.__slots__:
+            yield getattr(self, name)
+
+    def __repr__(self):
+        return '%s(%s)' % (
+            self.__class__.__name__,
+            ', '.join('%s=%r' % (name, getattr(self, name))
+                for name in self.__slots__)
+        )
+
+
+_row_classes = {}
+
+
+def get_row_class(names, class_name='Row'):
+    """
+    Returns the row class with given column names, the class is created
+    only once per column set
+    """
+    key = (class_name, tuple(names))
+    row_class = _row_classes.get(key)
+    if row_class is None:
+        row_class = type(class_name, (Row,), {'__slots__': tuple(names)})
+        _row_classes[key] = row_class
+    return row_class
+
+
+class RowResult(object):
+    """
+    Lazily iterated result of given query as row objects, the rows are
+    fetched `chunk_size` at a time and no ORM instances are built. Each
+    iteration executes the query again.
+
+    :param query: query selecting the columns given in `names`, in order
+    :param names: names of the selected columns
+    :param chunk_size: number of rows fetched from the cursor at a time
+    :param class_name: name of the generated row class
+    """
+    def __init__(self, query, names, chunk_size=100, class_name='Row'):
+        self.query = query
+        self.names = list(names)
+        self.chunk_size = chunk_size
+        self.row_class = get_row_class(self.names, class_name)
+
+    def __iter__(self):
+        statement = self.query.statement \
+            .execution_options(stream_results=True)
+        result = self.query.session.execute(statement)
+        row_class = self.row_class
+        try:
+            while True:
+                rows = result.fetchmany(self.chunk_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield row_class(row)
+        finally:
+            result.close()
@@ -0,0 +1,337 @@
+"""
+Pre-rendered snapshots of show and index pages.
+
+Resources that rarely change but are read a lot can be served from
+snapshots: the rendered show page of each object and the first `pages`
+index pages are stored in a snapshot store and served without touching the
+database or the template engine. ::
+
+    >>> snapshots = Snapshots(FileSnapshotStore('/var/cache/app'),
+    ...     pages=3, max_age=3600)
+    >>> router = ModelRouter(Country, snapshots=snapshots)
+    >>> app.register_blueprint(router.register(), url_prefix='/countries')
+
+Snapshots are rendered on the first request and whenever the write views of
+the router commit a change, only the show page of the written object and
+the index pages are rendered again. Snapshots older than `max_age` seconds
+are never served, which bounds the staleness caused by writes made outside
+the write views (eg. bulk imports or other processes). All snapshots can be
+rebuilt with `rebuild`, eg. from a management command.
+
+A snapshot is shared by all clients, so requests whose session holds any
+data (eg. flashed messages or a logged in user) are neither served from nor
+stored to snapshots, their pages are always rendered.
+"""
+import errno
+import os
+import sys
+from functools import wraps
+from tempfile import mkstemp
+from threading import Lock
+from time import time
+from urllib import quote
+
+from flask import Response, current_app, make_response, request, session
+from inflection import underscore
+from sqlalchemy.orm import class_mapper
+from werkzeug.exceptions import HTTPException
+
+
+def quote_key_part(value):
+    """
+    Quotes given value for use as a part of a snapshot key, the quoted value
+    contains no slashes and no dots so it is also a safe file name
+    """
+    return quote(unicode(value).encode('utf-8'), safe='').replace('.', '%2E')
+
+
+class Snapshot(tuple):
+    """
+    A rendered page
+
+    :param data: the response body
+    :param mimetype: mimetype of the response
+    :param created: unix timestamp of the rendering
+    """
+    __slots__ = ()
+
+    def __new__(cls, data, mimetype, created):
+        return tuple.__new__(cls, (data, mimetype, created))
+
+    @property
+    def data(self):
+        return self[0]
+
+    @property
+    def mimetype(self):
+        return self[1]
+
+    @property
+    def created(self):
+        return self[2]
+
+
+class MemorySnapshotStore(object):
+    """
+    Keeps snapshots in process memory
+    """
+    def __init__(self):
+        self.snapshots = {}
+        self.lock = Lock()
+
+    def get(self, key):
+        return self.snapshots.get(key)
+
+    def set(self, key, snapshot):
+        self.lock.acquire()
+        try:
+            self.snapshots[key] = snapshot
+        finally:
+            self.lock.release()
+
+    def delete(self, key):
+        self.lock.acquire()
+        try:
+            self.snapshots.pop(key, None)
+        finally:
+            self.lock.release()
+
+
+class FileSnapshotStore(object):
+    """
+    Keeps snapshots as files in given directory so that they are shared by
+    processes and survive restarts. Files are replaced atomically.
+    """
+    def __init__(self, directory):
+        self.directory = directory
+
+    def get_path(self, key):
+        """
+        Returns the path of the file of given key, raises ValueError for keys
+        that would resolve outside the directory
+        """
+        parts = key.split('/')
+        for part in parts:
+            if part in ('', '.', '..'):
+                raise ValueError('Invalid snapshot key %r.' % key)
+        return os.path.join(self.directory, *parts)
+
+    def get(self, key):
+        path = self.get_path(key)
+        try:
+            snapshot_file = open(path, 'rb')
+        except IOError:
+            return None
+        try:
+            created = os.fstat(snapshot_file.fileno()).st_mtime
+            mimetype = snapshot_file.readline().rstrip('\n')
+            return Snapshot(snapshot_file.read(), mimetype, created)
+        finally:
+            snapshot_file.close()
+
+    def set(self, key, snapshot):
+        path = self.get_path(key)
+        directory = os.path.dirname(path)
+        try:
+            os.makedirs(directory)
+        except OSError:
+            if not os.path.isdir(directory):
+                raise
+        fd, temp_path = mkstemp(dir=directory)
+        try:
+            os.write(fd, snapshot.mimetype + '\n' + snapshot.data)
+        finally:
+            os.close(fd)
+        os.utime(temp_path, (snapshot.created, snapshot.created))
+        os.rename(temp_path, path)
+
+    def delete(self, key):
+        try:
+            os.remove(self.get_path(key))
+        except OSError:
+            if sys.exc_info()[1].errno != errno.ENOENT:
+                raise
+
+
+class Snapshots(object):
+    """
+    Serves and maintains the snapshots of the show and index pages of one
+    ModelRouter resource
+
+    :param store: snapshot store, by default a MemorySnapshotStore
+    :param pages: number of index pages (from the first one) snapshotted
+    :param max_age: number of seconds a snapshot is served, older snapshots
+        are rendered again. None means no limit.
+    :param regenerate: if True the snapshots affected by a write are
+        rendered again right after the write commits, otherwise they are
+        only discarded and rendered by the next request. Regenerating
+        requires the write views to run their post-commit hooks outside the
+        committing thread, ie. with a ThreadExecutor (the default), so that
+        the pages are rendered on a session of their own. ModelRouter
+        rejects an InlineExecutor.
+    :param vary_headers: requests having any of these headers are not
+        served from nor stored to snapshots, eg. fragment requests
+    """
+    def __init__(self, store=None, pages=1, max_age=300, regenerate=True,
+            vary_headers=('X-Fragment',)):
+        if store is None:
+            store = MemorySnapshotStore()
+        self.store = store
+        self.pages = pages
+        self.max_age = max_age
+        self.regenerate = regenerate
+        self.vary_headers = vary_headers
+        self.app = None
+        self.views = {}
+
+    def init_app(self, app):
+        """
+        Sets the application snapshots are regenerated with, by default the
+        application of the first served request
+        """
+        self.app = app
+
+    def bind(self, model_class, blueprint_name):
+        """
+        Binds these snapshots to the resource of given model, called by
+        ModelRouter.register
+        """
+        self.model_class = model_class
+        self.resource = underscore(model_class.__name__)
+        self.pk_param = model_class.__table__.primary_key.columns.keys()[0]
+        self.endpoints = dict(
+            show='%s.show' % blueprint_name,
+            index='%s.index' % blueprint_name
+        )
+
+    def get_show_key(self, pk):
+        return '%s/show/%s' % (self.resource, quote_key_part(pk))
+
+    def get_key(self, route_key, view_args, args):
+        """
+        Returns the snapshot key of a request to given route or None if the
+        request is not snapshotted
+        """
+        if route_key == 'show':
+            if args:
+                return None
+            return self.get_show_key(view_args[self.pk_param])
+
+        for name in args:
+            if name != 'page':
+                return None
+        page = args.get('page', '1')
+        if not page.isdigit() or not 1 <= int(page) <= self.pages:
+            return None
+        return '%s/index/%d' % (self.resource, int(page))
+
+    def is_fresh(self, snapshot):
+        return self.max_age is None or \
+            time() - snapshot.created < self.max_age
+
+    def make_response(self, snapshot):
+        response = Response(snapshot.data, mimetype=snapshot.mimetype)
+        response.headers['Age'] = str(int(max(time() - snapshot.created, 0)))
+        return response
+
+    def store_response(self, key, response):
+        if response.status_code == 200 and not response.is_streamed:
+            self.store.set(
+                key,
+                Snapshot(response.data, response.mimetype, time())
+            )
+
+    def serve(self, route_key, f):
+        """
+        Decorates the view function of given route ('show' or 'index') to
+        serve fresh snapshots and store the responses it renders
+        """
+        self.views[route_key] = f
+
+        @wraps(f)
+        def decorator(*args, **kwargs):
+            key = None
+            if request.method == 'GET':
+                key = self.get_key(route_key, kwargs, request.args)
+            for header in self.vary_headers:
+                if header in request.headers:
+                    key = None
+            if session:
+                key = None
+            if key is None:
+                return f(*args, **kwargs)
+
+            if self.app is None:
+                self.app = current_app._get_current_object()
+            snapshot = self.store.get(key)
+            if snapshot is not None and self.is_fresh(snapshot):
+                return self.make_response(snapshot)
+            response = make_response(f(*args, **kwargs))
+            self.store_response(key, response)
+            return response
+        return decorator
+
+    def render(self, route_key, view_args, page=1):
+        """
+        Renders the snapshot of given route, returns the status code of the
+        rendered response
+        """
+        values = dict(view_args)
+        if page > 1:
+            values['page'] = page
+        path = self.app.url_map.bind('localhost') \
+            .build(self.endpoints[route_key], values)
+        ctx = self.app.test_request_context(path)
+        ctx.push()
+        try:
+            try:
+                response = make_response(self.views[route_key](**view_args))
+            except HTTPException:
+                return sys.exc_info()[1].code
+            key = self.get_key(route_key, view_args, request.args)
+            self.store_response(key, response)
+            return response.status_code
+        finally:
+            ctx.pop()
+
+    def render_index(self):
+        for page in range(1, self.pages + 1):
+            if self.render('index', {}, page) != 200:
+                break
+
+    def on_write(self, write_event):
+        """
+        Post-commit hook discarding, and regenerating, the snapshots
+        affected by given WriteEvent
+        """
+        if write_event.pk is not None:
+            self.store.delete(self.get_show_key(write_event.pk))
+        for page in range(1, self.pages + 1):
+            self.store.delete('%s/index/%d' % (self.resource, page))
+
+        if not self.regenerate or self.app is None:
+            return
+        if write_event.pk is not None and write_event.action != 'delete':
+            self.render('show', {self.pk_param: write_event.pk})
+        self.render_index()
+
+    def rebuild(self, app=None):
+        """
+        Renders the snapshots of all objects and of the index pages again,
+        eg. from a Flask-Script command ::
+
+            >>> manager.command(snapshots.rebuild)
+        """
+        if app is not None:
+            self.app = app
+        ctx = self.app.app_context()
+        ctx.push()
+        try:
+            primary_key = class_mapper(self.model_class).primary_key[0]
+            pks = [row[0] for row in
+                self.model_class.query.with_entities(primary_key)]
+        finally:
+            ctx.pop()
+        for pk in pks:
+            self.render('show', {self.pk_param: pk})
+        self.render_index()
@@ -0,0 +1,49 @@
+"""
+Test helpers for applications using generic views.
+"""
+from .budgets import QueryRecorder
+
+
+def count_queries(f, *args, **kwargs):
+    """
+    Calls given function and returns a (result, QueryRecorder) tuple with
+    the statements it executed
+    """
+    recorder = QueryRecorder()
+    recorder.start()
+    try:
+        result = f(*args, **kwargs)
+    finally:
+        recorder.stop()
+    return result, recorder
+
+
+def format_failure(expected, recorder):
+    return 'Expected %s statements, %d were executed:\n%s' % (
+        expected,
+        recorder.count,
+        '\n'.join(statement.statement for statement in recorder.statements)
+    )
+
+
+def assert_num_queries(count, f, *args, **kwargs):
+    """
+    Calls given function and asserts that it executed exactly `count`
+    statements, returns the result of the function ::
+
+        >>> assert_num_queries(2, client.get, '/users')
+    """
+    result, recorder = count_queries(f, *args, **kwargs)
+    assert recorder.count == count, format_failure(count, recorder)
+    return result
+
+
+def assert_max_queries(max_count, f, *args, **kwargs):
+    """
+    Calls given function and asserts that it executed at most `max_count`
+    statements, returns the result of the function
+    """
+    result, recorder = count_queries(f, *args, **kwargs)
+    assert recorder.count <= max_count, \
+        format_failure('at most %d' % max_count, recorder)
+    return result
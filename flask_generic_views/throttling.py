@@ -0,0 +1,115 @@
+"""
+Request throttling for generic views.
+
+Throttle is a token bucket based view decorator. Each client gets a bucket
+per endpoint which is refilled at `rate` tokens per second up to
+`capacity` tokens. Each request consumes tokens according to its cost, when
+the bucket runs out the request is rejected with 429 before the view is
+called. ::
+
+    >>> router = ModelRouter(User, throttle=Throttle(rate=5, capacity=50))
+
+The buckets are stored in a backend. MemoryBackend keeps them within the
+process, shared backends (eg. redis) can be plugged in by implementing the
+`consume` method.
+"""
+from functools import wraps
+from threading import Lock
+from time import time
+
+from flask import request
+
+from .exceptions import TooManyRequests
+
+
+class MemoryBackend(object):
+    """
+    Stores token buckets in process memory
+
+    :param max_keys: when the number of stored buckets exceeds this, the
+        buckets that have been refilled completely are discarded
+    """
+    def __init__(self, max_keys=10000):
+        self.max_keys = max_keys
+        self.buckets = {}
+        self.lock = Lock()
+
+    def consume(self, key, cost, rate, capacity):
+        """
+        Consumes `cost` tokens from the bucket identified by given key.
+
+        Returns the number of seconds the client has to wait before the
+        request can be accepted, zero if the tokens were consumed.
+        """
+        now = time()
+        self.lock.acquire()
+        try:
+            tokens, updated = self.buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            if tokens < cost:
+                self.buckets[key] = (tokens, now)
+                return (cost - tokens) / float(rate)
+            self.buckets[key] = (tokens - cost, now)
+            if len(self.buckets) > self.max_keys:
+                self.prune(now, rate, capacity)
+            return 0
+        finally:
+            self.lock.release()
+
+    def prune(self, now, rate, capacity):
+        for key, (tokens, updated) in self.buckets.items():
+            if tokens + (now - updated) * rate >= capacity:
+                del self.buckets[key]
+
+
+def request_key():
+    """
+    Returns the default throttling key: client address and endpoint
+    """
+    return '%s:%s' % (request.remote_addr, request.endpoint)
+
+
+def request_cost():
+    """
+    Returns the default cost of a request: one token plus one per each
+    hundred requested items
+    """
+    return 1 + max(0, request.args.get('per_page', 0, type=int)) // 100
+
+
+class Throttle(object):
+    """
+    Token bucket view decorator
+
+    :param rate: number of tokens added to each bucket per second
+    :param capacity: maximum number of tokens in a bucket
+    :param cost: callable returning the cost of current request
+    :param key: callable returning the bucket key of current request
+    :param backend: bucket storage, MemoryBackend by default
+    """
+    def __init__(self, rate=10, capacity=100, cost=request_cost,
+            key=request_key, backend=None):
+        self.rate = rate
+        self.capacity = capacity
+        self.cost = cost
+        self.key = key
+        if backend is None:
+            backend = MemoryBackend()
+        self.backend = backend
+
+    def check(self):
+        """
+        Raises TooManyRequests if the current request exceeds the limit
+        """
+        retry_after = self.backend.consume(
+            self.key(), self.cost(), self.rate, self.capacity
+        )
+        if retry_after:
+            raise TooManyRequests(retry_after=retry_after + 1)
+
+    def __call__(self, f):
+        @wraps(f)
+        def decorator(*args, **kwargs):
+            self.check()
+            return f(*args, **kwargs)
+        return decorator
@@ -0,0 +1,256 @@
+"""
+Executors for running jobs outside of the request.
+
+InlineExecutor runs jobs immediately, ThreadExecutor runs them in
+background threads and ProcessExecutor in a pool of processes. All of them
+have the same `submit` interface so views can be configured with any one.
+The background executors have bounded queues, when the queue is full
+`submit` raises Full. Their `stats` method returns counters that can be
+used for monitoring the backpressure.
+"""
+import logging
+import traceback
+from collections import deque
+from cPickle import dumps, loads, HIGHEST_PROTOCOL
+from Queue import Queue, Full
+from threading import Lock, Thread
+
+
+logger = logging.getLogger(__name__)
+
+
+class InlineExecutor(object):
+    """
+    Runs jobs immediately in the calling thread
+    """
+    def submit(self, func, *args, **kwargs):
+        func(*args, **kwargs)
+
+
+class ExecutorStats(object):
+    """
+    Thread-safe job counters for executors
+    """
+    def __init__(self):
+        self.stats_lock = Lock()
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def count(self, counter, amount=1):
+        self.stats_lock.acquire()
+        try:
+            setattr(self, counter, getattr(self, counter) + amount)
+        finally:
+            self.stats_lock.release()
+
+    def stats(self):
+        """
+        Returns a dict of the job counters and the number of pending jobs
+        """
+        return dict(
+            submitted=self.submitted,
+            completed=self.completed,
+            failed=self.failed,
+            rejected=self.rejected,
+            pending=self.submitted - self.completed - self.failed,
+            max_queue_size=self.max_queue_size
+        )
+
+
+class ThreadExecutor(ExecutorStats):
+    """
+    Runs jobs in background threads
+
+    :param workers: number of worker threads, started on first submit
+    :param max_queue_size: maximum number of pending jobs, submit raises
+        Full when the queue is full
+    """
+    def __init__(self, workers=1, max_queue_size=1000):
+        ExecutorStats.__init__(self)
+        self.workers = workers
+        self.max_queue_size = max_queue_size
+        self.queue = Queue(max_queue_size)
+        self.threads = []
+        self.lock = Lock()
+
+    def start(self):
+        self.lock.acquire()
+        try:
+            while len(self.threads) < self.workers:
+                thread = Thread(target=self.run)
+                thread.setDaemon(True)
+                thread.start()
+                self.threads.append(thread)
+        finally:
+            self.lock.release()
+
+    def submit(self, func, *args, **kwargs):
+        if len(self.threads) < self.workers:
+            self.start()
+        self.count('submitted')
+        try:
+            self.queue.put_nowait((func, args, kwargs))
+        except Full:
+            self.count('submitted', -1)
+            self.count('rejected')
+            raise
+
+    def run(self):
+        while True:
+            func, args, kwargs = self.queue.get()
+            try:
+                try:
+                    func(*args, **kwargs)
+                    self.count('completed')
+                except Exception:
+                    self.count('failed')
+                    logger.exception('Job %r failed' % func)
+            finally:
+                self.queue.task_done()
+
+    def join(self):
+        """
+        Blocks until all submitted jobs have been run
+        """
+        self.queue.join()
+
+
+def call_job(func, args, kwargs):
+    """
+    Runs a job within a worker process, returns the formatted traceback if
+    the job failed
+    """
+    try:
+        func(*args, **kwargs)
+    except Exception:
+        return traceback.format_exc()
+    return None
+
+
+def call_pickled_job(data):
+    """
+    Same as call_job for a job pickled by ProcessExecutor.submit
+    """
+    try:
+        func, args, kwargs = loads(data)
+    except Exception:
+        return traceback.format_exc()
+    return call_job(func, args, kwargs)
+
+
+class ProcessExecutor(ExecutorStats):
+    """
+    Runs jobs in a multiprocessing pool, the jobs and their arguments must
+    be picklable. Jobs are pickled by `submit`, which raises the pickling
+    error and counts the job failed if they are not, as the pool would drop
+    them silently. Bound methods can not be pickled, and jobs that change
+    the state of the submitting process (eg. snapshot or change feed hooks)
+    have no effect in a worker process.
+
+    :param processes: number of worker processes, by default the number of
+        cpus. The pool is created on first submit.
+    :param max_queue_size: maximum number of pending jobs, submit raises
+        Full when exceeded
+    """
+    def __init__(self, processes=None, max_queue_size=1000):
+        ExecutorStats.__init__(self)
+        self.processes = processes
+        self.max_queue_size = max_queue_size
+        self.pool = None
+        self.lock = Lock()
+
+    def get_pool(self):
+        self.lock.acquire()
+        try:
+            if self.pool is None:
+                from multiprocessing import Pool
+                self.pool = Pool(self.processes)
+            return self.pool
+        finally:
+            self.lock.release()
+
+    def job_done(self, error):
+        if error is None:
+            self.count('completed')
+        else:
+            self.count('failed')
+            logger.error('Job failed in worker process:\n%s' % error)
+
+    def submit(self, func, *args, **kwargs):
+        if self.stats()['pending'] >= self.max_queue_size:
+            self.count('rejected')
+            raise Full()
+        self.count('submitted')
+        try:
+            data = dumps((func, args, kwargs), HIGHEST_PROTOCOL)
+        except Exception:
+            self.count('failed')
+            logger.exception('Job %r can not be pickled' % func)
+            raise
+        self.get_pool().apply_async(
+            call_pickled_job,
+            (data,),
+            callback=self.job_done
+        )
+
+    def imap(self, func, arguments, max_pending=None):
+        """
+        Calls given function with each tuple of arguments in the worker
+        processes and yields the results in order. At most `max_pending`
+        calls (by default twice the number of processes) are in flight at a
+        time, which bounds the memory held by pending arguments and results.
+        Exceptions raised by the function are re-raised when its result is
+        reached.
+        """
+        pool = self.get_pool()
+        if max_pending is None:
+            from multiprocessing import cpu_count
+            max_pending = 2 * (self.processes or cpu_count())
+        pending = deque()
+        for args in arguments:
+            if len(pending) >= max_pending:
+                yield self.get_result(pending.popleft())
+            self.count('submitted')
+            pending.append(pool.apply_async(func, args))
+        while pending:
+            yield self.get_result(pending.popleft())
+
+    def get_result(self, async_result):
+        try:
+            result = async_result.get()
+        except Exception:
+            self.count('failed')
+            raise
+        self.count('completed')
+        return result
+
+    def join(self):
+        """
+        Waits for all submitted jobs and closes the pool
+        """
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+
+_default_executor = None
+_default_executor_lock = Lock()
+
+
+def get_default_executor():
+    """
+    Returns the process wide ThreadExecutor shared by views that have no
+    executor of their own
+    """
+    global _default_executor
+    if _default_executor is None:
+        _default_executor_lock.acquire()
+        try:
+            if _default_executor is None:
+                _default_executor = ThreadExecutor()
+        finally:
+            _default_executor_lock.release()
+    return _default_executor
@@ -3,11 +3,13 @@ from flask.ext.sqlalchemy import SQLAlchemy
 
 
 class TestCase(object):
+    database_uri = 'sqlite://'
 
     def setup_method(self, method):
         self.app = Flask(__name__)
         self.app.debug = True
         self.app.secret_key = 'not a secret'
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = self.database_uri
 
         db = SQLAlchemy(self.app)
 
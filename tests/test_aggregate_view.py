@@ -0,0 +1,75 @@
+from flask import json
+from flask_generic_views import AggregateView
+from sqlalchemy import event
+from werkzeug.contrib.cache import SimpleCache
+
+from . import TestCase
+
+
+class TestAggregateView(TestCase):
+    def setup_method(self, method):
+        TestCase.setup_method(self, method)
+        self.cache = SimpleCache()
+        self.app.add_url_rule('/users/aggregate',
+            view_func=AggregateView.as_view('aggregate',
+                model_class=self.User,
+                group_by_columns=['name'],
+                aggregates={'age': ['sum', 'avg', 'max']},
+                cache=self.cache
+            )
+        )
+        self.db.session.add_all([
+            self.User(name=u'John Matrix', age=35),
+            self.User(name=u'John Matrix', age=25),
+            self.User(name=u'Luke Skywalker', age=30),
+        ])
+        self.db.session.commit()
+
+    def test_computes_grouped_aggregates(self):
+        response = self.client.get(
+            '/users/aggregate?group_by=name&aggregate=sum:age,max:age'
+            '&format=json'
+        )
+        assert json.loads(response.data) == [
+            {'name': 'John Matrix', 'count': 2, 'sum_age': 60,
+                'max_age': 35},
+            {'name': 'Luke Skywalker', 'count': 1, 'sum_age': 30,
+                'max_age': 30},
+        ]
+
+    def test_applies_filters(self):
+        response = self.client.get('/users/aggregate?name=Luke')
+        assert response.data.split() == ['1']
+
+    def test_returns_400_for_aggregate_not_allowed(self):
+        response = self.client.get('/users/aggregate?aggregate=min:age')
+        assert response.status_code == 400
+
+    def test_returns_400_for_group_by_column_not_allowed(self):
+        response = self.client.get('/users/aggregate?group_by=age')
+        assert response.status_code == 400
+
+    def test_caches_results_per_filter_signature(self):
+        statements = []
+
+        def log(conn, cursor, statement, *args):
+            statements.append(statement)
+        event.listen(self.db.engine, 'before_cursor_execute', log)
+
+        self.client.get('/users/aggregate?group_by=name')
+        self.client.get('/users/aggregate?group_by=name&format=json')
+        assert len(statements) == 1
+        self.client.get('/users/aggregate?group_by=name&age=30')
+        assert len(statements) == 2
+
+    def test_cache_keys_are_hashed(self):
+        self.client.get('/users/aggregate?group_by=name&name=John%20Matrix')
+        key, = self.cache._cache.keys()
+        assert key.startswith('aggregate:')
+        assert ' ' not in key
+        assert len(key) == len('aggregate:') + 40
+
+    def test_ignores_unknown_params_in_cache_key(self):
+        self.client.get('/users/aggregate?group_by=name')
+        self.client.get('/users/aggregate?group_by=name&utm_source=mail')
+        assert len(self.cache._cache) == 1
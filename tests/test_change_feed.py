@@ -0,0 +1,151 @@
+from __future__ import with_statement
+
+from threading import Timer
+
+from flask import json
+from flask_generic_views import (ChangeFeed, ImproperlyConfigured,
+    InlineExecutor, ModelRouter, ProcessExecutor)
+from pytest import raises
+
+from . import TestCase
+
+
+class TestChangeFeed(object):
+    def test_numbers_changes(self):
+        feed = ChangeFeed()
+        feed.append(1, 'create')
+        change = feed.append(1, 'update')
+        assert change.seq == 2
+        assert feed.last_seq == 2
+
+    def test_since_returns_changes_after_given_seq(self):
+        feed = ChangeFeed()
+        for pk in range(1, 4):
+            feed.append(pk, 'create')
+        changes, truncated = feed.since(1)
+        assert [change.pk for change in changes] == [2, 3]
+        assert not truncated
+
+    def test_since_is_truncated_when_changes_were_dropped(self):
+        feed = ChangeFeed(max_size=2)
+        for pk in range(1, 5):
+            feed.append(pk, 'create')
+        changes, truncated = feed.since(1)
+        assert [change.pk for change in changes] == [3, 4]
+        assert truncated
+        assert not feed.since(2)[1]
+
+    def test_since_is_truncated_for_unknown_seq(self):
+        feed = ChangeFeed()
+        feed.append(1, 'create')
+        assert feed.since(5) == ([], True)
+
+    def test_wait_returns_on_append(self):
+        feed = ChangeFeed()
+        timer = Timer(0.05, feed.append, (1, 'delete'))
+        timer.start()
+        changes, truncated = feed.wait(0, 5)
+        timer.join()
+        assert [change.action for change in changes] == ['delete']
+
+    def test_wait_times_out(self):
+        assert ChangeFeed().wait(0, 0.01) == ([], False)
+
+
+class TestWatch(TestCase):
+    def test_feeds_committed_orm_writes(self):
+        feed = ChangeFeed()
+        feed.watch(self.User)
+        user = self.User(name=u'John Matrix', age=35)
+        self.db.session.add(user)
+        self.db.session.commit()
+        user.age = 36
+        self.db.session.commit()
+        self.db.session.delete(user)
+        self.db.session.commit()
+        changes, truncated = feed.since(0)
+        assert [(change.pk, change.action) for change in changes] == [
+            (1, 'create'), (1, 'update'), (1, 'delete')
+        ]
+
+    def test_ignores_rolled_back_writes(self):
+        feed = ChangeFeed()
+        feed.watch(self.User)
+        self.db.session.add(self.User(name=u'John Matrix', age=35))
+        self.db.session.flush()
+        self.db.session.rollback()
+        assert feed.last_seq == 0
+
+
+class TestChangeFeedView(TestCase):
+    def setup_method(self, method):
+        TestCase.setup_method(self, method)
+        self.feed = ChangeFeed()
+        router = ModelRouter(
+            self.User,
+            change_feed=self.feed,
+            view_kwargs={'executor': InlineExecutor()}
+        )
+        router.bind_view_args('changes', stream_duration=0.1, heartbeat=0.05)
+        self.app.register_blueprint(router.register(), url_prefix='/users')
+
+    def get_json(self, url, **kwargs):
+        return json.loads(self.client.get(url, **kwargs).data)
+
+    def test_router_rejects_process_executor(self):
+        router = ModelRouter(
+            self.User,
+            change_feed=ChangeFeed(),
+            view_kwargs={'executor': ProcessExecutor()}
+        )
+        with raises(ImproperlyConfigured):
+            router.register()
+
+    def test_write_views_feed_their_changes(self):
+        self.client.post('/users', data={'name': u'John Matrix', 'age': 35})
+        self.client.put('/users/1', data={'name': u'Jack Daniels'})
+        data = self.get_json('/users/changes?since=0')
+        assert data['last_seq'] == 2
+        assert not data['truncated']
+        assert [change['action'] for change in data['changes']] == [
+            'create', 'update'
+        ]
+
+    def test_filters_changes(self):
+        self.feed.append(1, 'create')
+        self.feed.append(2, 'create')
+        self.feed.append(1, 'update')
+        data = self.get_json('/users/changes?since=0&pk=1&action=update')
+        assert [change['seq'] for change in data['changes']] == [3]
+        assert data['last_seq'] == 3
+
+    def test_skips_filtered_changes_until_timeout(self):
+        self.feed.append(2, 'create')
+        data = self.get_json('/users/changes?since=0&pk=1&timeout=0')
+        assert data == {'last_seq': 1, 'truncated': False, 'changes': []}
+
+    def test_defaults_to_changes_after_the_request(self):
+        self.feed.append(1, 'create')
+        data = self.get_json('/users/changes?timeout=0')
+        assert data['changes'] == []
+        assert data['last_seq'] == 1
+
+    def test_invalid_since_is_rejected(self):
+        response = self.client.get('/users/changes?since=abc')
+        assert response.status_code == 400
+
+    def test_non_finite_timeout_is_rejected(self):
+        for timeout in ['nan', 'inf', '-inf']:
+            response = self.client.get('/users/changes?timeout=' + timeout)
+            assert response.status_code == 400
+
+    def test_streams_server_sent_events(self):
+        self.feed.append(1, 'create')
+        response = self.client.get(
+            '/users/changes',
+            headers={'Accept': 'text/event-stream', 'Last-Event-ID': '0'}
+        )
+        assert response.mimetype == 'text/event-stream'
+        data = response.data
+        assert data.startswith('id: 1\nevent: create\ndata: {')
+        assert ': keep-alive\n\n' in data
@@ -0,0 +1,60 @@
+import gzip
+from StringIO import StringIO
+
+from flask import Response
+from flask_generic_views import compressed
+
+from . import TestCase
+
+
+def gunzip(data):
+    return gzip.GzipFile(fileobj=StringIO(data)).read()
+
+
+class TestCompressed(TestCase):
+    def setup_method(self, method):
+        TestCase.setup_method(self, method)
+
+        @self.app.route('/large')
+        @compressed
+        def large():
+            return 'a' * 1000
+
+        @self.app.route('/small')
+        @compressed
+        def small():
+            return 'a'
+
+        @self.app.route('/streamed')
+        @compressed
+        def streamed():
+            return Response(iter(['a' * 1000, 'b' * 1000]))
+
+    def test_compresses_response_if_client_accepts_gzip(self):
+        response = self.client.get('/large',
+            headers={'Accept-Encoding': 'gzip'}
+        )
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert gunzip(response.data) == 'a' * 1000
+
+    def test_does_not_compress_if_client_does_not_accept_gzip(self):
+        response = self.client.get('/large')
+        assert 'Content-Encoding' not in response.headers
+        assert response.data == 'a' * 1000
+
+    def test_does_not_compress_small_responses(self):
+        response = self.client.get('/small',
+            headers={'Accept-Encoding': 'gzip'}
+        )
+        assert 'Content-Encoding' not in response.headers
+
+    def test_compresses_streamed_responses(self):
+        response = self.client.get('/streamed',
+            headers={'Accept-Encoding': 'gzip'}
+        )
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert gunzip(response.data) == 'a' * 1000 + 'b' * 1000
+
+    def test_adds_accept_encoding_to_vary_header(self):
+        response = self.client.get('/large')
+        assert 'Accept-Encoding' in response.headers['Vary']
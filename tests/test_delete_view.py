@@ -1,4 +1,8 @@
-from flask_generic_views import DeleteView, SortedListView
+from __future__ import with_statement
+
+from flask_generic_views import (DeleteView, ImproperlyConfigured,
+    InlineExecutor, ProcessExecutor, SortedListView)
+from pytest import raises
 
 from . import TestCase
 
@@ -31,3 +35,107 @@ class TestDeleteView(TestCase):
         response = self.client.get('/users')
 
         assert 'User deleted.' in response.data
+
+
+class DeleteStrategyTestCase(TestCase):
+    def setup_method(self, method):
+        TestCase.setup_method(self, method)
+        db = self.db
+
+        class Post(db.Model):
+            id = db.Column(db.Integer, autoincrement=True, primary_key=True)
+            deleted_at = db.Column(db.DateTime)
+
+        self.Post = Post
+        db.create_all()
+        db.session.add(Post())
+        db.session.commit()
+
+    def add_view(self, **kwargs):
+        self.app.add_url_rule('/posts/<int:id>',
+            view_func=DeleteView.as_view('delete',
+                model_class=self.Post,
+                success_url='user.index',
+                **kwargs)
+        )
+        self.app.add_url_rule('/posts',
+            view_func=SortedListView.as_view('user.index',
+                model_class=self.Post,
+                template='user/index.html',
+                soft_delete_column='deleted_at')
+        )
+
+
+class TestSoftDelete(DeleteStrategyTestCase):
+    def setup_method(self, method):
+        DeleteStrategyTestCase.setup_method(self, method)
+        self.add_view(delete_strategy='soft', soft_delete_column='deleted_at')
+
+    def test_marks_row_deleted(self):
+        response = self.client.delete('/posts/1')
+        assert response.status_code == 302
+        assert self.Post.query.get(1).deleted_at is not None
+
+    def test_soft_deleted_rows_are_filtered_out(self):
+        self.client.delete('/posts/1')
+        assert self.client.delete('/posts/1').status_code == 404
+        assert '1' not in self.client.get('/posts').data.split()
+
+
+class TestDirectDelete(DeleteStrategyTestCase):
+    def setup_method(self, method):
+        DeleteStrategyTestCase.setup_method(self, method)
+        self.add_view(delete_strategy='direct')
+
+    def test_deletes_row(self):
+        response = self.client.delete('/posts/1')
+        assert response.status_code == 302
+        assert self.Post.query.get(1) is None
+
+    def test_returns_404_if_not_found(self):
+        assert self.client.delete('/posts/123').status_code == 404
+
+
+class TestDeferredDelete(DeleteStrategyTestCase):
+    def setup_method(self, method):
+        DeleteStrategyTestCase.setup_method(self, method)
+        self.add_view(delete_strategy='deferred', executor=InlineExecutor())
+
+    def test_returns_202_and_deletes_row(self):
+        response = self.client.delete('/posts/1')
+        assert response.status_code == 202
+        assert self.Post.query.get(1) is None
+
+    def test_returns_404_if_not_found(self):
+        assert self.client.delete('/posts/123').status_code == 404
+
+    def test_rejects_process_executor(self):
+        self.app.add_url_rule('/process_posts/<int:id>',
+            view_func=DeleteView.as_view('process_delete',
+                model_class=self.Post,
+                delete_strategy='deferred',
+                executor=ProcessExecutor()
+            )
+        )
+        with raises(ImproperlyConfigured):
+            self.client.delete('/process_posts/1')
+
+    def test_does_not_close_the_session_of_the_request(self):
+        sessions = []
+
+        class CheckingDeleteView(DeleteView):
+            def defer_delete(self, pk):
+                post = self.get_object(id=pk)
+                response = DeleteView.defer_delete(self, pk)
+                sessions.append(post in self.session)
+                return response
+        self.app.add_url_rule('/checked_posts/<int:id>',
+            view_func=CheckingDeleteView.as_view('checked_delete',
+                model_class=self.Post,
+                delete_strategy='deferred',
+                executor=InlineExecutor()
+            )
+        )
+        response = self.client.delete('/checked_posts/1')
+        assert response.status_code == 202
+        assert sessions == [True]
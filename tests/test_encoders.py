@@ -0,0 +1,56 @@
+from datetime import date
+from decimal import Decimal
+
+from flask import json
+from flask_generic_views import JSONRowEncoder, CSVRowEncoder
+
+
+class TestJSONRowEncoder(object):
+    def test_encodes_values_by_column_type(self):
+        encoder = JSONRowEncoder(
+            ['id', 'name', 'active', 'born', 'price'],
+            [int, unicode, bool, date, Decimal]
+        )
+        rows = [
+            (1, u'J\xf6rg', True, date(2012, 1, 2), Decimal('1.50')),
+            (2, None, False, None, None)
+        ]
+        data = ''.join(encoder.iter_chunks(rows))
+        assert json.loads(data) == [
+            {'id': 1, 'name': u'J\xf6rg', 'active': True,
+                'born': '2012-01-02', 'price': 1.5},
+            {'id': 2, 'name': None, 'active': False, 'born': None,
+                'price': None}
+        ]
+
+    def test_yields_chunks_of_chunk_size_rows(self):
+        encoder = JSONRowEncoder(['id'], [int], chunk_size=2)
+        chunks = list(encoder.iter_chunks([(1,), (2,), (3,)]))
+        assert chunks == ['[{"id":1},{"id":2}', ',{"id":3}]']
+
+    def test_encodes_empty_result(self):
+        encoder = JSONRowEncoder(['id'], [int])
+        assert ''.join(encoder.iter_chunks([])) == '[]'
+
+    def test_fragments_join_to_same_document(self):
+        encoder = JSONRowEncoder(['id'], [int])
+        fragments = [
+            encoder.encode_rows([(1,), (2,)]),
+            encoder.encode_rows([]),
+            encoder.encode_rows([(3,)])
+        ]
+        assert ''.join(encoder.iter_document(fragments)) == \
+            ''.join(encoder.iter_chunks([(1,), (2,), (3,)]))
+
+
+class TestCSVRowEncoder(object):
+    def test_encodes_header_and_rows(self):
+        encoder = CSVRowEncoder(['id', 'name', 'active'],
+            [int, unicode, bool])
+        rows = [(1, u'J\xf6rg, Jr.', True), (2, None, False)]
+        data = ''.join(encoder.iter_chunks(rows))
+        assert data.splitlines() == [
+            'id,name,active',
+            '1,"J\xc3\xb6rg, Jr.",1',
+            '2,,0'
+        ]
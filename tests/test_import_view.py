@@ -0,0 +1,184 @@
+from cStringIO import StringIO
+
+from flask import json
+from flask_generic_views import ImportView, ModelRouter
+from sqlalchemy import event
+
+from . import TestCase
+
+
+CSV = '''name,age
+John Matrix,35
+Jack Daniels,sixty
+Luke Skywalker,
+Darth Vader,55
+'''
+
+NDJSON = '''{"name": "John Matrix", "age": 35}
+{"name": "Jack Daniels", "age": "sixty"}
+
+not json
+{"name": "Darth Vader"}
+'''
+
+
+class TestImportView(TestCase):
+    def setup_method(self, method):
+        TestCase.setup_method(self, method)
+        self.app.add_url_rule('/users/import',
+            view_func=ImportView.as_view('import',
+                model_class=self.User,
+                batch_size=2
+            )
+        )
+
+    def post(self, data, content_type='text/csv'):
+        response = self.client.post(
+            '/users/import',
+            data=data,
+            content_type=content_type
+        )
+        return response, [json.loads(line) for line in
+            response.data.splitlines()]
+
+    def test_imports_csv(self):
+        response, progress = self.post(CSV)
+        assert response.status_code == 200
+        assert response.mimetype == 'application/x-ndjson'
+        users = self.User.query.order_by(self.User.id).all()
+        assert [(user.name, user.age) for user in users] == [
+            (u'John Matrix', 35),
+            (u'Luke Skywalker', None),
+            (u'Darth Vader', 55),
+        ]
+
+    def test_reports_progress_and_row_errors_per_batch(self):
+        response, progress = self.post(CSV)
+        assert progress == [
+            {'processed': 2, 'imported': 1, 'failed': 1, 'errors': [
+                {'line': 3, 'errors': {'age': 'Not a valid integer.'}}
+            ]},
+            {'processed': 4, 'imported': 3, 'failed': 1, 'errors': []},
+            {'processed': 4, 'imported': 3, 'failed': 1, 'done': True},
+        ]
+
+    def test_imports_ndjson(self):
+        response, progress = self.post(NDJSON, 'application/x-ndjson')
+        assert progress[-1] == {
+            'processed': 4, 'imported': 2, 'failed': 2, 'done': True
+        }
+        assert progress[1]['errors'] == [
+            {'line': 4, 'errors': {'row': 'Could not be read.'}}
+        ]
+        assert [user.name for user in self.User.query] == [
+            u'John Matrix', u'Darth Vader'
+        ]
+
+    def test_inserts_each_batch_with_single_statement(self):
+        statements = []
+
+        def log(conn, cursor, statement, parameters, context, executemany):
+            if statement.startswith('INSERT'):
+                statements.append(executemany)
+        event.listen(self.db.engine, 'before_cursor_execute', log)
+
+        self.post('name,age\nJohn Matrix,35\nJack Daniels,60\n'
+            'Luke Skywalker,30\n')
+        assert statements == [True, False]
+
+    def test_inserts_rows_with_missing_columns_separately(self):
+        statements = []
+
+        def log(conn, cursor, statement, parameters, context, executemany):
+            if statement.startswith('INSERT'):
+                statements.append(statement)
+        event.listen(self.db.engine, 'before_cursor_execute', log)
+
+        self.post(CSV)
+        assert len(statements) == 3
+        assert 'age' not in statements[1]
+
+    def test_accepts_multipart_uploads(self):
+        response = self.client.post('/users/import', data={
+            'file': (StringIO(CSV), 'users.csv')
+        })
+        assert response.status_code == 200
+        assert json.loads(response.data.splitlines()[-1])['imported'] == 3
+        assert self.User.query.count() == 3
+
+    def test_returns_400_for_unknown_columns(self):
+        response, errors = self.post('name,password\nJohn,secret\n')
+        assert response.status_code == 400
+        assert errors == [
+            {'errors': {'columns': 'Unknown columns: password.'}}
+        ]
+        assert self.User.query.count() == 0
+
+    def test_returns_415_for_unsupported_content_type(self):
+        response = self.client.post(
+            '/users/import',
+            data='<users />',
+            content_type='application/xml'
+        )
+        assert response.status_code == 415
+
+
+class TestImportDefaults(TestCase):
+    def setup_method(self, method):
+        TestCase.setup_method(self, method)
+        db = self.db
+
+        class Account(db.Model):
+            id = db.Column(db.Integer, autoincrement=True, primary_key=True)
+            name = db.Column(db.Unicode(255), nullable=False)
+            status = db.Column(db.Unicode(20), nullable=False,
+                default=u'active')
+            plan = db.Column(db.Unicode(20), default=u'free')
+
+        self.Account = Account
+        db.create_all()
+        self.app.add_url_rule('/accounts/import',
+            view_func=ImportView.as_view('import', model_class=Account)
+        )
+
+    def test_missing_columns_get_their_defaults(self):
+        response = self.client.post(
+            '/accounts/import',
+            data='{"name": "John"}\n'
+                '{"name": "Jack", "status": "closed", "plan": null}\n',
+            content_type='application/x-ndjson'
+        )
+        assert json.loads(response.data.splitlines()[-1])['imported'] == 2
+        accounts = self.Account.query.order_by(self.Account.id).all()
+        assert [(account.status, account.plan) for account in accounts] == [
+            (u'active', u'free'),
+            (u'closed', None)
+        ]
+
+
+class TestModelRouterImport(TestCase):
+    def test_import_route_is_opt_in(self):
+        self.app.register_blueprint(
+            ModelRouter(self.User).register(),
+            url_prefix='/users'
+        )
+        response = self.client.post(
+            '/users/import',
+            data='name,age\nJohn Matrix,35\n',
+            content_type='text/csv'
+        )
+        assert response.status_code == 405
+        assert self.User.query.count() == 0
+
+    def test_registers_import_route(self):
+        self.app.register_blueprint(
+            ModelRouter(self.User, importer=True).register(),
+            url_prefix='/users'
+        )
+        response = self.client.post(
+            '/users/import',
+            data='name,age\nJohn Matrix,35\n',
+            content_type='text/csv'
+        )
+        assert json.loads(response.data.splitlines()[-1])['imported'] == 1
+        assert self.User.query.count() == 1
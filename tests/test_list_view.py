@@ -1,8 +1,17 @@
 from __future__ import with_statement
 
+import os
+from tempfile import mkstemp
+
+from flask import json
 from flask.templating import TemplateNotFound
-from flask.ext.generic_views import SortedListView
+from flask.ext.generic_views import (ListView, SortedListView,
+    PaginationMixin, SortMixin, ProcessExecutor, JSONRowEncoder,
+    CSVRowEncoder)
+from flask.ext.generic_views.exports import iter_ranges
+from flask.ext.generic_views.exceptions import ImproperlyConfigured
 from pytest import raises
+from sqlalchemy import event
 
 from . import TestCase
 
@@ -26,6 +35,13 @@ class ListTestCase(TestCase):
         self.db.session.commit()
 
 
+def get_item_ids(response):
+    """
+    Returns the ids of the items listed by user/index.html, in order
+    """
+    return [int(word) for word in response.data.split() if word.isdigit()]
+
+
 class TestListView(ListTestCase):
     def test_if_template_not_set_tries_to_use_default_template(self):
         response = self.client.get('/users')
@@ -39,3 +55,302 @@ class TestListView(ListTestCase):
         )
         with raises(TemplateNotFound):
             self.client.get('/users')
+
+    def test_returns_400_if_per_page_exceeds_max_per_page(self):
+        response = self.client.get('/users?per_page=1000000')
+        assert response.status_code == 400
+
+    def test_returns_400_for_non_positive_per_page(self):
+        response = self.client.get('/users?per_page=0')
+        assert response.status_code == 400
+
+
+class TestListViewFragments(ListTestCase):
+    def test_renders_only_requested_block(self):
+        response = self.client.get('/users?fragment=pagination')
+        assert response.status_code == 200
+        assert response.data == 'page: 1/1'
+
+    def test_fragment_can_be_requested_with_header(self):
+        response = self.client.get('/users',
+            headers={'X-Fragment': 'pagination'}
+        )
+        assert response.data == 'page: 1/1'
+        assert 'X-Fragment' in response.headers['Vary']
+
+    def test_does_not_count_items_if_template_does_not_use_them(self):
+        statements = []
+
+        def log(conn, cursor, statement, *args):
+            statements.append(statement)
+        event.listen(self.db.engine, 'before_cursor_execute', log)
+
+        self.client.get('/users?fragment=items')
+        assert len(statements) == 1
+        assert 'count(' not in statements[0]
+
+    def test_returns_errors_of_invalid_params_as_json(self):
+        response = self.client.get('/users?page=x&age=old')
+        assert response.status_code == 400
+        assert response.mimetype == 'application/json'
+        assert json.loads(response.data) == {'errors': {
+            'page': 'Not a valid integer.',
+            'age': 'Not a valid integer.'
+        }}
+
+    def test_returns_400_for_unknown_fragment(self):
+        response = self.client.get('/users?fragment=unknown')
+        assert response.status_code == 400
+
+
+class TestStreamedListView(ListTestCase):
+    def setup_method(self, method):
+        ListTestCase.setup_method(self, method)
+        self.app.add_url_rule('/streamed_users',
+            view_func=SortedListView.as_view('streamed_index',
+                model_class=self.User,
+                template='user/index.html',
+                stream=True
+            )
+        )
+
+    def test_renders_all_items(self):
+        response = self.client.get('/streamed_users?sort=age')
+        assert response.status_code == 200
+        assert response.data == self.client.get('/users?sort=age').data
+
+    def test_response_is_streamed(self):
+        response = self.client.get('/streamed_users')
+        assert response.is_streamed
+
+
+class ExportTestCase(ListTestCase):
+    def setup_method(self, method):
+        ListTestCase.setup_method(self, method)
+        self.app.add_url_rule('/exported_users',
+            view_func=SortedListView.as_view('exported_index',
+                model_class=self.User,
+                encoders={'json': JSONRowEncoder, 'csv': CSVRowEncoder},
+                export_columns=['id', 'name', 'age']
+            )
+        )
+
+
+class TestListViewExport(ExportTestCase):
+    def test_exports_filtered_and_sorted_rows_as_json(self):
+        response = self.client.get(
+            '/exported_users?format=json&sort=-age&age=35'
+        )
+        assert response.mimetype == 'application/json'
+        assert json.loads(response.data) == [
+            {'id': 1, 'name': 'John Matrix', 'age': 35}
+        ]
+
+    def test_exports_rows_as_csv(self):
+        response = self.client.get('/exported_users?format=csv&sort=age')
+        assert response.mimetype == 'text/csv'
+        lines = response.data.splitlines()
+        assert lines[0] == 'id,name,age'
+        assert lines[1] == '3,Luke Skywalker,30'
+        assert len(lines) == 5
+
+    def test_returns_400_for_unknown_format(self):
+        response = self.client.get('/exported_users?format=xml')
+        assert response.status_code == 400
+
+    def test_exports_are_disabled_by_default(self):
+        response = self.client.get('/users?format=json')
+        assert response.status_code == 200
+        assert response.mimetype == 'text/html'
+
+    def test_exports_only_export_columns(self):
+        self.app.add_url_rule('/user_names',
+            view_func=SortedListView.as_view('user_names',
+                model_class=self.User,
+                encoders={'csv': CSVRowEncoder},
+                export_columns=['name']
+            )
+        )
+        lines = self.client.get('/user_names?format=csv').data.splitlines()
+        assert lines[:2] == ['name', 'John Matrix']
+
+    def test_export_columns_are_required(self):
+        self.app.add_url_rule('/all_users',
+            view_func=SortedListView.as_view('all_users',
+                model_class=self.User,
+                encoders={'csv': CSVRowEncoder}
+            )
+        )
+        with raises(ImproperlyConfigured):
+            self.client.get('/all_users?format=csv')
+
+
+class TestListViewShardedExport(ExportTestCase):
+    def setup_method(self, method):
+        # the workers connect on their own, so the database must be a file
+        fd, self.database_path = mkstemp(suffix='.db')
+        os.close(fd)
+        self.database_uri = 'sqlite:///' + self.database_path
+        ExportTestCase.setup_method(self, method)
+        self.db.session.add(self.User(name=u'J\xf6rg, Jr.', age=None))
+        self.db.session.commit()
+        self.executor = ProcessExecutor(processes=2)
+        self.app.add_url_rule('/sharded_users',
+            view_func=SortedListView.as_view('sharded_index',
+                model_class=self.User,
+                encoders={'json': JSONRowEncoder, 'csv': CSVRowEncoder},
+                export_columns=['id', 'name', 'age'],
+                export_executor=self.executor,
+                export_shard_size=2,
+                export_max_pending=2
+            )
+        )
+
+    def teardown_method(self, method):
+        self.executor.join()
+        ExportTestCase.teardown_method(self, method)
+        os.remove(self.database_path)
+
+    def test_sharded_export_is_identical_to_single_cursor(self):
+        for query in ['format=json', 'format=csv', 'format=json&name=J',
+                'format=csv&age=35', 'format=json&age=1']:
+            sharded = self.client.get('/sharded_users?' + query)
+            sharded_data = sharded.data
+            single = self.client.get('/exported_users?' + query)
+            assert sharded.mimetype == single.mimetype
+            assert sharded_data == single.data
+        assert self.executor.stats()['completed'] == 3 + 3 + 2 + 1 + 0
+
+    def test_sorted_exports_are_not_sharded(self):
+        response = self.client.get('/sharded_users?format=csv&sort=age')
+        assert response.data == \
+            self.client.get('/exported_users?format=csv&sort=age').data
+        assert self.executor.stats()['submitted'] == 0
+
+    def test_splits_filtered_rows_into_primary_key_ranges(self):
+        query = self.User.query.filter(self.User.id != 2)
+        assert list(iter_ranges(query, self.User.id, 2)) == [
+            (None, 3), (3, 5)
+        ]
+        assert list(iter_ranges(query, self.User.id, 4)) == [(None, 5)]
+        empty = self.User.query.filter(self.User.age == 1)
+        assert list(iter_ranges(empty, self.User.id, 2)) == []
+
+
+class TestListViewFacets(ListTestCase):
+    def setup_method(self, method):
+        ListTestCase.setup_method(self, method)
+        self.db.session.add(self.User(name=u'John Rambo', age=35))
+        self.db.session.commit()
+        self.app.add_url_rule('/faceted_users',
+            view_func=SortedListView.as_view('faceted_index',
+                model_class=self.User,
+                template='user/facets.html',
+                facets=['age', 'name']
+            )
+        )
+
+    def test_counts_items_per_value(self):
+        response = self.client.get('/faceted_users')
+        lines = response.data.splitlines()
+        assert 'age=35:2' in lines
+        assert 'age=30:1' in lines
+        assert 'name=John Matrix:1' in lines
+
+    def test_facet_counts_ignore_own_filter(self):
+        response = self.client.get('/faceted_users?age=35&name=John')
+        assert response.data.splitlines() == [
+            'age=35:2',
+            'name=John Matrix:1',
+            'name=John Rambo:1',
+        ]
+
+    def test_facets_are_counted_with_single_query(self):
+        statements = []
+
+        def log(conn, cursor, statement, *args):
+            statements.append(statement)
+        event.listen(self.db.engine, 'before_cursor_execute', log)
+
+        self.client.get('/faceted_users')
+        assert len(statements) == 2
+
+
+class TestListViewSorting(ListTestCase):
+    def setup_method(self, method):
+        ListTestCase.setup_method(self, method)
+        self.db.session.add(self.User(name=u'John Rambo', age=35))
+        self.db.session.commit()
+
+    def test_sorts_by_multiple_keys(self):
+        response = self.client.get('/users?sort=-age,-name')
+        assert get_item_ids(response) == [2, 4, 5, 1, 3]
+
+    def test_orders_by_primary_key_as_tie_breaker(self):
+        response = self.client.get('/users?sort=-age')
+        assert get_item_ids(response) == [2, 4, 1, 5, 3]
+
+    def test_returns_400_for_unknown_sort_key(self):
+        response = self.client.get('/users?sort=password')
+        assert response.status_code == 400
+
+
+class PagedListView(ListView, SortMixin, PaginationMixin):
+    def dispatch_request(self):
+        query = self.append_sort(self.get_query())
+        pagination = self.append_pagination(query)
+        return ' '.join(str(user.id) for user in pagination.items)
+
+
+class TestListViewMixins(ListTestCase):
+    def setup_method(self, method):
+        ListTestCase.setup_method(self, method)
+        self.app.add_url_rule('/paged_users',
+            view_func=PagedListView.as_view('paged', model_class=self.User,
+                per_page=2, sort='-age'),
+        )
+
+    def test_mixins_work_outside_sorted_list_view(self):
+        response = self.client.get('/paged_users?page=2')
+        assert get_item_ids(response) == [1, 3]
+
+    def test_mixins_parse_their_own_params(self):
+        response = self.client.get('/paged_users?sort=name&per_page=3')
+        assert get_item_ids(response) == [4, 2, 1]
+
+
+class TestListViewSession(ListTestCase):
+    def setup_method(self, method):
+        ListTestCase.setup_method(self, method)
+        self.events = []
+
+        @self.app.context_processor
+        def log_render():
+            self.events.append('render')
+            return {}
+
+        def log_checkin(*args):
+            self.events.append('checkin')
+        event.listen(self.db.engine, 'checkin', log_checkin)
+
+    def test_session_is_resolved_once_per_view(self):
+        with self.app.test_request_context('/users'):
+            view = SortedListView(model_class=self.User)
+            assert view.session is self.db.session()
+            assert view.db is view.db
+            assert view.get_query().session is view.session
+
+    def test_keeps_connection_while_rendering_by_default(self):
+        self.client.get('/users')
+        assert self.events.index('render') < self.events.index('checkin')
+
+    def test_releases_connection_before_rendering(self):
+        self.app.add_url_rule('/released_users',
+            view_func=SortedListView.as_view('released_index',
+                model_class=self.User,
+                release_connection=True
+            )
+        )
+        response = self.client.get('/released_users')
+        assert get_item_ids(response) == [1, 2, 3, 4]
+        assert self.events.index('checkin') < self.events.index('render')
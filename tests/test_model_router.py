@@ -28,3 +28,42 @@ class TestModelRouter(TestCase):
         response = self.client.get('/users/1')
 
         assert response.status_code == 401
+
+    def test_warm_up_compiles_view_templates(self):
+        router = ModelRouter(self.User)
+        missing = router.warm_up(self.app)
+
+        assert missing == {}
+        assert len(self.app.jinja_env.cache) == 4
+
+    def test_warm_up_reports_missing_templates(self):
+        router = ModelRouter(self.User)
+        router.bind_view_args('show', template='user/invalid.html')
+
+        assert router.warm_up(self.app) == {'show': 'user/invalid.html'}
+
+    def test_register_can_be_called_multiple_times(self):
+        router = ModelRouter(self.User, route_prefix='/users')
+        router.register()
+        second = router.register()
+        self.app.register_blueprint(second)
+
+        assert router.get_routes()['show'].rule == \
+            '/users/%s' % router.get_route_key()
+        assert self.client.get('/users/1').status_code == 200
+
+    def test_bind_view_args_does_not_affect_other_routers(self):
+        router = ModelRouter(self.User)
+        other = ModelRouter(self.User)
+        router.bind_view_args('show', template='user/index.html')
+
+        assert router.get_routes()['show'].kwargs['template'] == \
+            'user/index.html'
+        assert 'template' not in other.get_routes()['show'].kwargs
+        assert ModelRouter.default_routes['show'].kwargs == {}
+
+    def test_bind_route_recompiles_routes(self):
+        router = ModelRouter(self.User)
+        assert router.get_routes()['index'].rule == ''
+        router.bind_route('index', '/index')
+        assert router.get_routes()['index'].rule == '/index'
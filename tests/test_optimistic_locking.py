@@ -0,0 +1,187 @@
+from flask_generic_views import (UpdateView, UpdateFormView, ShowView,
+    QueryRecorder)
+from wtforms import Form, TextField
+from wtforms.validators import Length
+
+from . import TestCase
+
+
+class VersionedTestCase(TestCase):
+    def setup_method(self, method):
+        TestCase.setup_method(self, method)
+        db = self.db
+
+        class Document(db.Model):
+            id = db.Column(db.Integer, autoincrement=True, primary_key=True)
+            name = db.Column(db.Unicode(255))
+            version = db.Column(db.Integer, nullable=False, default=1)
+
+            __mapper_args__ = {'version_id_col': version}
+
+        self.Document = Document
+        db.create_all()
+
+        self.app.add_url_rule('/documents/<int:id>',
+            view_func=ShowView.as_view('document.show',
+                model_class=Document,
+                template='user/show.html')
+        )
+        db.session.add(Document(name=u'Draft'))
+        db.session.commit()
+
+
+class TestUpdateViewOptimisticLocking(VersionedTestCase):
+    def setup_method(self, method):
+        VersionedTestCase.setup_method(self, method)
+        self.app.add_url_rule('/documents/<int:id>',
+            view_func=UpdateView.as_view('update',
+                model_class=self.Document,
+                optimistic_locking=True)
+        )
+
+    def test_updates_matching_version(self):
+        response = self.client.put('/documents/1',
+            data={'name': u'Final', 'version': '1'}
+        )
+        assert response.status_code == 302
+        document = self.Document.query.get(1)
+        assert document.name == u'Final'
+        assert document.version == 2
+
+    def test_returns_409_for_outdated_version(self):
+        response = self.client.put('/documents/1',
+            data={'name': u'Final', 'version': '0'}
+        )
+        assert response.status_code == 409
+        assert self.Document.query.get(1).name == u'Draft'
+
+    def test_returns_412_for_outdated_if_match(self):
+        response = self.client.put('/documents/1',
+            data={'name': u'Final'},
+            headers={'If-Match': '"0"'}
+        )
+        assert response.status_code == 412
+
+    def test_returns_428_without_version(self):
+        response = self.client.put('/documents/1', data={'name': u'Final'})
+        assert response.status_code == 428
+
+
+class TestDirectUpdateViewOptimisticLocking(VersionedTestCase):
+    def setup_method(self, method):
+        VersionedTestCase.setup_method(self, method)
+        self.app.add_url_rule('/documents/<int:id>',
+            view_func=UpdateView.as_view('update',
+                model_class=self.Document,
+                optimistic_locking=True,
+                direct_update=True)
+        )
+
+    def test_updates_matching_version(self):
+        self.client.patch('/documents/1',
+            data={'name': u'Final', 'version': '1'}
+        )
+        document = self.Document.query.get(1)
+        assert document.name == u'Final'
+        assert document.version == 2
+
+    def test_returns_409_for_outdated_version(self):
+        response = self.client.patch('/documents/1',
+            data={'name': u'Final', 'version': '2'}
+        )
+        assert response.status_code == 409
+
+    def test_checks_version_when_only_version_is_submitted(self):
+        response = self.client.patch('/documents/1', data={'version': '2'})
+        assert response.status_code == 409
+        response = self.client.patch('/documents/1', data={'version': '1'})
+        assert response.status_code == 302
+
+
+class TestUpdateFormViewOptimisticLocking(VersionedTestCase):
+    def setup_method(self, method):
+        VersionedTestCase.setup_method(self, method)
+        self.app.add_url_rule('/documents/<int:id>/edit',
+            view_func=UpdateFormView.as_view('edit',
+                model_class=self.Document,
+                template='user/edit.html',
+                optimistic_locking=True)
+        )
+
+    def test_sets_version_as_etag(self):
+        response = self.client.get('/documents/1/edit')
+        assert response.headers['ETag'] == '"1"'
+
+    def test_accepts_matching_if_match(self):
+        response = self.client.post('/documents/1/edit',
+            data={'name': u'Final'},
+            headers={'If-Match': '"1"'}
+        )
+        assert response.status_code == 302
+        assert self.Document.query.get(1).version == 2
+
+
+class TestCustomVersionColumn(TestCase):
+    def setup_method(self, method):
+        TestCase.setup_method(self, method)
+        db = self.db
+
+        class Note(db.Model):
+            id = db.Column(db.Integer, autoincrement=True, primary_key=True)
+            name = db.Column(db.Unicode(255))
+            revision = db.Column(db.Integer, nullable=False, default=1)
+
+        self.Note = Note
+        db.create_all()
+
+        self.app.add_url_rule('/notes/<int:id>',
+            view_func=UpdateView.as_view('update',
+                model_class=Note,
+                optimistic_locking=True,
+                version_column='revision',
+                success_url='user.show')
+        )
+        self.app.add_url_rule('/notes/<int:id>',
+            view_func=ShowView.as_view('user.show', model_class=Note)
+        )
+        db.session.add(Note(name=u'Draft'))
+        db.session.commit()
+
+    def test_increments_version_column(self):
+        response = self.client.put('/notes/1',
+            data={'name': u'Final', 'version': '1'}
+        )
+        assert response.status_code == 302
+        note = self.Note.query.get(1)
+        assert note.name == u'Final'
+        assert note.revision == 2
+
+    def test_returns_409_for_outdated_version(self):
+        response = self.client.put('/notes/1',
+            data={'name': u'Final', 'version': '3'}
+        )
+        assert response.status_code == 409
+
+    def test_invalid_form_does_not_increment_version(self):
+        class NoteForm(Form):
+            name = TextField(validators=[Length(max=5)])
+
+        self.app.add_url_rule('/validated_notes/<int:id>',
+            view_func=UpdateView.as_view('validated_update',
+                model_class=self.Note,
+                form_class=NoteForm,
+                optimistic_locking=True,
+                version_column='revision',
+                success_url='user.show')
+        )
+        recorder = QueryRecorder()
+        recorder.start()
+        try:
+            self.client.put('/validated_notes/1',
+                data={'name': u'Too long', 'version': '1'}
+            )
+        finally:
+            recorder.stop()
+        assert not [statement for statement in recorder.statements
+            if statement.statement.startswith('UPDATE')]
+        assert self.Note.query.get(1).revision == 1
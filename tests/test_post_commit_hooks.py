@@ -0,0 +1,59 @@
+from __future__ import with_statement
+
+from flask_generic_views import (CreateView, DeleteView, InlineExecutor,
+    ShowView, SortedListView, UpdateView, WriteEvent)
+
+from . import TestCase
+
+
+class TestPostCommitHooks(TestCase):
+    def setup_method(self, method):
+        TestCase.setup_method(self, method)
+        self.events = []
+        options = dict(
+            model_class=self.User,
+            post_commit_hooks=[self.events.append],
+            executor=InlineExecutor()
+        )
+        self.app.add_url_rule('/users',
+            view_func=CreateView.as_view('create', **options)
+        )
+        self.app.add_url_rule('/users/<int:id>',
+            view_func=UpdateView.as_view('update', **options)
+        )
+        self.app.add_url_rule('/users/<int:id>/delete',
+            view_func=DeleteView.as_view('delete', **options)
+        )
+        self.app.add_url_rule('/users/<int:id>',
+            view_func=ShowView.as_view('user.show', model_class=self.User)
+        )
+        self.app.add_url_rule('/users',
+            view_func=SortedListView.as_view('user.index',
+                model_class=self.User)
+        )
+
+    def test_runs_hooks_after_commit(self):
+        self.client.post('/users', data={'name': u'John Matrix'})
+        self.client.put('/users/1', data={'name': u'Jack Daniels'})
+        self.client.delete('/users/1/delete')
+        assert self.events == [
+            WriteEvent('user', 1, 'create'),
+            WriteEvent('user', 1, 'update'),
+            WriteEvent('user', 1, 'delete'),
+        ]
+
+    def test_does_not_run_hooks_on_rollback(self):
+        self.client.post('/users', data={'name': u'John Matrix'})
+        del self.events[:]
+
+        with self.app.test_request_context('/users/1', method='PUT',
+                data={'name': u'Jack Daniels'}):
+            view = UpdateView(
+                model_class=self.User,
+                post_commit_hooks=[self.events.append],
+                executor=InlineExecutor()
+            )
+            view.schedule_post_commit_hooks(1)
+            self.db.session.rollback()
+            self.db.session.commit()
+        assert self.events == []
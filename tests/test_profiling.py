@@ -0,0 +1,139 @@
+from __future__ import with_statement
+
+import os
+from time import sleep
+
+from flask import json
+from flask_generic_views import BaseView, ChangeFeed, ModelRouter, Profiler
+from pytest import raises
+
+from . import TestCase
+
+
+class SlowView(BaseView):
+    def get(self):
+        sleep(0.05)
+        return 'slow'
+
+
+class ProfilerTestCase(TestCase):
+    def setup_method(self, method):
+        TestCase.setup_method(self, method)
+        self.db.session.add(self.User(name=u'John Matrix', age=35))
+        self.db.session.commit()
+
+    def get_names(self, profiler):
+        return sorted(
+            os.path.basename(path) for path in profiler.get_paths()
+        )
+
+
+class TestProfiler(ProfilerTestCase):
+    def add_slow_view(self, profiler):
+        self.app.add_url_rule(
+            '/slow',
+            view_func=SlowView.as_view('slow', profiler=profiler)
+        )
+
+    def test_profiles_every_nth_request(self, tmpdir):
+        profiler = Profiler(str(tmpdir), sample_every=2)
+        self.add_slow_view(profiler)
+        for i in range(5):
+            assert self.client.get('/slow').data == 'slow'
+        names = self.get_names(profiler)
+        assert len(names) == 2
+        for name in names:
+            assert name.startswith('slow---')
+            assert name.endswith('.prof')
+
+    def test_samples_stacks_of_slow_requests(self, tmpdir):
+        profiler = Profiler(str(tmpdir), slow_threshold=0.01, interval=0.001)
+        self.add_slow_view(profiler)
+        assert self.client.get('/slow').data == 'slow'
+        names = self.get_names(profiler)
+        assert len(names) == 1
+        assert names[0].endswith('.collapsed')
+
+        view = profiler.report()[0]
+        assert view['endpoint'] == 'slow'
+        assert view['functions'] == []
+        assert view['sampled_functions'][0]['function'] == \
+            'test_profiling.py:get'
+
+    def test_does_not_write_fast_requests(self, tmpdir):
+        profiler = Profiler(str(tmpdir), slow_threshold=10)
+        self.add_slow_view(profiler)
+        self.client.get('/slow')
+        assert profiler.get_paths() == []
+
+    def test_keeps_newest_files(self, tmpdir):
+        profiler = Profiler(str(tmpdir), sample_every=1, max_files=2)
+        self.add_slow_view(profiler)
+        for i in range(3):
+            self.client.get('/slow')
+        assert len(profiler.get_paths()) == 2
+
+    def test_removes_partially_written_files(self, tmpdir):
+        profiler = Profiler(str(tmpdir))
+
+        def write(profile_file):
+            profile_file.write('partial')
+            raise IOError('disk full')
+        with raises(IOError):
+            profiler.write_file('slow--', '.prof', write)
+        assert tmpdir.listdir() == []
+
+    def test_caches_report_until_profiles_change(self, tmpdir):
+        profiler = Profiler(str(tmpdir), sample_every=1)
+        self.add_slow_view(profiler)
+        self.client.get('/slow')
+        report = profiler.report()
+        assert profiler.report() is report
+        self.client.get('/slow')
+        assert profiler.report()[0]['profiles'] == 2
+
+
+class TestModelRouterProfiling(ProfilerTestCase):
+    def register(self, directory):
+        self.profiler = Profiler(directory, sample_every=1)
+        router = ModelRouter(self.User, profiler=self.profiler)
+        self.app.register_blueprint(router.register(), url_prefix='/users')
+
+    def test_profiles_are_tagged_with_endpoint_and_model(self, tmpdir):
+        self.register(str(tmpdir))
+        self.client.get('/users/1')
+        name, = self.get_names(self.profiler)
+        assert name.startswith('user.show--User--')
+
+    def test_profile_route_is_not_profiled(self, tmpdir):
+        self.register(str(tmpdir))
+        self.client.get('/users/profile')
+        assert self.get_names(self.profiler) == []
+
+    def test_long_polls_are_not_profiled(self, tmpdir):
+        profiler = Profiler(str(tmpdir), slow_threshold=0.01)
+        router = ModelRouter(
+            self.User,
+            profiler=profiler,
+            change_feed=ChangeFeed()
+        )
+        self.app.register_blueprint(router.register(), url_prefix='/users')
+        self.client.get('/users/changes?timeout=0.05')
+        assert profiler.get_paths() == []
+
+    def test_profile_route_shows_hot_functions(self, tmpdir):
+        self.register(str(tmpdir))
+        self.client.get('/users/1')
+        self.client.get('/users')
+        response = self.client.get('/users/profile?endpoint=user.show')
+        assert response.mimetype == 'application/json'
+        views = json.loads(response.data)['views']
+        assert len(views) == 1
+        assert views[0]['endpoint'] == 'user.show'
+        assert views[0]['model'] == 'User'
+        assert views[0]['profiles'] == 1
+        assert len(views[0]['functions']) == 20
+        function = views[0]['functions'][0]
+        assert set(function) == set(
+            ['function', 'calls', 'time', 'cumulative_time']
+        )
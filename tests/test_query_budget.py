@@ -0,0 +1,117 @@
+from __future__ import with_statement
+
+import logging
+import warnings
+
+from flask_generic_views import (ModelRouter, QueryBudget, QueryBudgetWarning,
+    QueryBudgetExceeded, QueryRecorder, ShowView, SortedListView)
+from flask_generic_views.exceptions import ImproperlyConfigured
+from flask_generic_views.testing import (assert_max_queries,
+    assert_num_queries)
+from pytest import raises
+
+from . import TestCase
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        logging.Handler.__init__(self)
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+class QueryBudgetTestCase(TestCase):
+    def setup_method(self, method):
+        TestCase.setup_method(self, method)
+        for name in (u'John Matrix', u'Jack Daniels', u'Luke Skywalker'):
+            self.db.session.add(self.User(name=name, age=35))
+        self.db.session.commit()
+
+    def register(self, budget):
+        router = ModelRouter(self.User, view_kwargs={'query_budget': budget})
+        self.app.register_blueprint(router.register(), url_prefix='/users')
+
+
+class TestQueryRecorder(TestCase):
+    def test_records_statements_of_current_thread(self):
+        with QueryRecorder() as recorder:
+            self.User.query.all()
+        assert recorder.count == 1
+        assert recorder.statements[0].statement.startswith('SELECT')
+        assert recorder.statements[0].stack is None
+        self.User.query.all()
+        assert recorder.count == 1
+
+    def test_captures_stacks(self):
+        with QueryRecorder(capture_stacks=True) as recorder:
+            self.User.query.all()
+        filenames = [frame[0] for frame in recorder.statements[0].stack]
+        assert __file__.rstrip('c') in filenames
+
+    def test_recorders_can_be_nested(self):
+        with QueryRecorder() as outer:
+            self.User.query.all()
+            with QueryRecorder() as inner:
+                self.User.query.all()
+        assert outer.count == 2
+        assert inner.count == 1
+
+
+class TestQueryBudget(QueryBudgetTestCase):
+    def test_unknown_mode_is_improperly_configured(self):
+        with raises(ImproperlyConfigured):
+            QueryBudget(mode='ignore')
+
+    def test_requests_within_budget_pass(self):
+        self.register(QueryBudget(max_statements=2, mode='raise'))
+        assert self.client.get('/users').status_code == 200
+
+    def test_raise_mode(self):
+        self.register(QueryBudget(max_statements=0, mode='raise'))
+        with raises(QueryBudgetExceeded) as info:
+            self.client.get('/users/1')
+        assert 'user.show exceeded its query budget' in str(info.value)
+        assert len(info.value.statements) == 1
+
+    def test_max_duration(self):
+        self.register(QueryBudget(max_duration=0, mode='raise'))
+        with raises(QueryBudgetExceeded) as info:
+            self.client.get('/users/1')
+        assert 'seconds (budget 0.000)' in str(info.value)
+
+    def test_warn_mode(self):
+        self.register(QueryBudget(max_statements=0))
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            self.client.get('/users/1')
+        assert [w.category for w in caught] == [QueryBudgetWarning]
+
+    def test_log_mode_logs_statements_and_stacks(self):
+        logger = logging.getLogger('test_query_budget')
+        handler = ListHandler()
+        logger.addHandler(handler)
+        self.register(QueryBudget(max_statements=0, mode='log', logger=logger))
+        self.client.get('/users/1')
+        message = handler.records[0].getMessage()
+        assert '1 statements (budget 0)' in message
+        assert 'FROM user' in message
+        assert 'get_object' in message
+
+
+class TestViewQueryCounts(QueryBudgetTestCase):
+    def test_show_view(self):
+        self.app.add_url_rule(
+            '/users/<int:id>',
+            view_func=ShowView.as_view('show', model_class=self.User)
+        )
+        response = assert_num_queries(1, self.client.get, '/users/1')
+        assert response.status_code == 200
+
+    def test_sorted_list_view_does_not_depend_on_number_of_items(self):
+        self.app.add_url_rule(
+            '/users',
+            view_func=SortedListView.as_view('index', model_class=self.User)
+        )
+        assert_max_queries(2, self.client.get, '/users')
@@ -0,0 +1,132 @@
+from __future__ import with_statement
+
+from flask import json
+from flask_generic_views import JSONRowEncoder, ModelRouter, SortedListView
+from flask_generic_views.exceptions import ImproperlyConfigured
+from pytest import raises
+
+from . import TestCase
+
+
+class RelatedTestCase(TestCase):
+    def setup_method(self, method):
+        TestCase.setup_method(self, method)
+        db = self.db
+
+        class Order(db.Model):
+            id = db.Column(db.Integer, autoincrement=True, primary_key=True)
+            title = db.Column(db.Unicode(255))
+            user_id = db.Column(db.Integer, db.ForeignKey(self.User.id))
+            user = db.relationship(self.User, backref='orders')
+
+        self.Order = Order
+        db.create_all()
+
+        router = ModelRouter(self.User, **self.get_router_kwargs())
+        router.add_child(
+            'orders',
+            encoders={'json': JSONRowEncoder},
+            export_columns=['id', 'title']
+        )
+        self.router = router
+        self.app.register_blueprint(router.register(), url_prefix='/users')
+
+        john = self.User(name=u'John Matrix')
+        jack = self.User(name=u'Jack Daniels')
+        db.session.add_all([
+            Order(title=u'Order A', user=john),
+            Order(title=u'Order B', user=john),
+            Order(title=u'Order C', user=jack),
+        ])
+        db.session.add(self.User(name=u'Luke Skywalker'))
+        db.session.commit()
+
+    def get_router_kwargs(self):
+        return {}
+
+
+class TestRelatedListView(RelatedTestCase):
+    def test_lists_only_related_items(self):
+        response = self.client.get('/users/1/orders?sort=-title')
+        assert response.status_code == 200
+        assert response.data.split() == ['Order', 'B', 'Order', 'A']
+
+    def test_returns_empty_list_for_parent_without_items(self):
+        response = self.client.get('/users/3/orders')
+        assert response.status_code == 200
+        assert response.data.split() == []
+
+    def test_returns_404_if_parent_not_found(self):
+        response = self.client.get('/users/123/orders')
+        assert response.status_code == 404
+
+    def test_exports_related_items(self):
+        response = self.client.get('/users/2/orders?format=json')
+        assert json.loads(response.data) == [{'id': 3, 'title': 'Order C'}]
+
+    def test_export_returns_404_if_parent_not_found(self):
+        response = self.client.get('/users/123/orders?format=json')
+        assert response.status_code == 404
+
+    def test_child_templates_are_resolved_with_child_model(self):
+        templates = self.router.get_templates()
+        assert templates['orders_index'] == 'order/index.html'
+        assert templates['index'] == 'user/index.html'
+
+
+class TestRouterViewKwargs(RelatedTestCase):
+    def get_router_kwargs(self):
+        return {'view_kwargs': {'sortable': ['name'], 'per_page': 1}}
+
+    def test_view_kwargs_are_not_given_to_child_routes(self):
+        response = self.client.get('/users/1/orders?sort=-title')
+        assert response.status_code == 200
+        assert response.data.split() == ['Order', 'B', 'Order', 'A']
+
+    def test_view_kwargs_are_given_to_routes_of_the_model(self):
+        response = self.client.get('/users?sort=name')
+        assert response.status_code == 200
+        assert self.client.get('/users?sort=age').status_code == 400
+
+
+class TestRelationshipSorting(RelatedTestCase):
+    def setup_method(self, method):
+        RelatedTestCase.setup_method(self, method)
+        self.app.add_url_rule('/orders',
+            view_func=SortedListView.as_view('order_index',
+                model_class=self.Order,
+                sortable=['title', 'user.name']
+            )
+        )
+
+    def test_sorts_by_related_column(self):
+        response = self.client.get('/orders?sort=user.name,-title')
+        assert response.data.split() == [
+            'Order', 'C', 'Order', 'B', 'Order', 'A'
+        ]
+
+    def test_returns_400_for_column_not_sortable(self):
+        response = self.client.get('/orders?sort=user_id')
+        assert response.status_code == 400
+
+    def test_sorts_custom_query_joining_the_relationship(self):
+        self.app.add_url_rule('/joined_orders',
+            view_func=SortedListView.as_view('joined_order_index',
+                model_class=self.Order,
+                query=self.Order.query.join(self.Order.user)
+                    .filter(self.User.name != u'Jack Daniels'),
+                sortable=['title', 'user.name']
+            )
+        )
+        response = self.client.get('/joined_orders?sort=user.name,-title')
+        assert response.data.split() == ['Order', 'B', 'Order', 'A']
+
+    def test_rejects_sorting_by_collections(self):
+        self.app.add_url_rule('/sorted_users',
+            view_func=SortedListView.as_view('sorted_user_index',
+                model_class=self.User,
+                sortable=['orders.title']
+            )
+        )
+        with raises(ImproperlyConfigured):
+            self.client.get('/sorted_users')
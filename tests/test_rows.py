@@ -0,0 +1,51 @@
+from flask_generic_views import RowResult, SortedListView, get_row_class
+
+from . import TestCase
+
+
+class TestRowResult(TestCase):
+    def setup_method(self, method):
+        TestCase.setup_method(self, method)
+        for name, age in [(u'John Matrix', 35), (u'Jack Daniels', 60),
+                (u'Luke Skywalker', 30)]:
+            self.db.session.add(self.User(name=name, age=age))
+        self.db.session.commit()
+        self.db.session.expunge_all()
+
+    def get_result(self, **kwargs):
+        query = self.User.query.order_by(self.User.id) \
+            .with_entities(self.User.id, self.User.name)
+        return RowResult(query, ['id', 'name'], **kwargs)
+
+    def test_yields_row_objects(self):
+        rows = list(self.get_result(chunk_size=2))
+        assert [(row.id, row.name) for row in rows] == [
+            (1, u'John Matrix'), (2, u'Jack Daniels'), (3, u'Luke Skywalker')
+        ]
+
+    def test_rows_have_no_instance_dict(self):
+        row = list(self.get_result())[0]
+        assert not hasattr(row, '__dict__')
+        assert tuple(row) == (1, u'John Matrix')
+
+    def test_bypasses_identity_map(self):
+        list(self.get_result())
+        assert len(self.db.session.identity_map) == 0
+
+    def test_row_class_is_created_once_per_column_set(self):
+        assert get_row_class(['id', 'name']) is \
+            self.get_result().row_class
+        assert get_row_class(['id']) is not get_row_class(['id', 'name'])
+
+    def test_list_view_renders_row_objects(self):
+        self.app.add_url_rule('/users',
+            view_func=SortedListView.as_view('index', model_class=self.User)
+        )
+        self.app.add_url_rule('/user_rows',
+            view_func=SortedListView.as_view('rows_index',
+                model_class=self.User,
+                row_objects=True
+            )
+        )
+        response = self.client.get('/user_rows?sort=-age')
+        assert response.data == self.client.get('/users?sort=-age').data
@@ -1,7 +1,7 @@
 from __future__ import with_statement
 
 from flask.templating import TemplateNotFound
-from flask.ext.generic_views import ShowView
+from flask.ext.generic_views import ShowView, _static_contexts
 from pytest import raises
 
 from . import TestCase
@@ -36,3 +36,55 @@ class TestShowView(TestCase):
     def test_returns_404_if_not_found(self):
         response = self.client.get('/users/123123')
         assert response.status_code == 404
+
+    def test_does_not_modify_static_context(self):
+        self.client.get('/users/1')
+        assert ShowView.context == {}
+
+    def test_context_providers_override_static_context(self):
+        with self.app.test_request_context('/users/1'):
+            view = ShowView(
+                model_class=self.User,
+                context={'title': 'Users'},
+                context_providers=[lambda: {'title': 'Provided'}]
+            )
+            context = view.get_context(item=1)
+            assert context['item'] == 1
+            assert context['title'] == 'Provided'
+
+    def test_callable_static_context_is_built_once(self):
+        calls = []
+
+        def context():
+            calls.append(1)
+            return {'title': 'Users'}
+        self.app.add_url_rule('/titled_users/<int:id>',
+            view_func=ShowView.as_view(
+                'titled_show',
+                model_class=self.User,
+                context=context
+            ),
+        )
+        self.client.get('/titled_users/1')
+        self.client.get('/titled_users/1')
+        assert len(calls) == 1
+
+    def test_context_method_is_cached_once_per_view_class(self):
+        calls = []
+
+        class TitledShowView(ShowView):
+            def context(self):
+                calls.append(1)
+                return {'title': 'Users'}
+        self.app.add_url_rule('/titled_users/<int:id>',
+            view_func=TitledShowView.as_view(
+                'titled_show',
+                model_class=self.User
+            ),
+        )
+        self.client.get('/titled_users/1')
+        size = len(_static_contexts)
+        self.client.get('/titled_users/1')
+        self.client.get('/titled_users/1')
+        assert len(_static_contexts) == size
+        assert len(calls) == 1
@@ -0,0 +1,143 @@
+from __future__ import with_statement
+
+from flask_generic_views import (FileSnapshotStore, ImproperlyConfigured,
+    InlineExecutor, MemorySnapshotStore, ModelRouter, Snapshot, Snapshots,
+    WriteEvent)
+from pytest import raises
+from sqlalchemy import event
+
+from . import TestCase
+
+
+class SnapshotTestCase(TestCase):
+    def setup_method(self, method):
+        TestCase.setup_method(self, method)
+        self.db.session.add(self.User(name=u'John Matrix', age=35))
+        self.db.session.add(self.User(name=u'Jack Daniels', age=60))
+        self.db.session.commit()
+
+    def register(self, view_kwargs=None, **kwargs):
+        kwargs.setdefault('regenerate', False)
+        if view_kwargs is None:
+            view_kwargs = {'executor': InlineExecutor()}
+        self.snapshots = Snapshots(**kwargs)
+        router = ModelRouter(
+            self.User,
+            snapshots=self.snapshots,
+            view_kwargs=view_kwargs
+        )
+        router.bind_view_args('show', template='user/snapshot.html')
+        self.app.register_blueprint(router.register(), url_prefix='/users')
+
+    def rename(self, pk, name):
+        self.User.query.filter_by(id=pk).update({'name': name})
+        self.db.session.commit()
+
+    def count_statements(self, f, *args):
+        statements = []
+
+        def log(*args):
+            statements.append(args)
+        event.listen(self.db.engine, 'before_cursor_execute', log)
+        f(*args)
+        return len(statements)
+
+
+class TestSnapshots(SnapshotTestCase):
+    def test_serves_snapshots_without_queries(self):
+        self.register(max_age=None)
+        self.client.get('/users/1')
+        self.rename(1, u'Luke Skywalker')
+
+        assert self.count_statements(self.client.get, '/users/1') == 0
+        response = self.client.get('/users/1')
+        assert response.data.strip() == 'John Matrix'
+        assert 'Age' in response.headers
+
+    def test_does_not_serve_snapshots_older_than_max_age(self):
+        self.register(max_age=0)
+        self.client.get('/users/1')
+        self.rename(1, u'Luke Skywalker')
+        assert self.client.get('/users/1').data.strip() == 'Luke Skywalker'
+
+    def test_only_first_pages_are_snapshotted(self):
+        self.register(pages=1)
+        self.client.get('/users')
+        self.client.get('/users?page=2')
+        self.client.get('/users?sort=name')
+        assert self.snapshots.store.snapshots.keys() == ['user/index/1']
+
+    def test_fragment_requests_are_not_snapshotted(self):
+        self.register()
+        self.client.get('/users', headers={'X-Fragment': 'items'})
+        assert self.snapshots.store.snapshots == {}
+
+    def test_requests_with_session_data_bypass_snapshots(self):
+        self.register(max_age=None)
+        self.client.get('/users')
+        self.client.post('/users/1/delete')
+        response = self.client.get('/users')
+        assert 'User deleted.' in response.data
+        assert 'User deleted.' not in self.client.get('/users').data
+        assert 'User deleted.' not in \
+            self.snapshots.store.get('user/index/1').data
+
+    def test_session_data_is_not_stored_to_snapshots(self):
+        self.register(max_age=None)
+        self.client.post('/users/1/delete')
+        self.client.get('/users')
+        assert self.snapshots.store.snapshots == {}
+
+    def test_write_views_discard_affected_snapshots(self):
+        self.register(max_age=None, regenerate=False)
+        self.client.get('/users/1')
+        self.client.get('/users/2')
+        self.client.get('/users')
+        self.client.put('/users/1', data={'name': u'Luke Skywalker'})
+        assert self.snapshots.store.snapshots.keys() == ['user/show/2']
+        assert self.client.get('/users/1').data.strip() == 'Luke Skywalker'
+
+    def test_regenerates_affected_snapshots_on_write(self):
+        self.register(view_kwargs={}, max_age=None, regenerate=True)
+        self.client.get('/users/1')
+        self.rename(1, u'Luke Skywalker')
+
+        self.snapshots.on_write(WriteEvent('user', 1, 'update'))
+        assert self.snapshots.store.get('user/show/1').data.strip() == \
+            'Luke Skywalker'
+        assert self.snapshots.store.get('user/index/1') is not None
+
+    def test_router_rejects_regenerating_with_inline_executor(self):
+        with raises(ImproperlyConfigured):
+            self.register(regenerate=True)
+
+    def test_quotes_primary_keys_in_keys(self):
+        self.register()
+        assert self.snapshots.get_show_key(u'../a/b') == \
+            'user/show/%2E%2E%2Fa%2Fb'
+
+    def test_rebuild_renders_all_snapshots(self):
+        self.register(pages=2)
+        self.snapshots.rebuild(self.app)
+        assert sorted(self.snapshots.store.snapshots) == [
+            'user/index/1', 'user/show/1', 'user/show/2'
+        ]
+
+
+class TestFileSnapshotStore(object):
+    def test_stores_snapshots_as_files(self, tmpdir):
+        store = FileSnapshotStore(str(tmpdir))
+        store.set('user/show/1', Snapshot('<p>John</p>', 'text/html', 1000))
+        assert store.get('user/show/1') == \
+            Snapshot('<p>John</p>', 'text/html', 1000)
+        assert tmpdir.join('user', 'show', '1').check()
+
+        store.delete('user/show/1')
+        store.delete('user/show/1')
+        assert store.get('user/show/1') is None
+
+    def test_rejects_keys_outside_the_directory(self, tmpdir):
+        store = FileSnapshotStore(str(tmpdir))
+        for key in ['user/show/..', '../show/1', 'user//1']:
+            with raises(ValueError):
+                store.get(key)
@@ -0,0 +1,41 @@
+from flask_generic_views import ModelRouter, Throttle, MemoryBackend
+
+from . import TestCase
+
+
+class TestMemoryBackend(object):
+    def test_consumes_tokens_until_bucket_is_empty(self):
+        backend = MemoryBackend()
+        assert backend.consume('key', 2, 0.001, 3) == 0
+        assert backend.consume('key', 2, 0.001, 3) > 0
+
+    def test_buckets_are_separated_by_key(self):
+        backend = MemoryBackend()
+        assert backend.consume('a', 3, 0.001, 3) == 0
+        assert backend.consume('b', 3, 0.001, 3) == 0
+
+
+class TestThrottledModelRouter(TestCase):
+    def setup_method(self, method):
+        TestCase.setup_method(self, method)
+        router = ModelRouter(
+            self.User,
+            throttle=Throttle(rate=0.001, capacity=2)
+        )
+        self.app.register_blueprint(router.register(), url_prefix='/users')
+
+        user = self.User(name=u'John Matrix')
+        self.db.session.add(user)
+        self.db.session.commit()
+
+    def test_returns_429_when_limit_exceeded(self):
+        assert self.client.get('/users/1').status_code == 200
+        assert self.client.get('/users/1').status_code == 200
+        response = self.client.get('/users/1')
+        assert response.status_code == 429
+        assert 'Retry-After' in response.headers
+
+    def test_large_pages_cost_more(self):
+        assert self.client.get('/users?per_page=100').status_code == 200
+        response = self.client.get('/users?per_page=100')
+        assert response.status_code == 429
@@ -1,5 +1,6 @@
 from tests import TestCase
 from flask_generic_views import UpdateView, ShowView
+from sqlalchemy import event
 
 
 class TestUpdateView(TestCase):
@@ -41,3 +42,50 @@ class TestUpdateView(TestCase):
         )
         response = self.client.get('/users/1')
         assert 'User updated!' in response.data
+
+    def test_patch_only_updates_submitted_fields(self):
+        user = self.User.query.get(1)
+        user.age = 35
+        self.db.session.commit()
+
+        self.client.patch('/users/1', data={'name': u'Jack Daniels'})
+        user = self.User.query.get(1)
+        assert user.name == u'Jack Daniels'
+        assert user.age == 35
+
+
+class TestDirectUpdateView(TestCase):
+    def setup_method(self, method):
+        TestCase.setup_method(self, method)
+
+        self.app.add_url_rule('/users/<int:id>',
+            view_func=UpdateView.as_view('update',
+            model_class=self.User,
+            direct_update=True),
+        )
+        self.app.add_url_rule('/users/<int:id>',
+            view_func=ShowView.as_view('user.show', model_class=self.User)
+        )
+        user = self.User(name=u'John Matrix', age=35)
+        self.db.session.add(user)
+        self.db.session.commit()
+
+    def test_updates_submitted_fields_without_loading_object(self):
+        statements = []
+
+        def log(conn, cursor, statement, *args):
+            statements.append(statement)
+        event.listen(self.db.engine, 'before_cursor_execute', log)
+
+        response = self.client.patch('/users/1', data={'age': '36'})
+        assert response.status_code == 302
+        assert len(statements) == 1
+        assert statements[0].startswith('UPDATE')
+
+        user = self.User.query.get(1)
+        assert user.age == 36
+        assert user.name == u'John Matrix'
+
+    def test_returns_404_if_not_found(self):
+        response = self.client.patch('/users/123', data={'age': '36'})
+        assert response.status_code == 404
@@ -0,0 +1,73 @@
+from __future__ import with_statement
+
+from cPickle import PicklingError
+
+from flask_generic_views import ThreadExecutor, ProcessExecutor, Full
+from pytest import raises
+
+
+class TestThreadExecutor(object):
+    def test_runs_submitted_jobs(self):
+        results = []
+        executor = ThreadExecutor(workers=2)
+        for i in range(5):
+            executor.submit(results.append, i)
+        executor.join()
+        assert sorted(results) == [0, 1, 2, 3, 4]
+
+    def test_raises_full_when_queue_is_full(self):
+        executor = ThreadExecutor(workers=0, max_queue_size=1)
+        executor.submit(lambda: None)
+        with raises(Full):
+            executor.submit(lambda: None)
+
+    def test_counts_completed_and_failed_jobs(self):
+        executor = ThreadExecutor()
+        executor.submit(int, '1')
+        executor.submit(int, 'x')
+        executor.join()
+        stats = executor.stats()
+        assert stats['completed'] == 1
+        assert stats['failed'] == 1
+        assert stats['pending'] == 0
+
+
+class TestProcessExecutor(object):
+    def test_runs_jobs_in_worker_processes(self):
+        executor = ProcessExecutor(processes=1)
+        executor.submit(int, '1')
+        executor.submit(int, 'x')
+        executor.join()
+        stats = executor.stats()
+        assert stats['completed'] == 1
+        assert stats['failed'] == 1
+
+    def test_imap_yields_results_in_order(self):
+        executor = ProcessExecutor(processes=2)
+        arguments = [(str(i),) for i in range(10)]
+        results = list(executor.imap(int, arguments, max_pending=3))
+        executor.join()
+        assert results == range(10)
+        assert executor.stats()['completed'] == 10
+
+    def test_imap_reraises_errors(self):
+        executor = ProcessExecutor(processes=1)
+        with raises(ValueError):
+            list(executor.imap(int, [('1',), ('x',)]))
+        executor.join()
+        assert executor.stats()['failed'] == 1
+
+    def test_raises_full_when_too_many_jobs_are_pending(self):
+        executor = ProcessExecutor(processes=1, max_queue_size=0)
+        with raises(Full):
+            executor.submit(int, '1')
+        assert executor.stats()['rejected'] == 1
+
+    def test_rejects_jobs_that_can_not_be_pickled(self):
+        executor = ProcessExecutor(processes=1)
+        with raises(PicklingError):
+            executor.submit(lambda: None)
+        stats = executor.stats()
+        assert stats['failed'] == 1
+        assert stats['pending'] == 0
+        assert executor.pool is None
@@ -0,0 +1,29 @@
+from flask_generic_views import ContextChain, LazyValue
+
+
+class TestContextChain(object):
+    def test_first_layer_having_the_key_wins(self):
+        context = ContextChain({'a': 1}, {'a': 2, 'b': 2})
+        assert context['a'] == 1
+        assert context['b'] == 2
+
+    def test_assignments_go_to_first_layer(self):
+        static = {'a': 1}
+        context = ContextChain({}, static)
+        context['a'] = 2
+        assert context['a'] == 2
+        assert static == {'a': 1}
+
+    def test_keys_are_unique(self):
+        context = ContextChain({'a': 1}, {'a': 2, 'b': 2})
+        assert sorted(context.keys()) == ['a', 'b']
+        assert dict(context) == {'a': 1, 'b': 2}
+
+    def test_lazy_values_are_evaluated_on_lookup(self):
+        calls = []
+        value = LazyValue(lambda: calls.append(1) or 'value')
+        context = ContextChain({'lazy': value})
+        assert calls == []
+        assert context['lazy'] == 'value'
+        assert context['lazy'] == 'value'
+        assert calls == [1]
@@ -0,0 +1,90 @@
+from __future__ import with_statement
+
+import warnings
+
+from flask_generic_views import (ImproperlyConfigured, InvalidParams,
+    ListParams, ParamSchema, ReservedParamWarning)
+from pytest import raises
+from werkzeug.datastructures import MultiDict
+
+
+class TestParamSchema(object):
+    def setup_method(self, method):
+        self.schema = ParamSchema(
+            filters={'name': unicode, 'age': int, 'active': bool},
+            sort_keys=['name', 'age'],
+            sort='name',
+            per_page=20,
+            max_per_page=100,
+            fragments=['items'],
+            formats=['csv']
+        )
+
+    def test_uses_defaults_for_missing_params(self):
+        params = self.schema.parse(MultiDict())
+        assert params == ListParams(
+            page=1, per_page=20, sort=(('name', False),)
+        )
+
+    def test_parses_typed_values(self):
+        params = self.schema.parse(MultiDict([
+            ('page', '2'),
+            ('per_page', '50'),
+            ('sort', '-age,name'),
+            ('name', u'John'),
+            ('age', '35'),
+            ('active', 'y'),
+            ('fragment', 'items'),
+            ('format', 'csv'),
+        ]))
+        assert params.page == 2
+        assert params.per_page == 50
+        assert params.sort == (('age', True), ('name', False))
+        assert params.filters == (
+            ('active', True), ('age', 35), ('name', u'John')
+        )
+        assert params.fragment == 'items'
+        assert params.format == 'csv'
+
+    def test_params_are_hashable(self):
+        first = self.schema.parse(MultiDict([('age', '35'), ('page', '2')]))
+        second = self.schema.parse(MultiDict([('page', '2'), ('age', '35')]))
+        assert {first: 1}[second] == 1
+
+    def test_ignores_empty_filters_and_unknown_params(self):
+        params = self.schema.parse(MultiDict([
+            ('age', ''), ('active', '__None'), ('unknown', 'x')
+        ]))
+        assert params.filters == ()
+
+    def test_collects_all_errors(self):
+        with_errors = MultiDict([
+            ('page', '0'),
+            ('per_page', '1000'),
+            ('age', 'old'),
+            ('sort', 'password'),
+        ])
+        with raises(InvalidParams) as info:
+            self.schema.parse(with_errors)
+        assert sorted(info.value.errors) == ['age', 'page', 'per_page', 'sort']
+
+    def test_rejects_unknown_default_sort(self):
+        with raises(ImproperlyConfigured):
+            ParamSchema(sort_keys=['name'], sort='age')
+
+    def test_warns_about_filters_named_after_other_params(self):
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            schema = ParamSchema(
+                filters={'name': unicode, 'page': int, 'format': unicode},
+                per_page=20,
+                formats=['csv']
+            )
+        assert sorted(
+            str(warning.message).split()[1] for warning in caught
+        ) == ['format', 'page']
+        assert caught[0].category is ReservedParamWarning
+        params = schema.parse(MultiDict([('page', '2'), ('format', 'csv')]))
+        assert params.page == 2
+        assert params.format == 'csv'
+        assert params.filters == ()